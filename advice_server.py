@@ -0,0 +1,372 @@
+# advice_server.py
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import os
+import random
+import time
+
+import deck_counter
+import tile_loader
+from live import AdviceSession, advice_json
+from replay import parse_record
+from self_play import HAND_SIZE, PLAYERS
+
+DEFAULT_PORT = 8766
+# 每张牌桌最多排队的事件数，超过时暂停读取该连接(背压)
+MAX_PENDING = 8
+# 同时存在的会话数上限
+MAX_SESSIONS = 256
+# 会话空闲多久(秒)后回收
+IDLE_TIMEOUT = 600
+# 每个工作进程保留的空闲会话数，新牌桌优先复用(StateManager 无需重新加载，RuleEngine 缓存仍然有效)
+POOL_SIZE = 16
+
+# ===== 工作进程：每个进程持有分配给它的牌桌的会话 =====
+
+_sessions = {}
+_free = []
+_deadline_ms = None
+
+
+def _init_worker(deadline_ms):
+    global _deadline_ms
+    _deadline_ms = deadline_ms
+
+
+def _handle(table, seat, event):
+    """在工作进程中把事件推入牌桌 table 的会话，返回可 JSON 序列化的建议或 None"""
+    session = _sessions.get(table)
+    if event[0] == "DEAL":
+        if session is None:
+            session = _free.pop() if _free else AdviceSession(seat, deadline_ms=_deadline_ms)
+            _sessions[table] = session
+        session.reset(seat)
+    elif session is None:
+        raise ValueError(f"牌桌 {table} 还没有 deal 事件")
+    advice = session.handle(event)
+    return None if advice is None else advice_json(advice)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _close(table):
+    """回收牌桌的会话，放入空闲池"""
+    session = _sessions.pop(table, None)
+    if session is not None and len(_free) < POOL_SIZE:
+        _free.append(session)
+
+
+class _Table:
+    """服务端(事件循环中)一张牌桌的记录：所在分片、排队中的事件与最近活动时间"""
+
+    __slots__ = ("shard", "queue", "task", "seq", "last_active")
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.queue = asyncio.Queue(MAX_PENDING)
+        self.task = None
+        self.seq = 0
+        self.last_active = time.monotonic()
+
+
+class AdviceServer:
+    """
+    多牌桌建议服务：一个进程同时为许多牌桌给出建议，每张牌桌一个 AdviceSession，以 table 区分。
+
+    协议为 TCP 上的 JSON 行(只监听 127.0.0.1)。请求即 replay.parse_events 的事件格式，
+    另加 "table"(牌桌标识)，deal 事件可带 "seat"(自己的绝对座位号，默认 0)：
+      {"table": "t1", "type": "deal", "dealer": 0, "seat": 0, "hands": [["W1", ...], null, null, null]}
+      {"table": "t1", "type": "draw", "player": 0, "tile": "W5"}
+    每个请求对应一行回复：{"table": "t1", "seq": 序号, "advice": 建议或 null}，出错时为 {"table", "seq", "error"}。
+    同一张牌桌的回复按请求顺序返回；同一连接上不同牌桌的回复可能交错。
+
+    - 计算分到 workers 个工作进程(分片)上，每张牌桌在 deal 时固定分到会话最少的分片，
+      同一张牌桌的事件在该进程中依次执行，不同牌桌并行；workers 为 0 时在本进程的一个线程中执行
+    - 每张牌桌最多排队 MAX_PENDING 个事件，满了以后暂停读取发来事件的连接，直到有空位
+    - 会话空闲超过 idle_timeout 秒后回收到工作进程的空闲池，供新牌桌复用
+    与 live.py 不同，这里不做预计算：工作进程的时间留给各牌桌实际到来的事件。
+    """
+
+    def __init__(self, workers=None, deadline_ms=None, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.deadline_ms = deadline_ms
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        if workers:
+            self.shards = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(deadline_ms,))
+                           for _ in range(workers)]
+        else:
+            _init_worker(deadline_ms)
+            self.shards = [ThreadPoolExecutor(max_workers=1)]
+        self.shard_load = [0] * len(self.shards)
+        self.tables = {}
+        self.stats = {"requests": 0, "errors": 0, "sessions": 0, "evicted": 0}
+        self.server = None
+        # 各连接的处理任务
+        self.clients = set()
+
+    # ===== 牌桌 =====
+
+    def _open(self, table):
+        if len(self.tables) >= self.max_sessions:
+            raise ValueError("会话数已达上限")
+        shard = min(range(len(self.shards)), key=self.shard_load.__getitem__)
+        self.shard_load[shard] += 1
+        entry = _Table(shard)
+        entry.task = asyncio.ensure_future(self._drain(table, entry))
+        self.tables[table] = entry
+        self.stats["sessions"] += 1
+        return entry
+
+    async def _drain(self, table, entry):
+        """依次把该牌桌排队的事件交给所在分片执行"""
+        loop = asyncio.get_running_loop()
+        executor = self.shards[entry.shard]
+        while True:
+            seat, event, future = await entry.queue.get()
+            try:
+                result = await loop.run_in_executor(executor, _handle, table, seat, event)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                entry.queue.task_done()
+
+    async def close_table(self, table):
+        """回收牌桌的会话(排队中的事件会先处理完)"""
+        entry = self.tables.pop(table, None)
+        if entry is None:
+            return
+        await entry.queue.join()
+        entry.task.cancel()
+        self.shard_load[entry.shard] -= 1
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.shards[entry.shard], _close, table)
+
+    async def _evict_idle(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60))
+            now = time.monotonic()
+            for table, entry in list(self.tables.items()):
+                if entry.queue.empty() and now - entry.last_active > self.idle_timeout:
+                    await self.close_table(table)
+                    self.stats["evicted"] += 1
+
+    # ===== 请求 =====
+
+    async def submit(self, request):
+        """
+        处理一个请求(已解码的 dict)，返回 (序号, 结果的 future)。
+        该牌桌排队已满时在这里等待(背压)。
+        """
+        table = request.get("table")
+        if table is None:
+            raise ValueError("请求中没有 table")
+        event = parse_record(request)
+        entry = self.tables.get(table)
+        if entry is None:
+            if event[0] != "DEAL":
+                raise ValueError(f"牌桌 {table} 还没有 deal 事件")
+            entry = self._open(table)
+        entry.seq += 1
+        entry.last_active = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        await entry.queue.put((request.get("seat", 0), event, future))
+        return entry.seq, future
+
+    async def _client(self, reader, writer):
+        task = asyncio.current_task()
+        self.clients.add(task)
+        task.add_done_callback(self.clients.discard)
+        lock = asyncio.Lock()
+        pending = set()
+
+        async def reply(message):
+            async with lock:
+                writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+
+        async def answer(table, seq, future):
+            try:
+                message = {"table": table, "seq": seq, "advice": await future}
+            except Exception as e:
+                self.stats["errors"] += 1
+                message = {"table": table, "seq": seq, "error": str(e)}
+            await reply(message)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.stats["requests"] += 1
+                table = None
+                try:
+                    request = json.loads(line)
+                    table = request.get("table")
+                    seq, future = await self.submit(request)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self.stats["errors"] += 1
+                    await reply({"table": table, "seq": None, "error": str(e)})
+                    continue
+                task = asyncio.ensure_future(answer(table, seq, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        # 先启动工作进程：它们在打开任何套接字之前创建，不会继承连接的文件描述符
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, _ping) for executor in self.shards))
+        self.server = await asyncio.start_server(self._client, host, port)
+        self.evictor = asyncio.ensure_future(self._evict_idle())
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.evictor.cancel()
+            # 给已断开的连接一点时间正常结束，仍未结束的取消
+            if self.clients:
+                done, running = await asyncio.wait(list(self.clients), timeout=1)
+                for task in running:
+                    task.cancel()
+            await self.server.wait_closed()
+        for entry in self.tables.values():
+            entry.task.cancel()
+        self.tables.clear()
+        for executor in self.shards:
+            executor.shutdown()
+
+
+# ===== 测试用的客户端：生成随机对局 =====
+
+async def play_stub_game(request, table, rng, seat=0):
+    """
+    在一张牌桌上进行一局随机对局，request(dict) 发送一个事件并返回服务器的回复。
+    本家按服务器的建议摸打(建议和牌则和牌)，对手随机打牌，所有人都不鸣牌。返回请求数。
+    """
+    names = tile_loader.mahjong.to_names
+    wall = tile_loader.mahjong.to_ids(deck_counter.load_deck("resources/deck"))
+    rng.shuffle(wall)
+    hands = [[wall.pop() for _ in range(HAND_SIZE)] for _ in range(PLAYERS)]
+    dealer = rng.randrange(PLAYERS)
+    await request({"table": table, "type": "deal", "dealer": dealer, "seat": seat,
+                   "hands": [names(h) if p == seat else None for p, h in enumerate(hands)]})
+    requests = 1
+
+    player = dealer
+    # 留 14 张不摸(王牌)
+    while len(wall) > 14:
+        tile = wall.pop()
+        hand = hands[player]
+        hand.append(tile)
+        if player == seat:
+            reply = await request({"table": table, "type": "draw", "player": player, "tile": names([tile])[0]})
+            requests += 1
+            action = (reply.get("advice") or {}).get("action") or ()
+            if action and action[0] == "HU":
+                await request({"table": table, "type": "hu", "player": player, "tile": names([tile])[0]})
+                return requests + 1
+            out = action[1] if action and action[0] == "DISCARD" and action[1] in hand else tile
+        else:
+            await request({"table": table, "type": "draw", "player": player})
+            requests += 1
+            out = rng.choice(hand)
+        hand.remove(out)
+        await request({"table": table, "type": "discard", "player": player, "tile": names([out])[0]})
+        requests += 1
+        player = (player + 1) % PLAYERS
+    return requests
+
+
+async def run_stub_clients(host="127.0.0.1", port=DEFAULT_PORT, tables=8, games=1, seed=0):
+    """每张牌桌一个连接，并发进行随机对局；返回请求数、出错数、耗时与延迟分位数"""
+    latencies = []
+    errors = [0]
+
+    async def client(index):
+        reader, writer = await asyncio.open_connection(host, port)
+        rng = random.Random(seed * 1000003 + index)
+
+        async def request(message):
+            start = time.perf_counter()
+            writer.write((json.dumps(message) + "\n").encode("utf-8"))
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply:
+                errors[0] += 1
+            return reply
+
+        count = 0
+        for _ in range(games):
+            count += await play_stub_game(request, f"stub-{index}", rng)
+        writer.close()
+        await writer.wait_closed()
+        return count
+
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(client(i) for i in range(tables)))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+
+    def quantile(q):
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+    return {"requests": sum(counts), "errors": errors[0], "seconds": seconds,
+            "requests_per_second": sum(counts) / seconds if seconds > 0 else 0.0,
+            "p50_ms": quantile(0.5), "p95_ms": quantile(0.95), "p99_ms": quantile(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多牌桌建议服务(127.0.0.1 上的 JSON 行协议)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认为 CPU 核数，0 表示在本进程中计算")
+    parser.add_argument("--deadline-ms", type=float, help="每次决策的时间限制(毫秒)")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="同时存在的会话数上限")
+    parser.add_argument("--stub", type=int, metavar="TABLES",
+                        help="启动服务并用该数量的测试客户端(每桌一个)进行随机对局，输出吞吐量与延迟")
+    parser.add_argument("--games", type=int, default=1, help="测试客户端每桌的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="测试客户端的随机数种子")
+    args = parser.parse_args()
+
+    async def serve():
+        server = AdviceServer(args.workers, args.deadline_ms, args.max_sessions)
+        await server.start(port=args.port)
+        try:
+            if args.stub:
+                result = await run_stub_clients(port=args.port, tables=args.stub, games=args.games, seed=args.seed)
+                print(f"{args.stub} 桌 x {args.games} 局，请求 {result['requests']}，出错 {result['errors']}，"
+                      f"用时 {result['seconds']:.2f}s，{result['requests_per_second']:.0f} 请求/秒")
+                print(f"延迟 p50 {result['p50_ms']:.2f}ms  p95 {result['p95_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms")
+            else:
+                print(f"监听 127.0.0.1:{args.port}，{server.workers} 个工作进程")
+                await server.server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
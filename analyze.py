@@ -0,0 +1,231 @@
+# analyze.py
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import json
+import sys
+import time
+
+import tile_loader
+from decision_maker import DecisionMaker
+from live import format_action
+from replay import read_lines
+from rule_engine import RuleEngine
+from state_manager import StateManager
+
+# 每个子进程任务包含的手牌数
+CHUNK_HANDS = 256
+# 每个子进程同时在途的任务数上限
+_IN_FLIGHT_PER_WORKER = 2
+
+
+def parse_hand(line):
+    """
+    解析一行手牌，返回 (手牌, 可见牌, 编号)，均为紧凑编号列表；空行返回 None。
+    - 文本格式："W1 W2 ... T9 | E E B5"，竖线后为场上可见的牌(别家弃牌、副露等)，可省略；
+      14 张时最后一张视为刚摸的牌
+    - JSON 格式：{"id": ..., "hand": ["W1", ...], "visible": ["E", ...]}，id 可省略
+    无法解析时抛出 ValueError。
+    """
+    line = line.strip()
+    if not line:
+        return None
+    to_ids = tile_loader.mahjong.to_ids
+    if line.startswith("{"):
+        record = json.loads(line)
+        names = record.get("hand") or []
+        visible = record.get("visible") or []
+        key = record.get("id")
+    else:
+        names, _, rest = line.partition("|")
+        names = names.split()
+        visible = rest.split()
+        key = None
+    hand = to_ids([name.upper() for name in names])
+    visible = to_ids([name.upper() for name in visible])
+    if len(hand) % 3 == 0 or len(hand) > 14:
+        raise ValueError(f"手牌张数不合法: {len(hand)}")
+    for tile in set(hand + visible):
+        if hand.count(tile) + visible.count(tile) > 4:
+            raise ValueError(f"{tile_loader.mahjong.get_id_name(tile)} 超过 4 张")
+    return hand, visible, key
+
+
+class HandAnalyzer:
+    """
+    对单手牌做牌效分析：向听数、进张(按扣除手牌与可见牌后的未见张数)，
+    3n+2 张时再给出最优打法(select_best_discard)与 decide_action 的建议动作。
+    一个分析器复用同一个 StateManager / RuleEngine / DecisionMaker，逐手 reset 后重新放入手牌。
+    """
+
+    def __init__(self, decide=True, deadline_ms=None):
+        self.decide = decide
+        self.deadline_ms = deadline_ms
+        self.state = StateManager()
+        self.rule_engine = RuleEngine(self.state)
+        self.decision_maker = DecisionMaker(self.rule_engine)
+
+    def analyze(self, hand, visible):
+        state = self.state
+        state.reset()
+        tiles = list(hand)
+        drawn = tiles.pop() if len(tiles) % 3 == 2 else None
+        state.initialize_hand(tiles)
+        for tile in visible:
+            state.deck_counter.discard(tile)
+        if drawn is not None:
+            state.apply(("DRAW", drawn))
+        state.current_player = 0
+
+        rule_engine = self.rule_engine
+        names = tile_loader.mahjong.to_names
+        result = {"hand": " ".join(names(sorted(hand)))}
+        result["shanten"] = rule_engine.calculate_shanten(state.hand)
+
+        if drawn is None:
+            ukeire = rule_engine.calculate_ting_tiles(state.hand)[1]
+        else:
+            discard = self.decision_maker.select_best_discard(state.hand)
+            result["discard"] = names([discard])[0]
+            # 最优打法打出后的进张
+            ukeire = rule_engine.calculate_discard_ting(state.hand)[discard][1]
+            if self.decide:
+                action = self.decision_maker.decide_action(state, drawn, self.deadline_ms)
+                result["action"] = list(action)
+                result["text"] = format_action(action)
+        result["ukeire"] = {names([tile])[0]: count for tile, count in sorted(ukeire.items())}
+        result["ukeire_total"] = sum(ukeire.values())
+        return result
+
+    def analyze_lines(self, lines):
+        """
+        分析一组 (行号, 行) ，返回 JSON 行字符串列表；无法解析或分析的行输出 {"line", "error"}。
+        """
+        output = []
+        for number, line in lines:
+            try:
+                parsed = parse_hand(line)
+                if parsed is None:
+                    continue
+                hand, visible, key = parsed
+                result = {"line": number}
+                if key is not None:
+                    result["id"] = key
+                result.update(self.analyze(hand, visible))
+            except (ValueError, KeyError, TypeError) as e:
+                result = {"line": number, "error": str(e)}
+            output.append(json.dumps(result, ensure_ascii=False))
+        return output
+
+
+# ===== 多进程 =====
+
+_worker_analyzer = None
+
+
+def _init_worker(decide, deadline_ms):
+    global _worker_analyzer
+    _worker_analyzer = HandAnalyzer(decide, deadline_ms)
+
+
+def _analyze_chunk(lines):
+    return _worker_analyzer.analyze_lines(lines)
+
+
+def _chunks(lines, size):
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        chunk.append((number, line))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_file(source, write, workers=1, chunk_size=CHUNK_HANDS, decide=True, deadline_ms=None,
+                 progress=None):
+    """
+    逐行读取 source(文件路径、.gz 或 "-")中的手牌，把每手的分析结果(JSON 行)按输入顺序交给 write。
+    workers 大于 1 时按 chunk_size 行一份分给进程池，同时在途的任务不超过
+    _IN_FLIGHT_PER_WORKER * workers 份，总是等待最早提交的一份，因此输出顺序与输入一致，
+    读取速度不会超过处理速度，内存占用与输入文件大小无关。
+    progress 为可选的回调，每完成一份任务以已输出的行数调用一次。返回输出的行数。
+    """
+    written = 0
+    chunks = _chunks(read_lines(source), chunk_size)
+
+    if workers <= 1:
+        analyzer = HandAnalyzer(decide, deadline_ms)
+        for chunk in chunks:
+            for line in analyzer.analyze_lines(chunk):
+                write(line)
+            written += len(chunk)
+            if progress is not None:
+                progress(written)
+        return written
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(decide, deadline_ms)) as pool:
+        in_flight = deque()
+        limit = _IN_FLIGHT_PER_WORKER * workers
+
+        def drain_one():
+            future, size = in_flight.popleft()
+            for line in future.result():
+                write(line)
+            return size
+
+        for chunk in chunks:
+            if len(in_flight) >= limit:
+                written += drain_one()
+                if progress is not None:
+                    progress(written)
+            in_flight.append((pool.submit(_analyze_chunk, chunk), len(chunk)))
+        while in_flight:
+            written += drain_one()
+            if progress is not None:
+                progress(written)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量牌效分析：逐行读取手牌，输出 JSONL 结果")
+    parser.add_argument("source", help="手牌文件(.gz 可直接读取)，- 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出文件(.gz 自动压缩)，默认标准输出")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数")
+    parser.add_argument("--chunk", type=int, default=CHUNK_HANDS, help="每份任务的手牌数")
+    parser.add_argument("--no-decide", action="store_true", help="不调用 decide_action，只做牌效分析")
+    parser.add_argument("--deadline-ms", type=float, help="每次决策的时间限制(毫秒)")
+    args = parser.parse_args()
+
+    if args.output == "-":
+        out = sys.stdout
+    else:
+        opener = gzip.open if args.output.endswith(".gz") else open
+        out = opener(args.output, "wt", encoding="utf-8")
+
+    start = time.perf_counter()
+
+    def write(line):
+        out.write(line + "\n")
+
+    def progress(count):
+        seconds = time.perf_counter() - start
+        print(f"\r已分析 {count} 行，{count / seconds:.0f} 行/秒", end="", file=sys.stderr)
+
+    try:
+        count = analyze_file(args.source, write, args.workers, args.chunk,
+                             not args.no_decide, args.deadline_ms, progress)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    print(file=sys.stderr)
+    print(f"共 {count} 行，用时 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# benchmark.py
+import argparse
+import json
+import random
+import sys
+import time
+
+import tile_loader
+from hand import Hand
+from state_manager import StateManager
+from rule_engine import RuleEngine
+from decision_maker import DecisionMaker
+
+BASELINE_PATH = "resources/benchmark_baseline.json"
+CORPUS_SEED = 20250101
+CORPUS_SIZE = 200
+
+_DECK = [t for t in range(tile_loader.TILE_KINDS) for _ in range(4)]
+
+
+# ===== 固定的测试牌组 =====
+
+def _complete_counts(rng):
+    """随机生成一手 4 面子 + 1 雀头的和牌(计数向量)"""
+    while True:
+        counts = [0] * tile_loader.TILE_KINDS
+        for _ in range(4):
+            if rng.random() < 0.6:
+                start = rng.randrange(3) * 9 + rng.randrange(7)
+                for t in (start, start + 1, start + 2):
+                    counts[t] += 1
+            else:
+                counts[rng.randrange(tile_loader.TILE_KINDS)] += 3
+        counts[rng.randrange(tile_loader.TILE_KINDS)] += 2
+        if max(counts) <= 4:
+            return counts
+
+
+def build_corpus(seed=CORPUS_SEED, size=CORPUS_SIZE):
+    """
+    生成固定种子的测试牌组，每类 size 手，均为 14 张：
+    - random: 从整副牌中随机抽取
+    - tenpai: 和牌去掉一张后再随机摸一张(大多为听牌或一向听)
+    - complete: 已经和牌
+    - honor: 字牌占一半左右的手牌
+    """
+    rng = random.Random(seed)
+    honors = [t for t in _DECK if tile_loader.is_honor(t)]
+    numbers = [t for t in _DECK if not tile_loader.is_honor(t)]
+    corpus = {"random": [], "tenpai": [], "complete": [], "honor": []}
+    for _ in range(size):
+        corpus["random"].append(Hand(rng.sample(_DECK, 14)))
+
+        counts = _complete_counts(rng)
+        corpus["complete"].append(Hand.from_counts(counts))
+
+        counts = _complete_counts(rng)
+        removed = rng.choice([t for t in range(tile_loader.TILE_KINDS) if counts[t]])
+        counts[removed] -= 1
+        while True:
+            drawn = rng.randrange(tile_loader.TILE_KINDS)
+            if counts[drawn] < 4:
+                counts[drawn] += 1
+                break
+        corpus["tenpai"].append(Hand.from_counts(counts))
+
+        n_honors = rng.randint(5, 9)
+        corpus["honor"].append(Hand(rng.sample(honors, n_honors) + rng.sample(numbers, 14 - n_honors)))
+    return corpus
+
+
+# ===== 计时 =====
+
+def _measure(func, items, min_time, repeat):
+    """对 items 逐个调用 func，返回每秒调用次数(取 repeat 次中最好的一次)"""
+    best = 0.0
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            for item in items:
+                func(item)
+            calls += len(items)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+class Benchmarks:
+    """对 RuleEngine / DecisionMaker 的各个热点接口计时"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.state = StateManager()
+        # 关闭缓存：测试牌组会被反复计时，缓存命中会掩盖计算本身的耗时
+        self.rule_engine = RuleEngine(self.state, cache_size=0)
+        self.decision_maker = DecisionMaker(self.rule_engine)
+
+    def _prepare(self, hand):
+        """把 14 张手牌拆成“13 张 + 刚摸的一张”，放进 StateManager"""
+        state = self.state
+        state.reset()
+        tiles = list(hand)
+        drawn = tiles.pop()
+        state.initialize_hand(tiles)
+        state.apply(("DRAW", drawn))
+        return drawn
+
+    def cases(self):
+        """返回 {名称: (函数, 输入列表)}"""
+        rule_engine = self.rule_engine
+        decision_maker = self.decision_maker
+        state = self.state
+        cases = {}
+        for kind, hands in self.corpus.items():
+            # 13 张手牌 + 别人打出的一张，用于吃/杠判断
+            pairs = []
+            for hand in hands:
+                tiles = list(hand)
+                pairs.append((Hand(tiles[:-1]), tiles[-1]))
+
+            def can_chi(pair):
+                state.current_player = 3
+                return rule_engine.can_chi(*pair)
+
+            def can_gang(pair):
+                state.current_player = 1
+                return rule_engine.can_gang(*pair)
+
+            def decide(hand):
+                drawn = self._prepare(hand)
+                state.current_player = 0
+                return decision_maker.decide_action(state, drawn)
+
+            cases[f"can_hu/{kind}"] = (rule_engine.can_hu, hands)
+            cases[f"can_chi/{kind}"] = (can_chi, pairs)
+            cases[f"can_gang/{kind}"] = (can_gang, pairs)
+            cases[f"shanten/{kind}"] = (rule_engine.calculate_shanten, hands)
+            cases[f"select_best_discard/{kind}"] = (decision_maker.select_best_discard, hands)
+            cases[f"decide_action/{kind}"] = (decide, hands)
+        return cases
+
+    def run(self, min_time=0.2, repeat=5, names=None):
+        results = {}
+        for name, (func, items) in self.cases().items():
+            if names and not any(name.startswith(n) for n in names):
+                continue
+            results[name] = _measure(func, items, min_time, repeat)
+        return results
+
+
+def compare(results, baseline, threshold):
+    """返回吞吐量低于基线 (1 - threshold) 倍的项目列表"""
+    regressions = []
+    for name, ops in results.items():
+        base = baseline.get(name)
+        if base and ops < base * (1 - threshold):
+            regressions.append((name, base, ops))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则判定与决策的性能基准")
+    parser.add_argument("--update", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=0.35, help="允许的吞吐量下降比例(相对基线)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每项至少计时的秒数")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("names", nargs="*", help="只运行以这些名称开头的项目")
+    args = parser.parse_args()
+
+    results = Benchmarks(build_corpus()).run(min_time=args.min_time, names=args.names)
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    for name, ops in results.items():
+        base = baseline.get(name)
+        change = f"{(ops / base - 1) * 100:+7.1f}%" if base else "    new"
+        print(f"{name:32s} {ops:12.0f} ops/s  {change}")
+
+    if args.update:
+        baseline.update({name: round(ops, 1) for name, ops in results.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"基线已写入 {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, base, ops in regressions:
+        print(f"性能下降: {name} {base:.0f} -> {ops:.0f} ops/s", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
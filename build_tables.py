@@ -0,0 +1,23 @@
+# build_tables.py
+import argparse
+import time
+
+import shanten
+import win_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预先生成胡牌与向听数查找表(resources/*.bin)")
+    parser.add_argument("--win-path", default=win_table.TABLE_PATH, help="胡牌表输出路径")
+    parser.add_argument("--shanten-path", default=shanten.TABLE_PATH, help="向听数表输出路径")
+    args = parser.parse_args()
+
+    for name, build, path in (("胡牌表", win_table.WinTable.write, args.win_path),
+                              ("向听数表", shanten.ShantenTable.write, args.shanten_path)):
+        start = time.perf_counter()
+        build(path)
+        print(f"{name} 已写入 {path}，用时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# danger.py
+import tile_loader
+
+_KINDS = tile_loader.TILE_KINDS
+
+# 各类牌的基础放铳风险(粗略估计，用于排序而非精确概率)
+# 数牌：每个仍可能成立的两面搭子的风险，以及嵌张/边张/单骑/双碰等其他听牌形式的风险(按未见张数折算)
+RYANMEN_RISK = 0.05
+OTHER_RISK = 0.03
+# 字牌：按场上未见张数(0..4)的风险，只剩 1 张时只可能是单骑
+HONOR_RISK = (0.0, 0.01, 0.03, 0.04, 0.04)
+
+# 对手听牌可能性的粗略估计：基础值 + 每个副露 + 每张舍牌，上限为 1
+THREAT_BASE = 0.1
+THREAT_PER_MELD = 0.25
+THREAT_PER_DISCARD = 0.02
+
+
+class DangerEstimator:
+    """
+    放铳风险(危险度)估计：对每个对手、每种牌给出打出这张牌时放铳的风险，
+    并按对手的听牌可能性加权合成为一个 34 维向量。
+
+    只使用公开信息：
+    - 现物：对手自己打过的牌，对该对手风险为 0(不能荣和自己打过的牌)
+    - 筋：对手打过 4 时，1 和 7 对他不会是 1-4/4-7 两面的听牌(2-5-8、3-6-9 同理)
+    - 壁：某张牌已经没有未见的(4 张都在本家手中、舍牌或副露里)时，用到它的两面搭子不可能存在
+    - 未见张数：字牌与单骑/双碰的风险随剩余张数降低
+
+    未见张数直接读取 remaining(DeckCounter.remaining_deck，与 StateManager 共用同一个 array)，
+    本家的手牌与舍牌也计算在内。事件只记录受影响的牌(同花色前后 3 张以内)，
+    vector() 时才重算这些牌以及未见张数有变化的牌附近的风险；合成向量也只重算这些牌，
+    只有某个对手的听牌可能性变了才整体重算，每次查询至多一次。
+    玩家编号为相对编号，0 为自己(自己的舍牌与副露不参与计算)。
+    """
+
+    def __init__(self, player_number=4, remaining=None):
+        self.player_number = player_number
+        # 未指定时视为所有牌都未见
+        self.remaining = remaining if remaining is not None else bytes([4] * _KINDS)
+        self.reset()
+
+    def reset(self):
+        players = self.player_number
+        # genbutsu[p][t]: 对手 p 是否打过 t
+        self.genbutsu = [bytearray(_KINDS) for _ in range(players)]
+        self.meld_counts = [0] * players
+        self.discard_counts = [0] * players
+        self.threat = [0.0] + [THREAT_BASE] * (players - 1)
+        # risks[p][t]: 对手 p 对牌 t 的风险(未按听牌可能性加权)
+        self.risks = [[0.0] * _KINDS for _ in range(players)]
+        self.combined = [0.0] * _KINDS
+        # 上次重算时的未见计数，以及之后需要重算风险的牌
+        self.seen = None
+        self.dirty = set()
+        self.recombine = True
+
+    # ===== 事件 =====
+
+    def add_discard(self, player_id, tile):
+        """记录一张舍牌(StateManager.add_discard 调用)"""
+        if player_id == 0:
+            return
+        self.genbutsu[player_id][tile] = 1
+        self.discard_counts[player_id] += 1
+        self.dirty.update(_neighbours(tile))
+        self._update_threat(player_id)
+
+    def add_meld(self, player_id, meld):
+        """记录一组副露(StateManager.add_meld 调用)；亮出的牌由未见计数反映"""
+        if player_id == 0:
+            return
+        self.meld_counts[player_id] += 1
+        self._update_threat(player_id)
+
+    def upgrade_gang(self, player_id, tile):
+        """对手把碰升级为杠(补杠)：副露组数不变，新亮出的牌由未见计数反映"""
+
+    def load(self, discards, melds):
+        """按各家的全部舍牌与副露一次性重建(恢复快照时使用)"""
+        self.reset()
+        for p in range(1, self.player_number):
+            genbutsu = self.genbutsu[p]
+            for tile in discards[p]:
+                genbutsu[tile] = 1
+            self.discard_counts[p] = len(discards[p])
+            self.meld_counts[p] = len(melds[p])
+            self._update_threat(p)
+
+    def _update_threat(self, player_id):
+        threat = (THREAT_BASE + THREAT_PER_MELD * self.meld_counts[player_id]
+                  + THREAT_PER_DISCARD * self.discard_counts[player_id])
+        threat = min(threat, 1.0)
+        if threat != self.threat[player_id]:
+            self.threat[player_id] = threat
+            self.recombine = True
+
+    def _update(self):
+        """重算事件与未见张数变化影响到的牌"""
+        dirty = self.dirty
+        current = bytes(self.remaining)
+        seen = self.seen
+        if current != seen:
+            if seen is None:
+                dirty.update(range(_KINDS))
+            else:
+                for t in range(_KINDS):
+                    if current[t] != seen[t]:
+                        dirty.update(_neighbours(t))
+            self.seen = current
+        if dirty:
+            for p in range(1, self.player_number):
+                self._refresh(p, dirty)
+        if self.recombine:
+            self._combine(range(_KINDS))
+            self.recombine = False
+        elif dirty:
+            self._combine(dirty)
+        dirty.clear()
+
+    # ===== 风险计算 =====
+
+    def _refresh(self, player_id, tiles):
+        genbutsu = self.genbutsu[player_id]
+        risks = self.risks[player_id]
+        unseen = self.seen
+        for t in tiles:
+            if genbutsu[t]:
+                risks[t] = 0.0
+                continue
+            left = unseen[t]
+            if tile_loader.is_honor(t):
+                risks[t] = HONOR_RISK[left]
+                continue
+            n = tile_loader.number_of(t)
+            live = 0
+            # (n-2, n-1) 两面：同时听 n-3，对方打过 n-3 则不成立(筋)；任一张已无未见则不成立(壁)
+            if n >= 3 and (n == 3 or not genbutsu[t - 3]) and unseen[t - 2] and unseen[t - 1]:
+                live += 1
+            # (n+1, n+2) 两面：同时听 n+3
+            if n <= 7 and (n == 7 or not genbutsu[t + 3]) and unseen[t + 1] and unseen[t + 2]:
+                live += 1
+            risks[t] = RYANMEN_RISK * live + OTHER_RISK * left / 4
+
+    def _combine(self, tiles):
+        risks = self.risks
+        threat = self.threat
+        combined = self.combined
+        players = range(1, self.player_number)
+        for t in tiles:
+            safe = 1.0
+            for p in players:
+                safe *= 1.0 - threat[p] * risks[p][t]
+            combined[t] = 1.0 - safe
+
+    # ===== 查询 =====
+
+    def vector(self):
+        """34 维放铳风险向量(按对手听牌可能性加权合成)，调用方不应修改"""
+        self._update()
+        return self.combined
+
+    def player_vector(self, player_id):
+        """对手 player_id 的 34 维风险向量(未加权)"""
+        self._update()
+        return self.risks[player_id]
+
+
+def _neighbours(tile):
+    """同花色中前后 3 张以内的牌(筋与壁影响到的范围)；字牌只有自己"""
+    if tile_loader.is_honor(tile):
+        return (tile,)
+    base = tile - tile_loader.number_of(tile) + 1
+    return range(max(base, tile - 3), min(base + 9, tile + 4))
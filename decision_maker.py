@@ -1,27 +1,111 @@
+import time
+
+import lru_cache
+import metrics
+import rollout
+from rule_engine import RuleEngine
+
+
+class SearchTimeout(Exception):
+    """限时搜索到达截止时间"""
+
+
 class DecisionMaker:
-    def __init__(self, rule_engine):
+    # 已经胡牌的局面分数
+    WIN_VALUE = 1000000
+    # 限时决策时逐层加深的最大深度(摸打轮数)
+    MAX_DEPTH = 4
+    # 放铳风险的权重：风险为 1 时扣的分数(evaluate_state 中 1 张进张计 5 分、1 向听计 100 分)
+    DEFENSE_WEIGHT = 500
+    # 大于 0 时，向听数不超过 PROBABILITY_MAX_SHANTEN 的局面改用“之后摸 PROBABILITY_DRAWS 次牌内
+    # 和牌的精确概率”评分：(概率 - 1) * PROBABILITY_SCALE；向听数更大的局面排在它们之后
+    PROBABILITY_DRAWS = 0
+    PROBABILITY_MAX_SHANTEN = 1
+    PROBABILITY_SCALE = 1000
+
+    def __init__(self, rule_engine, evaluator=None, search=None):
         """
         rule_engine: 一个封装了 can_hu, can_peng, can_chi, can_gang, 
-                     calculate_shanten, calculate_hand_score 等方法的对象
+                     calculate_shanten, calculate_hand_value 等方法的对象
+        evaluator: 可选的评估器。为 None 时用向听数/进张做单步评估；
+                   传入 rollout.RolloutEvaluator 时改用蒙特卡洛对局评估候选动作。
+        search: 可选的 expectimax.ExpectimaxSearch。不使用评估器时，候选动作改由它按
+                search.depth 做带置换表与剪枝的期望搜索，限时决策的逐层加深也使用它。
         """
         self.rule_engine = rule_engine
-
-    def decide_action(self, state, new_tile=None):
+        self.evaluator = evaluator
+        self.search = search
+        # 最近一次 decide_action 的搜索统计
+        self.search_stats = self._new_stats()
+        # 分阶段耗时统计(metrics.Metrics)，None 表示未开启
+        self.metrics = None
+
+    def enable_metrics(self, collector=None):
+        """开启分阶段计时与规则判定计数，返回使用的 metrics.Metrics"""
+        if self.metrics is not None:
+            self.metrics.detach(self)
+        self.metrics = collector if collector is not None else metrics.Metrics()
+        self.metrics.attach(self)
+        return self.metrics
+
+    def disable_metrics(self):
+        """关闭统计，恢复原方法(已收集的数据仍保留在返回的 Metrics 中)"""
+        collector = self.metrics
+        if collector is not None:
+            collector.detach(self)
+            self.metrics = None
+        return collector
+
+    def for_state(self, state):
+        """
+        返回作用于另一个状态(如 copy.deepcopy 得到的快照)的同类 DecisionMaker，
+        与本对象共享规则缓存、评估器和搜索(含置换表)，可在其他线程中对快照做决策而不影响原状态。
+        实例上覆盖的设置(如 PROBABILITY_DRAWS)一并复制；开启了 metrics 时新对象也记入同一个 Metrics。
+        """
+        rule_engine = RuleEngine(state, cache_size=0, cache=getattr(self.rule_engine, "cache", None))
+        clone = type(self)(rule_engine, self.evaluator, self.search)
+        for name, value in vars(self).items():
+            # metrics 包装的方法绑定在本对象上，由 attach 重新包装
+            if name not in clone.__dict__ and name not in metrics.STAGES:
+                setattr(clone, name, value)
+        if self.metrics is not None:
+            clone.metrics = self.metrics
+            self.metrics.attach(clone)
+        return clone
+
+    @staticmethod
+    def _new_stats():
+        return {"nodes": 0, "rollouts": 0, "depth": 0, "rounds": 0, "elapsed_ms": 0.0}
+
+    def decide_action(self, state, new_tile=None, deadline_ms=None):
         """
         核心决策接口：
         - state: StateManager中存储的局面信息(我的手牌, 各家舍牌, 剩余牌张, 风圈等)
         - new_tile: 对手打出的牌或我方自摸的牌
-        - current_player: 当前玩家ID, 0表示自己
+          (自摸时这张牌已经由 StateManager 加入手牌；对手打出的牌不在手牌中)
+        - state.current_player: 当前玩家ID, 0表示自己
+        - deadline_ms: 可选的时间限制(毫秒)。给出时逐步加深搜索(或分批追加对局)，
+          到时返回目前为止最好的动作；搜索统计见 self.search_stats
 
         返回值: (action_type, tile, [可能的附加信息]) 
-        例如: ("HU", tile)、("PENG", tile)、("CHI", tile, [组合])、("DISCARD", tile)
+        例如: ("HU", tile)、("PENG", tile)、("CHI", tile, [组合])、("DISCARD", tile)、("PASS", tile)
         """
-
+        start = time.perf_counter()
+        self.search_stats = self._new_stats()
+        try:
+            deadline = None if deadline_ms is None else start + deadline_ms / 1000
+            return self._decide(state, new_tile, deadline)
+        finally:
+            self.search_stats["elapsed_ms"] = (time.perf_counter() - start) * 1000
+
+    def _decide(self, state, new_tile, deadline):
         # 1. 根据规则，先收集所有可行动作
         candidate_actions = self.get_candidate_actions(state, new_tile)
 
-        # 如果没有任何动作(极少见，但也可能在特殊情况下出现)，就只好打牌
+        # 如果没有任何动作：轮到自己就只好打牌，别人出牌时则不做反应
         if not candidate_actions:
+            if not self.rule_engine.must_discard_if_none_action():
+                return ("PASS", new_tile)
             best_discard = self.select_best_discard(state.hand)
             return ("DISCARD", best_discard)
 
@@ -30,6 +114,8 @@ class DecisionMaker:
             return candidate_actions[0]
 
         # 3. 如果有多个动作，需要我们做评估再选
+        if deadline is not None:
+            return self.search_until(state, candidate_actions, deadline)
         best_action = self.select_best_action(state, candidate_actions)
         return best_action
 
@@ -37,41 +123,53 @@ class DecisionMaker:
         """
         检查所有可行操作，把它们放到列表里返回。
         """
-        hand = state.hand[:]  # 拷贝一份手牌
+        hand = state.hand  # Hand 计数向量，各判定方法都不会修改它
         actions = []
-
-        # -- 先判断胡 --
-        if new_tile is not None and self.rule_engine.can_hu(hand, new_tile):
-            actions.append(("HU", new_tile))
-
-        # -- 判断杠 --
-        # 包括碰后加杠、明杠(对手打出)等多种情况
-        if new_tile is not None and self.rule_engine.can_gang(hand, new_tile)[0]:
-            actions.append(("GANG", new_tile))
-        # 如果是暗杠(自摸并且手里有4张某张牌)
-        possible_dark_gangs = self.rule_engine.check_dark_gang(hand)
-        for tile in possible_dark_gangs:
-            actions.append(("AN GANG", tile))
-
-        # -- 判断碰 --
-        if new_tile is not None and self.rule_engine.can_peng(hand, new_tile):
-            actions.append(("PENG", new_tile))
-
-        # -- 判断吃 (只在上家出牌时有效) --
-        if new_tile is not None and self.rule_engine.can_chi(hand, new_tile) != []:
-            # 可能一个牌可以吃出多种组合(如3,4,5和4,5,6)
-            for combo in self.rule_engine.can_chi(hand, new_tile):
-                actions.append(("CHI", new_tile, combo))
+        own_turn = self.rule_engine.must_discard_if_none_action()
+
+        # 规则判定以“新牌尚未入手”为准，自摸时先临时把这张牌拿出来
+        if own_turn and new_tile is not None:
+            hand.remove(new_tile)
+        try:
+            # -- 先判断胡 --
+            if new_tile is not None and self.rule_engine.can_hu(hand, new_tile):
+                actions.append(("HU", new_tile))
+
+            # -- 判断杠 --
+            # 包括碰后加杠、明杠(对手打出)等多种情况
+            if new_tile is not None and self.rule_engine.can_gang(hand, new_tile)[0]:
+                actions.append(("GANG", new_tile))
+
+            if not own_turn:
+                # -- 判断碰 --
+                if new_tile is not None and self.rule_engine.can_peng(hand, new_tile):
+                    actions.append(("PENG", new_tile))
+
+                # -- 判断吃 (只在上家出牌时有效) --
+                # 可能一个牌可以吃出多种组合(如3,4,5和4,5,6)
+                if new_tile is not None:
+                    for combo in self.rule_engine.can_chi(hand, new_tile):
+                        actions.append(("CHI", new_tile, combo))
+
+                # 别人出牌时，也可以选择不吃不碰
+                if actions:
+                    actions.append(("PASS", new_tile))
+        finally:
+            if own_turn and new_tile is not None:
+                hand.add(new_tile)
 
         # 注意：此时我们还没把“打牌”加到 actions 中，因为“打牌”本身往往是在
         # “不吃、不碰、不杠、不胡”之后才做。但是有些人也会把"DISCARD"看作一种
         # 候选动作，放进来一起比较，这也行。
 
         # 如果在轮到自己出牌(没有新_tile 或者选择不吃碰杠)，那就一定要打牌
-        # 这里仅示例说明：
-        if new_tile is None or self.rule_engine.must_discard_if_none_action(): 
+        if new_tile is None or own_turn:
+            # 如果是暗杠(自摸并且手里有4张某张牌)
+            for tile in self.rule_engine.check_dark_gang(hand):
+                if ("GANG", tile) not in actions:
+                    actions.append(("AN GANG", tile))
             # 说明这是自己摸牌后的回合，需要打牌
-            for tile in set(hand):
+            for tile in hand.distinct():
                 actions.append(("DISCARD", tile))
 
         return actions
@@ -79,89 +177,246 @@ class DecisionMaker:
     def select_best_action(self, state, candidate_actions):
         """
         在多个可行动作中，通过“模拟+评估”选出最优动作。
+        每个动作都在同一个 state 上原地执行，评估后立即撤销，不拷贝状态。
         """
+        if self.evaluator is not None:
+            stats = self.evaluate_actions_rollout(state, candidate_actions)
+            # 先比期望得分，再比和牌率
+            best_index = max(range(len(candidate_actions)), key=lambda i: (stats[i][1], stats[i][0]))
+            return candidate_actions[best_index]
+
         best_score = -999999
         best_act = None
+        depth = self.search.depth if self.search is not None else 1
 
         for action in candidate_actions:
-            # 1. 模拟执行该动作
-            simulated_state = self.simulate_action(state, action)
-            
-            # 2. 对模拟后的状态打分
-            score = self.evaluate_state(simulated_state)
-            
-            # 3. 记录最高分的动作
+            # 模拟执行该动作，对模拟后的状态打分，然后撤销模拟
+            score = self.score_action(state, action, depth) - self.discard_risk(state, action)
+
+            # 记录最高分的动作
             if score > best_score:
                 best_score = score
                 best_act = action
 
         return best_act
 
-    def simulate_action(self, state, action):
+    def search_until(self, state, candidate_actions, deadline):
+        """
+        限时搜索：先用单步评估得到一个结果，保证随时可以返回；之后在截止时间前
+        - 若配置了蒙特卡洛评估器，则一轮轮为每个动作追加对局并累计统计：第一轮每个动作 1 次，
+          之后按已测得的耗时把每轮的对局数定为剩余时间内做得完的数目(不超过 batch)；
+          到时未完成的一轮中已完成的对局也计入统计，每个动作都至少有 1 次对局后即按累计统计更新最优动作；
+        - 否则逐层加深“摸牌-打牌”的期望搜索，只有完整完成的一层才会更新当前最优动作。
+        """
+        best_act = self.select_best_action_heuristic(state, candidate_actions)
+        self.search_stats["depth"] = 1
+
+        if self.evaluator is not None:
+            totals = [[0, 0.0, 0] for _ in candidate_actions]
+            round_index = 0
+            per_action = 1
+            start = time.perf_counter()
+            while time.perf_counter() < deadline:
+                round_totals = self.rollout_totals(state, candidate_actions, per_action, round_index,
+                                                   deadline, self.evaluator.task_size)
+                for acc, part in zip(totals, round_totals):
+                    acc[0] += part[0]
+                    acc[1] += part[1]
+                    acc[2] += part[2]
+                round_index += 1
+                sampled = min(t[2] for t in totals)
+                if sampled:
+                    self.search_stats["rounds"] = round_index
+                    rates = [rollout.to_rates(t) for t in totals]
+                    best_index = max(range(len(candidate_actions)), key=lambda i: (rates[i][1], rates[i][0]))
+                    best_act = candidate_actions[best_index]
+                    # 每个动作各做一次对局的耗时，据此决定下一轮的对局数
+                    cost = (time.perf_counter() - start) / sampled
+                    per_action = int((deadline - time.perf_counter()) / cost)
+                    per_action = max(1, min(per_action, self.evaluator.batch))
+            return best_act
+
+        depth = 2
+        while depth <= self.MAX_DEPTH and time.perf_counter() < deadline:
+            try:
+                scores = [self.score_action(state, action, depth, deadline) - self.discard_risk(state, action)
+                          for action in candidate_actions]
+            except SearchTimeout:
+                break
+            best_index = max(range(len(candidate_actions)), key=lambda i: scores[i])
+            best_act = candidate_actions[best_index]
+            self.search_stats["depth"] = depth
+            depth += 1
+        return best_act
+
+    def select_best_action_heuristic(self, state, candidate_actions):
+        """不使用评估器与搜索，按单步向听/进张评估选出最优动作"""
+        evaluator = self.evaluator
+        search = self.search
+        self.evaluator = None
+        self.search = None
+        try:
+            return self.select_best_action(state, candidate_actions)
+        finally:
+            self.evaluator = evaluator
+            self.search = search
+
+    def score_action(self, state, action, depth, deadline=None):
+        """
+        模拟执行动作后的局面价值。depth 为 1 时直接评估；更大时继续向下
+        展开 depth-1 轮“摸牌-打牌”，摸牌按剩余张数加权取期望，打牌取最优。
+        配置了 search 时交给 ExpectimaxSearch(置换表 + 剪枝)。
         """
-        基于当前 state，模拟执行给定动作(吃/碰/杠/胡/打牌)，返回“新”状态。
-        该新状态只用于评估，不会真正改动传进来的原state。
+        if self.search is not None:
+            return self.search.score_action(self, state, action, depth, deadline)
+        mark = len(state.journal)
+        self.simulate_action(state, action)
+        try:
+            return self.expected_value(state, depth - 1, deadline)
+        finally:
+            state.undo_to(mark)
+
+    def expected_value(self, state, depth, deadline=None):
+        """机会节点：对下一张摸牌按 DeckCounter 剩余张数加权求期望"""
+        if depth <= 0 or state.has_won:
+            return self.evaluate_state(state)
+        if deadline is not None and time.perf_counter() >= deadline:
+            raise SearchTimeout()
+
+        remaining = state.deck_counter.remaining_deck
+        value = 0.0
+        total = 0
+        for tile in range(len(remaining)):
+            count = remaining[tile]
+            if count == 0:
+                continue
+            state.apply(("DRAW", tile))
+            try:
+                if self.rule_engine.can_hu(state.hand):
+                    tile_value = self.WIN_VALUE
+                else:
+                    tile_value = max(self.score_action(state, ("DISCARD", d), depth, deadline)
+                                     for d in state.hand.distinct())
+            finally:
+                state.undo()
+            value += count * tile_value
+            total += count
+        if total == 0:
+            return self.evaluate_state(state)
+        return value / total
+
+    def evaluate_actions_rollout(self, state, candidate_actions):
         """
-        import copy
-        new_state = copy.deepcopy(state)
+        用蒙特卡洛对局评估每个候选动作，返回与 candidate_actions 对应的
+        [(和牌率, 期望得分), ...]。
+        """
+        totals = self.rollout_totals(state, candidate_actions, self.evaluator.rollouts)
+        return [rollout.to_rates(t) for t in totals]
+
+    def rollout_totals(self, state, candidate_actions, rollouts, round_index=0, deadline=None, task_size=None):
+        """
+        为每个候选动作做 rollouts 次随机对局，返回 [和牌次数, 总得分, 对局次数] 列表。
+        每个动作模拟执行后打包成任务立即撤销，任务统一交给评估器的进程池执行；
+        task_size 为每份任务的对局数(见 RolloutEvaluator.make_tasks)。
+        """
+        tasks_per_action = []
+        for index, action in enumerate(candidate_actions):
+            if action[0] == "HU":
+                tasks_per_action.append([])
+                continue
+
+            depth = len(state.journal)
+            self.simulate_action(state, action)
+            if action[0] == "PASS":
+                # 不吃不碰时，由出牌者的下家开始摸牌
+                offset = -(state.current_player + 1) % 4
+            elif action[0] == "GANG" or action[0] == "AN GANG":
+                # 杠后马上补一张
+                offset = 0
+            else:
+                # 本家打出一张后，其余三家先摸
+                offset = 3
+            tasks_per_action.append(
+                self.evaluator.make_tasks(state, index, offset, rollouts, round_index, task_size))
+            state.undo_to(depth)
+
+        totals = self.evaluator.collect(tasks_per_action, deadline)
+        self.search_stats["rollouts"] += sum(t[2] for t in totals)
+        for index, action in enumerate(candidate_actions):
+            if action[0] == "HU":
+                # 直接和牌：每一局都算和牌。荣和时和的牌还不在手中，计分前临时加入
+                hand = state.hand
+                ron = hand.size % 3 == 1
+                if ron:
+                    hand.add(action[1])
+                try:
+                    score = rollout.score_win(hand.counts, state.melds[0], self_drawn=not ron)
+                finally:
+                    if ron:
+                        hand.remove(action[1])
+                totals[index] = [rollouts, score * rollouts, rollouts]
+        return totals
 
+    def simulate_action(self, state, action):
+        """
+        基于当前 state，模拟执行给定动作(吃/碰/杠/胡/打牌)。
+        动作通过 state.apply() 原地执行并记入 journal，调用方评估后需用
+        state.undo_to(执行前的 len(state.journal)) 撤销。
+        """
         act_type = action[0]
-        tile = action[1]
-
-        if act_type == "HU":
-            # 标记new_state某个字段为“胡了”，或直接给new_state加上某些胜利标记
-            new_state.has_won = True
-            # 评估时可以直接给一个超级高分
-            return new_state
-
-        elif act_type == "GANG":
-            # 从手牌移除3张或4张 tile，或从meld变成杠
-            self.handle_gang(new_state, tile)
-            # 通常还会“补牌”，这里可以简单忽略或做随机处理
-            return new_state
-
-        elif act_type == "PENG":
-            # 从手牌移除2张 tile，加到meld中
-            self.handle_peng(new_state, tile)
-            # 然后还需要打牌(碰之后要出一张牌)
+
+        if act_type == "PASS":
+            # 不做反应，局面不变
+            return state
+
+        state.apply(action)
+
+        if act_type == "PENG" or act_type == "CHI":
+            # 碰/吃之后还需要打牌
             # 在这里可以考虑“自动选一张最好的牌打”或在评估时再深一层模拟
-            # 这里演示简单做法：自动打出最差的那张
-            discard_tile = self.select_best_discard(new_state.hand)
-            new_state.hand.remove(discard_tile)
-            new_state.discards[0].append(discard_tile)
-            return new_state
-
-        elif act_type == "CHI":
-            # action形如 ("CHI", tile, comb)
-            comb = action[2]
-            self.handle_chi(new_state, tile, comb)
-            # 吃完也要打牌
-            discard_tile = self.select_best_discard(new_state.hand)
-            new_state.hand.remove(discard_tile)
-            new_state.discards[0].append(discard_tile)
-            return new_state
-
-        elif act_type == "DISCARD":
-            # 打牌动作
-            if tile in new_state.hand:
-                new_state.hand.remove(tile)
-                new_state.discards[0].append(tile)
-            return new_state
+            # 这里演示简单做法：自动打出最好的那张
+            discard_tile = self.select_best_discard(state.hand)
+            state.apply(("DISCARD", discard_tile))
 
+        # 杠之后通常还会“补牌”，这里可以简单忽略或做随机处理
         # 如果还有别的动作类型，在这里补充
-        return new_state
+        return state
 
     def evaluate_state(self, state):
         """
         对当前局面进行打分:
         1. 如果已经胡了(如 simulate_action 中标记了 has_won)，给高分
         2. 否则，根据向听数、听牌张数等进行估分
+        RuleEngine 带有缓存时，结果按 (score_settings(), lru_cache.state_key(state)) 缓存。
+        """
+        self.search_stats["nodes"] += 1
+        cache = getattr(self.rule_engine, "cache", None)
+        if cache is not None:
+            key = ("evaluate_state", self.score_settings(), lru_cache.state_key(state))
+            return cache.get_or_compute(key, self._evaluate_state, state)
+        return self._evaluate_state(state)
+
+    def score_settings(self):
         """
+        影响打分的设置，作为 evaluate_state 缓存键与搜索置换表键的一部分：
+        共享的缓存在这些设置(类属性或实例属性)改变后不会返回按旧设置算出的分数。
+        """
+        return (self.WIN_VALUE, self.DEFENSE_WEIGHT, self.PROBABILITY_DRAWS,
+                self.PROBABILITY_MAX_SHANTEN, self.PROBABILITY_SCALE)
+
+    def _evaluate_state(self, state):
         if getattr(state, "has_won", False) is True:
-            return 1000000  # 一个非常大的分数
+            return self.WIN_VALUE  # 一个非常大的分数
 
         # 计算向听数(离胡牌差几步)
         shanten = self.rule_engine.calculate_shanten(state.hand)
+
+        if self.PROBABILITY_DRAWS > 0:
+            if shanten <= self.PROBABILITY_MAX_SHANTEN:
+                probability = self.rule_engine.calculate_win_probability(state.hand, self.PROBABILITY_DRAWS)
+                return (probability - 1) * self.PROBABILITY_SCALE
+            return -self.PROBABILITY_SCALE - (shanten - self.PROBABILITY_MAX_SHANTEN) * 100
+
         # 可以简单地把分数设为负的向听数(向听数越小分数越高)
         score = -shanten * 100
 
@@ -173,58 +428,40 @@ class DecisionMaker:
         # 你也可以加入更多因素，比如副露数量、防守安全度等等
         return score
 
-    def select_best_discard(self, hand):
+    def danger_vector(self):
+        """StateManager 维护的 34 维放铳风险向量；rule_engine 不带 StateManager 时返回 None"""
+        state_manager = getattr(self.rule_engine, "state_manager", None)
+        estimator = getattr(state_manager, "danger", None)
+        return None if estimator is None else estimator.vector()
+
+    def discard_risk(self, state, action):
+        """打牌动作的放铳风险扣分(与 evaluate_state 同一单位)，其他动作为 0"""
+        estimator = getattr(state, "danger", None)
+        if action[0] != "DISCARD" or estimator is None or not self.DEFENSE_WEIGHT:
+            return 0.0
+        return self.DEFENSE_WEIGHT * estimator.vector()[action[1]]
+
+    def select_best_discard(self, hand, danger=None):
         """
         在没有其他操作时，决定打哪张牌。
-        这里以“使向听数最优”为例——遍历手牌，每打出去一张，就算一下新的向听数，选向听数最低的。
+        这里以“使向听数最优”为例——遍历手牌，每打出去一张，就算一下新的向听数，选向听数最低的；
+        向听数相同时，比较 进张数*5 - DEFENSE_WEIGHT*放铳风险(与 evaluate_state 同一单位)。
+        danger 为 34 维风险向量，默认取 StateManager 中增量维护的向量。
         """
         best_tile = None
-        best_shanten = 99
-
-        for tile in set(hand):
-            temp_hand = hand[:]
-            temp_hand.remove(tile)
-            shanten = self.rule_engine.calculate_shanten(temp_hand)
-            if shanten < best_shanten:
-                best_shanten = shanten
+        best_key = None
+
+        if danger is None:
+            danger = self.danger_vector()
+        weight = self.DEFENSE_WEIGHT if danger is not None else 0
+        options = self.rule_engine.calculate_discard_ting(hand)
+        for tile, (shanten, ting_tiles) in options.items():
+            value = sum(ting_tiles.values()) * 5
+            if weight:
+                value -= weight * danger[tile]
+            key = (-shanten, value)
+            if best_key is None or key > best_key:
+                best_key = key
                 best_tile = tile
 
         return best_tile
-
-    # ===== 以下几个 handle_xxx 函数是模拟动作的具体逻辑 =====
-
-    def handle_gang(self, state, tile):
-        """
-        模拟杠: 具体要从手牌删除4张(或从碰面子中再加1张变杠)等等。
-        """
-        # 简化示例：假设是手里4张暗杠
-        for _ in range(4):
-            state.hand.remove(tile)
-        # melds[0]表示自己副露
-        state.melds[0].append(("GANG", tile))
-
-        # 一般还需要从牌山摸一张补牌，这里可忽略或随机抽
-        # state.hand.append( ... )
-
-    def handle_peng(self, state, tile):
-        """
-        模拟碰：从手牌删除2张tile，加到meld里
-        """
-        count_removed = 0
-        new_hand = []
-        for t in state.hand:
-            if t == tile and count_removed < 2:
-                count_removed += 1
-            else:
-                new_hand.append(t)
-        state.hand = new_hand
-        state.melds[0].append(("PENG", tile))
-
-    def handle_chi(self, state, tile, comb):
-        """
-        模拟吃：从手牌中删除 comb(例: [3筒, 4筒])，加上 tile(例: 5筒)
-        comb 是已经包含tile的完整顺子，也可以不包含，需要你自己定。
-        """
-        for c in comb:
-            state.hand.remove(c)
-        state.melds[0].append(("CHI", comb))
\ No newline at end of file
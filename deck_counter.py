@@ -1,62 +1,159 @@
 # deck_counter.py
-from collections import Counter
+from array import array
 import random
 
+import tile_loader
+
+_KINDS = tile_loader.TILE_KINDS
+# 树状数组下降查找时的起始步长：不小于 34 的最大 2 的幂
+_TOP_STEP = 32
+
 class DeckCounter:
-    def __init__(self, deck_list):
+    def __init__(self, deck_list, seed=None, verbose=False):
         """
         初始化牌组计数器。
-        """
+        deck_list 为牌的紧凑编号列表；seed 为随机数种子，便于模拟时复现；
+        verbose 为 True 时每次摸牌都打印信息(交互调试用，模拟时应保持 False)。
 
-        self.initial_deck = Counter(deck_list)  # 保存初始牌组
+        剩余牌以 34 格计数(array)保存，另维护一棵树状数组(Fenwick tree)记录前缀和，
+        按剩余张数加权随机摸牌、移除或放回指定牌都只需 O(log 34)。
+        """
+        self.initial_deck = array("b", bytes(_KINDS))  # 保存初始牌组
+        for t in deck_list:
+            self.initial_deck[t] += 1
         self.initial_deck_list = deck_list
 
-        self.remaining_deck = self.initial_deck.copy()  # 剩余牌组计数器
-        self.ramaining_deck_list = self.initial_deck_list
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+
+        self.remaining_deck = array("b", self.initial_deck)  # 剩余牌组计数器
+        self.total = 0
+        self.tree = array("i", bytes(4 * (_KINDS + 1)))
+        self._rebuild()
+
+    def _rebuild(self):
+        """由 remaining_deck 重建树状数组与总张数"""
+        tree = self.tree
+        for i in range(_KINDS + 1):
+            tree[i] = 0
+        for t in range(_KINDS):
+            i = t + 1
+            tree[i] += self.remaining_deck[t]
+            parent = i + (i & -i)
+            if parent <= _KINDS:
+                tree[parent] += tree[i]
+        self.total = sum(self.remaining_deck)
+
+    def _update(self, tile, delta):
+        self.remaining_deck[tile] += delta
+        self.total += delta
+        tree = self.tree
+        i = tile + 1
+        while i <= _KINDS:
+            tree[i] += delta
+            i += i & -i
+
+    def seed(self, seed):
+        """重新设置随机数种子"""
+        self.rng.seed(seed)
 
     def draw_random(self):
         """
-        从剩余的牌堆中随机抽取一张牌。
+        从剩余的牌堆中随机抽取一张牌，每张牌被抽中的概率与其剩余张数成正比。
+        返回抽到的牌；牌堆为空时返回 None。
         """
-        draw_item = random.choice(self.ramaining_deck_list)
-        self.remaining_deck[draw_item] -= 1
-        self.ramaining_deck_list.remove(draw_item)
-        print(f"Drew {draw_item}. Remaining: {self.remaining_deck[draw_item]}")
+        if self.total <= 0:
+            return None
+        r = self.rng.randrange(self.total)
+        # 在树状数组上自顶向下查找第一个前缀和大于 r 的位置
+        tree = self.tree
+        pos = 0
+        step = _TOP_STEP
+        while step:
+            nxt = pos + step
+            if nxt <= _KINDS and tree[nxt] <= r:
+                pos = nxt
+                r -= tree[nxt]
+            step >>= 1
+        draw_item = pos
+        self._update(draw_item, -1)
+        if self.verbose:
+            print(f"Drew {draw_item}. Remaining: {self.remaining_deck[draw_item]}")
+        return draw_item
 
     def discard(self, tile):
         """
-        弃掉一张牌（将其移出计数器）。输入要弃掉的牌名。
+        弃掉一张牌（将其移出计数器）。输入要弃掉的牌的编号。
+        返回是否成功；已经没有这张牌时不做修改，只在 verbose 时打印提示。
         """
         if self.remaining_deck[tile] > 0:
-            self.remaining_deck[tile] -= 1
-            self.ramaining_deck_list.remove(tile)
-        else:
+            self._update(tile, -1)
+            return True
+        if self.verbose:
             print(f"Cannot discard {tile}, none left in the deck.")
+        return False
 
-    # def add_tile(self, tile):
-    #     """
-    #     将牌放回牌组。输入要放回的牌名。
-    #     """
-    #     if self.remaining_deck[tile] < self.initial_deck[tile]:
-    #         self.remaining_deck[tile] += 1
-    #         print(f"Added {tile} back to deck. Now: {self.remaining_deck[tile]}")
-    #     else:
-    #         print(f"Cannot add {tile}, already at maximum count.")
+    def add_tile(self, tile):
+        """
+        将牌放回牌组。输入要放回的牌的编号。
+        返回是否成功；已达初始张数时不做修改，只在 verbose 时打印提示。
+        """
+        if self.remaining_deck[tile] < self.initial_deck[tile]:
+            self._update(tile, 1)
+            if self.verbose:
+                print(f"Added {tile} back to deck. Now: {self.remaining_deck[tile]}")
+            return True
+        if self.verbose:
+            print(f"Cannot add {tile}, already at maximum count.")
+        return False
 
     def remaining(self):
         """
-        获取当前剩余的牌组，返回牌名及其剩余数量。
+        获取当前剩余的牌组，返回牌的编号及其剩余数量。
+        """
+        return {tile: count for tile, count in enumerate(self.remaining_deck) if count > 0}
+
+    def copy(self):
+        """
+        复制一份牌组计数器，供模拟使用。只复制两个定长数组，不复制牌列表；
+        副本使用由当前随机数生成器派生的独立种子。
+        """
+        new_deck = DeckCounter.__new__(DeckCounter)
+        new_deck.initial_deck = self.initial_deck
+        new_deck.initial_deck_list = self.initial_deck_list
+        new_deck.rng = random.Random(self.rng.getrandbits(64))
+        new_deck.verbose = self.verbose
+        new_deck.remaining_deck = array("b", self.remaining_deck)
+        new_deck.total = self.total
+        new_deck.tree = array("i", self.tree)
+        return new_deck
+
+    def restore(self, snapshot):
+        """
+        把剩余牌恢复为 snapshot(此前 copy() 得到的副本)中的状态，原地覆盖，不分配新对象。
+        """
+        self.remaining_deck[:] = snapshot.remaining_deck
+        self.tree[:] = snapshot.tree
+        self.total = snapshot.total
+
+    def set_remaining(self, counts):
+        """
+        用 34 格计数(array、memoryview 等)原地覆盖剩余牌，并重建树状数组。
         """
-        print(self.ramaining_deck_list)
-        return {tile: count for tile, count in self.remaining_deck.items() if count > 0}
+        memoryview(self.remaining_deck)[:] = counts
+        self._rebuild()
 
     def reset(self):
         """
         重置牌组到初始状态。
         """
-        self.remaining_deck = self.initial_deck.copy()
-        self.ramaining_deck_list = self.initial_deck
-        print("Deck has been reset.")
+        self.remaining_deck[:] = self.initial_deck
+        self._rebuild()
+        if self.verbose:
+            print("Deck has been reset.")
+
+    def __len__(self):
+        return self.total
 
 
 # 创建牌组计数器
@@ -64,7 +161,7 @@ class DeckCounter:
 def load_deck(filename):
     with open(filename, 'r') as file:
         return file.readline().strip().split(",")
-    
+
 
 
 # 测试操作
@@ -73,10 +170,10 @@ def load_deck(filename):
 
 # print(deck.remaining())  # 查看剩余牌
 
-# deck.discard('B1')       # 弃牌
+# deck.discard(0)          # 弃牌
 # print(deck.remaining())  # 再次查看剩余牌
 
-# # deck.add_tile('Dot 5')   # 将牌放回
+# deck.add_tile(0)         # 将牌放回
 # print(deck.remaining())  # 检查放回后的状态
 
 # deck.reset()             # 重置牌组
@@ -0,0 +1,180 @@
+# expectimax.py
+import random
+import time
+
+import tile_loader
+from decision_maker import SearchTimeout
+from lru_cache import LRUCache
+from ukeire import UkeireCalculator
+
+# 置换表的条目数上限
+TT_SIZE = 1 << 18
+# Zobrist 随机键的种子，固定后同一局面在不同进程中得到同样的哈希
+ZOBRIST_SEED = 20250301
+# 一种牌在手中/未见的张数为 0..4
+_MAX_COUNT = 5
+_MELD_TYPES = ("CHI", "PENG", "GANG")
+_MASK = (1 << 64) - 1
+
+
+class ZobristKeys:
+    """
+    局面的 Zobrist 哈希：每种牌的每个手牌张数、每个未见张数各有一个 64 位随机键，
+    局面的哈希为对应键的异或。摸/打一张牌时只需异或掉旧张数的键、异或上新张数的键。
+    副露在搜索树内不变，按 (类型, 最小的牌) 取键后相加(相同的两组吃不会互相抵消)。
+    """
+
+    def __init__(self, seed=ZOBRIST_SEED):
+        rng = random.Random(seed)
+        kinds = tile_loader.TILE_KINDS
+        self.hand = [[rng.getrandbits(64) for _ in range(_MAX_COUNT)] for _ in range(kinds)]
+        self.remaining = [[rng.getrandbits(64) for _ in range(_MAX_COUNT)] for _ in range(kinds)]
+        self.melds = [[rng.getrandbits(64) for _ in range(kinds)] for _ in _MELD_TYPES]
+        # 区分同一局面上的机会节点/决策节点以及剩余深度
+        self.chance = [rng.getrandbits(64) for _ in range(16)]
+        self.decision = [rng.getrandbits(64) for _ in range(16)]
+
+    def state_hash(self, state):
+        """按 StateManager 的本家手牌、未见计数与副露计算哈希"""
+        counts = state.hand.counts
+        remaining = state.deck_counter.remaining_deck
+        key = 0
+        for tile in range(tile_loader.TILE_KINDS):
+            key ^= self.hand[tile][counts[tile]] ^ self.remaining[tile][remaining[tile]]
+        melds = 0
+        for meld in state.melds[0]:
+            melds += self.melds[_MELD_TYPES.index(meld["type"])][min(meld["tile"])]
+        return key ^ (melds & _MASK)
+
+    def draw(self, key, tile, count, remaining):
+        """手中原有 count 张、未见 remaining 张的 tile 摸进一张后的哈希"""
+        hand = self.hand[tile]
+        left = self.remaining[tile]
+        return key ^ hand[count] ^ hand[count + 1] ^ left[remaining] ^ left[remaining - 1]
+
+    def discard(self, key, tile, count):
+        """手中原有 count 张的 tile 打出一张后的哈希(自己打出的牌已不在未见计数中)"""
+        hand = self.hand[tile]
+        return key ^ hand[count] ^ hand[count - 1]
+
+
+class ExpectimaxSearch:
+    """
+    本家手牌的限深期望极大搜索：机会节点按 DeckCounter 的剩余张数对下一张摸牌加权求期望，
+    决策节点在和牌/打牌中取最大；叶子局面用 DecisionMaker.evaluate_state 打分。
+
+    - 置换表：局面以 Zobrist 哈希(手牌计数 + 未见计数 + 副露，再区分节点类型与剩余深度)
+      与 DecisionMaker.score_settings() 为键，存入有容量上限的 LRUCache。不同的摸打顺序到达同一手牌时直接复用，跨多次决策也有效。
+    - 剪枝(prune=True)：机会节点只展开能减少向听数的摸牌；其余摸牌视为摸切，合并为一个
+      “手牌不变、少一轮”的分支(不扣减这些牌的未见张数)。决策节点只考虑打出后向听数最小的牌。
+      prune=False 时与 DecisionMaker.expected_value 一样展开所有摸牌与打法。
+
+    深度与 DecisionMaker.score_action 一致：depth 为 1 时直接评估动作后的局面，
+    每多 1 层多展开一轮“摸牌-打牌”。树内只有本家的摸打，不模拟对手的打牌与鸣牌；
+    吃/碰/杠等鸣牌只出现在根节点的候选动作中。
+
+    通过 DecisionMaker(rule_engine, search=ExpectimaxSearch()) 接入：select_best_action 按
+    self.depth 搜索，search_until 的逐层加深也改用本搜索。
+    """
+
+    def __init__(self, depth=2, tt_size=TT_SIZE, prune=True, seed=ZOBRIST_SEED):
+        self.depth = depth
+        self.prune = prune
+        self.keys = ZobristKeys(seed)
+        self.table = LRUCache(tt_size)
+
+    def stats(self):
+        """置换表的命中统计(lru_cache.LRUCache.stats)"""
+        return self.table.stats()
+
+    def score_action(self, decision_maker, state, action, depth, deadline=None):
+        """
+        在 state 上模拟执行 action，返回搜索 depth-1 轮摸打后的期望价值，之后撤销。
+        吃/碰不经过 simulate_action 的自动打牌，由决策节点选择打哪张(不消耗深度)。
+        """
+        mark = len(state.journal)
+        if action[0] == "CHI" or action[0] == "PENG":
+            state.apply(action)
+        else:
+            decision_maker.simulate_action(state, action)
+        try:
+            key = self.keys.state_hash(state)
+            if state.hand.size % 3 == 2:
+                return self._decision(decision_maker, state, key, depth, deadline)
+            return self._chance(decision_maker, state, key, depth - 1, deadline)
+        finally:
+            state.undo_to(mark)
+
+    def _chance(self, decision_maker, state, key, depth, deadline):
+        """机会节点：本家 3n+1 张，对下一张摸牌求期望"""
+        if depth <= 0 or state.has_won:
+            return decision_maker.evaluate_state(state)
+        if deadline is not None and time.perf_counter() >= deadline:
+            raise SearchTimeout()
+        node_key = ("expectimax", decision_maker.score_settings(), key ^ self.keys.chance[depth])
+        value = self.table.get(node_key)
+        if value is not None:
+            return value
+
+        hand = state.hand
+        remaining = state.deck_counter.remaining_deck
+        if self.prune:
+            calc = UkeireCalculator(hand.counts, hand.size)
+            tiles = sorted(calc.ukeire(remaining)[1].items())
+        else:
+            tiles = [(tile, count) for tile, count in enumerate(remaining)]
+
+        total = 0
+        value = 0.0
+        for tile, count in tiles:
+            if count <= 0:
+                continue
+            child = self.keys.draw(key, tile, hand.counts[tile], count)
+            state.apply(("DRAW", tile))
+            try:
+                value += count * self._decision(decision_maker, state, child, depth, deadline)
+            finally:
+                state.undo()
+            total += count
+
+        if self.prune:
+            # 不能减少向听数的摸牌：摸切，手牌不变
+            miss = sum(remaining) - total
+            if miss > 0:
+                value += miss * self._chance(decision_maker, state, key, depth - 1, deadline)
+                total += miss
+
+        value = value / total if total else decision_maker.evaluate_state(state)
+        self.table.put(node_key, value)
+        return value
+
+    def _decision(self, decision_maker, state, key, depth, deadline):
+        """决策节点：本家 3n+2 张，能和则和，否则选打出后期望价值最高的牌"""
+        rule_engine = decision_maker.rule_engine
+        if rule_engine.can_hu(state.hand):
+            return decision_maker.WIN_VALUE
+        node_key = ("expectimax", decision_maker.score_settings(), key ^ self.keys.decision[depth])
+        value = self.table.get(node_key)
+        if value is not None:
+            return value
+
+        hand = state.hand
+        if self.prune:
+            options = UkeireCalculator(hand.counts, hand.size).discard_shanten()
+            lowest = min(options.values())
+            discards = sorted(tile for tile, shanten in options.items() if shanten == lowest)
+        else:
+            discards = hand.distinct()
+
+        best = None
+        for tile in discards:
+            child = self.keys.discard(key, tile, hand.counts[tile])
+            state.apply(("DISCARD", tile))
+            try:
+                tile_value = self._chance(decision_maker, state, child, depth - 1, deadline)
+            finally:
+                state.undo()
+            if best is None or tile_value > best:
+                best = tile_value
+        self.table.put(node_key, best)
+        return best
@@ -0,0 +1,100 @@
+# hand.py
+from array import array
+
+import tile_loader
+
+_EMPTY = bytes(tile_loader.TILE_KINDS)
+
+class Hand:
+    """
+    紧凑手牌表示：
+    - counts: 长度为 34 的计数向量(array)，下标即牌的编号(0..33)，值为持有张数
+    - size:   手牌总张数
+
+    所有规则判定、决策模拟都直接在计数向量上增减，避免在热路径中分配列表、
+    解析字符串。牌名与编号之间的转换只在 CLI/GUI 边界进行(见 from_names / to_names)。
+    """
+
+    __slots__ = ("counts", "size")
+
+    def __init__(self, tiles=()):
+        self.counts = array("b", _EMPTY)
+        self.size = 0
+        for t in tiles:
+            self.counts[t] += 1
+            self.size += 1
+
+    @classmethod
+    def from_names(cls, names):
+        """由牌名列表(如 ["W1", "T5", "E"])构造手牌"""
+        return cls(tile_loader.mahjong.to_ids(names))
+
+    @classmethod
+    def from_counts(cls, counts):
+        """由 34 格计数向量构造手牌"""
+        hand = cls()
+        hand.counts = array("b", counts)
+        hand.size = sum(hand.counts)
+        return hand
+
+    def to_names(self):
+        """转换为排好序的牌名列表，仅供展示使用"""
+        return tile_loader.mahjong.to_names(self)
+
+    def add(self, tile, n=1):
+        self.counts[tile] += n
+        self.size += n
+
+    def remove(self, tile, n=1):
+        """移除 n 张牌；与 list.remove 一致，不够时抛出 ValueError"""
+        if self.counts[tile] < n:
+            raise ValueError(f"Hand.remove(x): {tile} not in hand")
+        self.counts[tile] -= n
+        self.size -= n
+
+    def count(self, tile):
+        return self.counts[tile]
+
+    def distinct(self):
+        """按编号顺序返回手中持有的不同牌"""
+        counts = self.counts
+        return [t for t in range(tile_loader.TILE_KINDS) if counts[t]]
+
+    def copy(self):
+        hand = Hand.__new__(Hand)
+        hand.counts = array("b", self.counts)
+        hand.size = self.size
+        return hand
+
+    def key(self):
+        """可哈希的规范形式，用作缓存键"""
+        return self.counts.tobytes()
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __contains__(self, tile):
+        return self.counts[tile] > 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        """按编号顺序逐张返回手牌(含重复)"""
+        counts = self.counts
+        for t in range(tile_loader.TILE_KINDS):
+            for _ in range(counts[t]):
+                yield t
+
+    def __eq__(self, other):
+        if not isinstance(other, Hand):
+            return NotImplemented
+        return self.counts == other.counts
+
+    __hash__ = None  # 手牌可变，需要哈希时请使用 key()
+
+    def __repr__(self):
+        return f"Hand({' '.join(self.to_names())})"
@@ -0,0 +1,379 @@
+# live.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import json
+import sys
+import time
+
+import tile_loader
+from decision_maker import DecisionMaker
+from replay import parse_events
+from self_play import PLAYERS, Seat
+
+# 跟踪文件时，读到文件末尾后再次检查的间隔(秒)
+FOLLOW_INTERVAL = 0.2
+
+# 文本格式中的事件名 -> JSONL 事件类型
+_TEXT_TYPES = {"deal", "draw", "discard", "chi", "peng", "gang", "hu"}
+
+
+def parse_line(line, seat=0):
+    """
+    把一行输入解析为事件 (act_type, player, tile, tiles)，player 为绝对座位号；空行返回 None。
+    以 "{" 开头的行按 replay.parse_events 的 JSONL 格式解析，否则按便于手工输入的文本格式：
+      deal 0 W1 W2 ... (庄家座位 + 自己的 13 张)
+      draw 0 W5        (别人摸牌可以省略牌名)
+      discard 2 E
+      chi 1 W3 W3 W4 W5 (吃的牌 + 整组顺子)
+      peng 2 T7 / gang 2 T7 / hu 3 B2
+    无法解析时抛出 ValueError。
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        event = next(parse_events([line]), None)
+        if event is None:
+            raise ValueError(f"无法解析的事件: {line}")
+        return event
+
+    words = line.split()
+    act_type = words[0].lower()
+    if act_type not in _TEXT_TYPES or len(words) < 2:
+        raise ValueError(f"无法解析的事件: {line}")
+    try:
+        player = int(words[1])
+        tiles = tile_loader.mahjong.to_ids([w.upper() for w in words[2:]])
+    except (ValueError, TypeError):
+        raise ValueError(f"无法解析的事件: {line}") from None
+    if act_type == "deal":
+        hands = [None] * PLAYERS
+        hands[seat] = tiles
+        return ("DEAL", player, None, hands)
+    tile = tiles[0] if tiles else None
+    if act_type == "chi":
+        return ("CHI", player, tile, sorted(tiles[1:]))
+    return (act_type.upper(), player, tile, None)
+
+
+def format_action(action):
+    """把动作元组格式化为牌名，例如 ("CHI", 3, [2, 3, 4]) -> "CHI W4 [W3 W4 W5]" """
+    names = tile_loader.mahjong.to_names
+    text = action[0]
+    if action[1] is not None:
+        text += " " + names([action[1]])[0]
+    if len(action) > 2:
+        text += " [" + " ".join(names(action[2])) + "]"
+    return text
+
+
+class AdviceSession:
+    """
+    一张牌桌上一个座位的实时建议：把(绝对座位号的)事件推入该座位的 StateManager，
+    需要自己做决定时(自己摸牌或吃碰之后，别人打出可以吃碰杠和的牌时)调用 DecisionMaker。
+
+    除此之外还可以预先计算：在下一家打牌之前，对每一张“打出来自己就有动作”的牌，
+    在状态的副本上模拟这次打牌并调用 decide_action，把结果按 (出牌者, 牌) 存起来；
+    这张牌真的打出来时直接返回，不必再搜索。每个事件都会清空旧的预计算结果。
+    预计算的副本与真实状态完全相同，所以结果与现算的一致。
+
+    所有方法都不是线程安全的，调用方需保证同一时间只有一个线程在使用(见 AsyncAdvisor)；
+    只有 invalidate() 可以在其他线程调用。
+    """
+
+    def __init__(self, seat=0, make_decision_maker=DecisionMaker, deadline_ms=None):
+        self.seat = Seat(seat, make_decision_maker)
+        self.deadline_ms = deadline_ms
+        # 代数，每个事件(以及 invalidate)加一；排队中的预计算代数过期时跳过
+        self.generation = 0
+        # 预计算结果：{(出牌者相对编号, 牌): 动作}，只对当前状态有效
+        self.speculated = {}
+        # 下一个打牌的玩家(相对编号)
+        self.next_discarder = 0
+        self.stats = {"events": 0, "decisions": 0, "speculated": 0, "hits": 0}
+
+    def reset(self, seat=None):
+        """清空对局信息以便复用(可换一个座位)；RuleEngine 的缓存保留"""
+        if seat is not None:
+            self.seat.index = seat
+        self.seat.state.reset()
+        self.generation += 1
+        self.speculated = {}
+        self.next_discarder = 0
+        self.stats = {"events": 0, "decisions": 0, "speculated": 0, "hits": 0}
+
+    def invalidate(self):
+        """新事件即将到来：让尚未开始的预计算作废"""
+        self.generation += 1
+
+    def keeps_speculation(self, event):
+        """
+        该事件是否不影响预计算：预计算的出牌者摸牌(别人摸的牌看不到，状态只有当前玩家变化，
+        预计算时已经模拟过)，此时保留已有结果，排队中的预计算也继续进行。
+        """
+        act_type, player = event[0], event[1]
+        relative = self.seat.relative(player)
+        return act_type == "DRAW" and relative != 0 and relative == self.next_discarder
+
+    # ===== 事件 =====
+
+    def handle(self, event):
+        """
+        推入一个事件，需要自己做决定时返回建议(dict)，否则返回 None：
+        {"kind": "turn"/"call", "action": 动作元组, "speculated": 是否来自预计算, "elapsed_ms": 耗时}
+        """
+        act_type, player, tile, tiles = event
+        seat = self.seat
+        state = seat.state
+        self.stats["events"] += 1
+        if self.keeps_speculation(event):
+            state.handle_event((act_type, seat.relative(player), tile, tiles))
+            return None
+        self.generation += 1
+        speculated = self.speculated
+        self.speculated = {}
+
+        if act_type == "DEAL":
+            hand = tiles[seat.index] if seat.index < len(tiles) else None
+            if hand is None:
+                raise ValueError("deal 事件中没有本座位的手牌")
+            state.reset()
+            state.initialize_hand(hand)
+            state.current_player = seat.relative(player)
+            self.next_discarder = state.current_player
+            return None
+
+        relative = seat.relative(player)
+        hit = speculated.get((relative, tile)) if act_type == "DISCARD" else None
+
+        state.handle_event((act_type, relative, tile, tiles))
+        # 打牌后(没人鸣牌时)轮到下家，摸牌、吃碰杠之后由他自己打牌
+        self.next_discarder = (relative + 1) % PLAYERS if act_type == "DISCARD" else relative
+
+        start = time.perf_counter()
+        if relative == 0:
+            if act_type not in ("DRAW", "CHI", "PENG"):
+                return None
+            # 吃碰之后没有摸牌，new_tile 为 None
+            kind, new_tile = "turn", (tile if act_type == "DRAW" else None)
+        elif act_type == "DISCARD":
+            kind, new_tile = "call", tile
+            if hit is None and not self.has_call(tile):
+                return None
+        else:
+            return None
+
+        if hit is not None:
+            action = hit
+            self.stats["hits"] += 1
+        else:
+            action = seat.decision_maker.decide_action(state, new_tile, self.deadline_ms)
+        self.stats["decisions"] += 1
+        return {"kind": kind, "action": action, "speculated": hit is not None,
+                "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    def has_call(self, tile):
+        """别人打出 tile 时自己是否有吃碰杠和可选"""
+        candidates = self.seat.decision_maker.get_candidate_actions(self.seat.state, tile)
+        return any(a[0] != "PASS" for a in candidates)
+
+    # ===== 预计算 =====
+
+    def speculation_targets(self):
+        """
+        返回 (代数, [(出牌者相对编号, 牌), ...])：下一个打牌的对手打出哪些牌时自己有动作。
+        """
+        state = self.seat.state
+        discarder = self.next_discarder
+        if state.has_won or not len(state.hand) or discarder == 0:
+            return self.generation, []
+
+        previous = state.current_player
+        state.current_player = discarder
+        try:
+            targets = [(discarder, t) for t in range(tile_loader.TILE_KINDS)
+                       if state.deck_counter.remaining_deck[t] and self.has_call(t)]
+        finally:
+            state.current_player = previous
+        return self.generation, targets
+
+    def speculate(self, generation, discarder, tile):
+        """
+        在状态副本上模拟 discarder 打出 tile 并做决定；代数已过期时什么都不做。
+        已经开始的预计算即使中途过期也会保存结果：下一个事件还没有执行，结果对当前状态仍然有效。
+        """
+        if generation != self.generation or (discarder, tile) in self.speculated:
+            return None
+        state = self.seat.state
+        scratch = copy.deepcopy(state)
+        decision_maker = self.seat.decision_maker.for_state(scratch)
+        scratch.player_changeto(discarder)
+        scratch.handle_event(("DISCARD", discarder, tile, None))
+        action = decision_maker.decide_action(scratch, tile, self.deadline_ms)
+        self.speculated[(discarder, tile)] = action
+        self.stats["speculated"] += 1
+        return action
+
+
+class AsyncAdvisor:
+    """
+    AdviceSession 的 asyncio 包装：事件处理、决策与预计算都交给一个单线程的执行器依次执行，
+    事件循环只负责读入事件和输出建议，不会被搜索阻塞。
+
+    每个事件到来时先在事件循环中调用 invalidate()，排在它前面尚未开始的预计算直接跳过，
+    正在进行的那一个最多再占用一次决策的时间(可用 deadline_ms 限制)。
+    处理完事件后再排入对下一次打牌的预计算，在等待对手(或等待输入)的时间里完成。
+    预计算的 future 保存在 speculations 中：作废时取消尚未开始的，出错时把异常输出到标准错误。
+    """
+
+    def __init__(self, session, output=print, speculate=True):
+        self.session = session
+        self.output = output
+        self.speculate = speculate
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.lock = asyncio.Lock()
+        self.speculations = set()
+
+    def _cancel_speculations(self):
+        for future in list(self.speculations):
+            future.cancel()
+
+    def _speculation_done(self, future):
+        self.speculations.discard(future)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"预计算失败: {error!r}", file=sys.stderr)
+
+    async def feed(self, event):
+        """处理一个事件，返回建议(无需决定时为 None)"""
+        loop = asyncio.get_running_loop()
+        session = self.session
+        async with self.lock:
+            # 上一个事件已经处理完，排在执行器中的只剩预计算
+            if not session.keeps_speculation(event):
+                session.invalidate()
+                self._cancel_speculations()
+            advice = await loop.run_in_executor(self.executor, session.handle, event)
+            if advice is not None and self.output is not None:
+                self.output(advice)
+            if self.speculate:
+                generation, targets = await loop.run_in_executor(self.executor, session.speculation_targets)
+                for discarder, tile in targets:
+                    future = loop.run_in_executor(self.executor, session.speculate, generation, discarder, tile)
+                    self.speculations.add(future)
+                    future.add_done_callback(self._speculation_done)
+        return advice
+
+    async def feed_line(self, line):
+        """解析一行输入并处理；无法解析时输出错误并返回 None"""
+        try:
+            event = parse_line(line, self.session.seat.index)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return None
+        if event is None:
+            return None
+        try:
+            return await self.feed(event)
+        except (ValueError, IndexError) as e:
+            # 事件与当前牌面不符(如打出手中没有的牌)
+            print(f"事件无法执行: {e}", file=sys.stderr)
+            return None
+
+    def close(self):
+        self._cancel_speculations()
+        self.executor.shutdown(wait=False)
+
+
+# ===== 输入来源 =====
+
+async def read_stdin(advisor):
+    """逐行读取标准输入；读取放在线程中进行，Windows 下同样可用"""
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        await advisor.feed_line(line)
+
+
+async def follow_file(advisor, path, interval=FOLLOW_INTERVAL):
+    """像 tail -f 一样跟踪文件：从头读起，读到末尾后每隔 interval 秒检查是否有新行"""
+    buffered = ""
+    with open(path, encoding="utf-8") as f:
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(interval)
+                continue
+            buffered += chunk
+            # 写入方可能只写了半行
+            if not buffered.endswith("\n"):
+                continue
+            line, buffered = buffered, ""
+            await advisor.feed_line(line)
+
+
+async def serve_socket(advisor, host, port):
+    """在 host:port 上接受连接，每行一个事件，建议以 JSON 行写回该连接"""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                advice = await advisor.feed_line(line.decode("utf-8"))
+                if advice is not None:
+                    writer.write((json.dumps(advice_json(advice), ensure_ascii=False) + "\n").encode("utf-8"))
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    # port 为 0 时由系统分配，输出实际监听的端口
+    print(f"监听 {host}:{server.sockets[0].getsockname()[1]}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def advice_json(advice):
+    """建议转换为可 JSON 序列化的形式，动作附带牌名"""
+    result = dict(advice)
+    result["action"] = list(advice["action"])
+    result["text"] = format_action(advice["action"])
+    return result
+
+
+def print_advice(advice):
+    source = "预计算" if advice["speculated"] else f"{advice['elapsed_ms']:.1f}ms"
+    kind = "摸牌后" if advice["kind"] == "turn" else "鸣牌"
+    print(f"AI 建议({kind}，{source}): {format_action(advice['action'])}", flush=True)
+
+
+def run(source="stdin", path=None, host="127.0.0.1", port=8765, seat=0,
+        deadline_ms=None, speculate=True, make_decision_maker=DecisionMaker):
+    """启动事件循环，从 source("stdin" / "file" / "socket")读取事件并输出建议"""
+    session = AdviceSession(seat, make_decision_maker, deadline_ms)
+
+    async def main():
+        advisor = AsyncAdvisor(session, print_advice, speculate)
+        try:
+            if source == "file":
+                await follow_file(advisor, path)
+            elif source == "socket":
+                await serve_socket(advisor, host, port)
+            else:
+                await read_stdin(advisor)
+        finally:
+            advisor.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    return session
+
@@ -0,0 +1,90 @@
+# lru_cache.py
+from collections import OrderedDict
+import threading
+
+# RuleEngine / DecisionMaker 默认的缓存条目数上限
+CACHE_SIZE = 1 << 16
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    有容量上限的 LRU 缓存，可在多个线程之间共享。
+
+    键为 (名称, ...) 形式的元组，名称用来区分缓存的是哪一种计算，命中/未命中次数按名称分别统计。
+    查找与写入在同一把锁内完成；计算本身在锁外进行，两个线程同时未命中时可能各算一次，
+    结果相同，不影响正确性。缓存的值是共享对象，调用方不应修改。
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self.data.get(key, _MISSING)
+            name = key[0]
+            if value is _MISSING:
+                self.misses[name] = self.misses.get(name, 0) + 1
+                return default
+            self.data.move_to_end(key)
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            data = self.data
+            data[key] = value
+            data.move_to_end(key)
+            if len(data) > self.maxsize:
+                data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, func, *args):
+        """命中时返回缓存的值，否则调用 func(*args) 并写入缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = func(*args)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """清空缓存条目与统计"""
+        with self.lock:
+            self.data.clear()
+            self.hits = {}
+            self.misses = {}
+            self.evictions = 0
+
+    def stats(self):
+        """返回 {"size", "maxsize", "evictions", "hits", "misses", "hit_rate", "by_name": {名称: (命中, 未命中)}}"""
+        with self.lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            names = set(self.hits) | set(self.misses)
+            return {
+                "size": len(self.data),
+                "maxsize": self.maxsize,
+                "evictions": self.evictions,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "by_name": {name: (self.hits.get(name, 0), self.misses.get(name, 0)) for name in sorted(names)},
+            }
+
+    def __len__(self):
+        return len(self.data)
+
+
+def state_key(state):
+    """
+    局面的规范可哈希形式：(本家手牌计数, 未见牌计数, 本家副露, 是否已和牌)。
+    副露按 (类型, 牌) 排序，与副露的先后顺序无关。
+    """
+    melds = tuple(sorted((m["type"], tuple(m["tile"])) for m in state.melds[0]))
+    return (state.hand.key(), state.deck_counter.remaining_deck.tobytes(), melds, state.has_won)
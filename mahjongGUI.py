@@ -1,9 +1,82 @@
+import copy
 import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, 
                              QPushButton, QLabel, QVBoxLayout, 
                              QHBoxLayout, QMessageBox)
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+
+import tile_loader
+
+# 手牌中每张牌的显示尺寸
+TILE_WIDTH = 60
+TILE_HEIGHT = 80
+# AI 每次决策的时间限制(毫秒)，None 表示不限时
+AI_DEADLINE_MS = 1000
+
+
+class TilePixmapCache:
+    """
+    牌面图片缓存：启动时把 34 种牌的图片各读取、缩放一次，之后刷新界面只取缓存中的 QPixmap，
+    不再每次从磁盘读取和缩放。图片不存在时对应的 QPixmap 为空，由调用方改为显示牌名。
+    必须在 QApplication 创建之后构造。
+    """
+
+    def __init__(self, width=TILE_WIDTH, height=TILE_HEIGHT):
+        self.pixmaps = []
+        for tile in range(tile_loader.TILE_KINDS):
+            pixmap = QPixmap(self.image_path(tile))
+            if not pixmap.isNull():
+                pixmap = pixmap.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.pixmaps.append(pixmap)
+
+    @staticmethod
+    def image_path(tile):
+        """
+        返回对应牌面图片的路径。
+        这里假设你有对应资源文件，如 images/W1.png, images/T9.png 等
+        tile 为紧凑编号，在这里转换回牌名
+        """
+        return f"./images/{tile_loader.mahjong.get_id_name(tile)}.png"
+
+    def get(self, tile):
+        return self.pixmaps[tile]
+
+
+class DecisionSignals(QObject):
+    """DecisionTask 的信号(QRunnable 不是 QObject，不能直接定义信号)；参数为发起时的代数"""
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class DecisionTask(QRunnable):
+    """
+    在 QThreadPool 的工作线程中调用 DecisionMaker.decide_action。
+    决策作用于发起时的状态快照(copy.deepcopy)，界面线程可以继续修改原状态；
+    开始执行前若代数已经过期(状态又变了)就直接放弃，执行完的结果由界面按代数丢弃过期的。
+    """
+
+    def __init__(self, owner, generation, decision_maker, state, new_tile, deadline_ms):
+        super().__init__()
+        self.owner = owner
+        self.generation = generation
+        self.decision_maker = decision_maker
+        self.state = state
+        self.new_tile = new_tile
+        self.deadline_ms = deadline_ms
+        self.signals = DecisionSignals()
+
+    def run(self):
+        if self.generation != self.owner.generation:
+            return
+        try:
+            decision_maker = self.decision_maker.for_state(self.state)
+            action = decision_maker.decide_action(self.state, self.new_tile, self.deadline_ms)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, action)
+
 
 class MahjongGUI(QMainWindow):
     def __init__(self, state_manager, decision_maker):
@@ -12,6 +85,17 @@ class MahjongGUI(QMainWindow):
         self.state_manager = state_manager
         self.decision_maker = decision_maker
 
+        # 牌面图片只加载、缩放一次
+        self.pixmaps = TilePixmapCache()
+        # 手牌区的牌位控件与其中显示的牌，刷新时只修改有变化的牌位
+        self.hand_labels = []
+        self.hand_tiles = []
+
+        # AI 决策在线程池中进行；状态每变化一次代数加一，过期的决策被取消或丢弃
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.generation = 0
+
         self.initUI()
 
     def initUI(self):
@@ -62,26 +146,96 @@ class MahjongGUI(QMainWindow):
         self.action_buttons_layout.addWidget(self.btn_gang)
         self.action_buttons_layout.addWidget(self.btn_hu)
 
+        # 3.3 AI 建议
+        self.advice_label = QLabel("")
+        bottom_layout.addWidget(self.advice_label)
+
         # 4. 绘制初始手牌
-        self.update_hand_display()
+        self.state_changed()
 
     def update_hand_display(self):
         """
         根据 state_manager.hand 里的牌，更新底部手牌区域控件
+        手牌为 Hand 计数向量，逐张迭代得到紧凑编号。
+        与上次显示的牌逐个牌位比较，只给变化的牌位换图；多出的牌位隐藏起来留待复用，不删除控件。
         """
-        # 先清除旧的
-        for i in reversed(range(self.my_hand_area.count())):
-            widget = self.my_hand_area.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-
-        # 重新绘制我的手牌
-        for tile in self.state_manager.hand:
+        tiles = list(self.state_manager.hand)
+        labels = self.hand_labels
+
+        # 牌位不够时新建
+        while len(labels) < len(tiles):
+            slot = len(labels)
             tile_label = QLabel()
-            tile_label.setPixmap(QPixmap(self.get_tile_image_path(tile)).scaled(60, 80, Qt.KeepAspectRatio))
+            tile_label.setFixedSize(TILE_WIDTH, TILE_HEIGHT)
+            tile_label.setAlignment(Qt.AlignCenter)
             # 这里添加事件: 用户点击此Label时 => 出牌/选牌
-            tile_label.mousePressEvent = lambda e, t=tile: self.on_tile_clicked(t)
+            tile_label.mousePressEvent = lambda e, i=slot: self.on_slot_clicked(i)
             self.my_hand_area.addWidget(tile_label)
+            labels.append(tile_label)
+            self.hand_tiles.append(None)
+
+        for slot, tile_label in enumerate(labels):
+            tile = tiles[slot] if slot < len(tiles) else None
+            if tile == self.hand_tiles[slot]:
+                continue
+            self.hand_tiles[slot] = tile
+            if tile is None:
+                tile_label.hide()
+                continue
+            pixmap = self.pixmaps.get(tile)
+            if pixmap.isNull():
+                tile_label.setText(tile_loader.mahjong.get_id_name(tile))
+            else:
+                tile_label.setPixmap(pixmap)
+            tile_label.show()
+
+    def on_slot_clicked(self, slot):
+        tile = self.hand_tiles[slot] if slot < len(self.hand_tiles) else None
+        if tile is not None:
+            self.on_tile_clicked(tile)
+
+    # ===== AI 决策(线程池中进行) =====
+
+    def state_changed(self):
+        """状态变化后调用：取消尚未开始的决策，刷新手牌，需要打牌时重新请求建议"""
+        self.generation += 1
+        self.thread_pool.clear()
+        self.update_hand_display()
+        if len(self.state_manager.hand) % 3 == 2:
+            self.request_advice()
+        else:
+            self.advice_label.setText("")
+
+    def request_advice(self, new_tile=None):
+        """在线程池中为当前状态的快照计算建议，结果通过 on_advice 回到界面线程"""
+        self.generation += 1
+        self.thread_pool.clear()
+        task = DecisionTask(self, self.generation, self.decision_maker,
+                            copy.deepcopy(self.state_manager), new_tile, AI_DEADLINE_MS)
+        task.signals.finished.connect(self.on_advice)
+        task.signals.failed.connect(self.on_advice_failed)
+        self.advice_label.setText("AI 思考中…")
+        self.thread_pool.start(task)
+
+    def on_advice(self, generation, action):
+        if generation != self.generation:
+            # 状态已经变了，结果作废
+            return
+        text = action[0]
+        if action[1] is not None:
+            text += " " + tile_loader.mahjong.get_id_name(action[1])
+        self.advice_label.setText(f"AI 建议：{text}")
+
+    def on_advice_failed(self, generation, message):
+        if generation == self.generation:
+            self.advice_label.setText(f"AI 决策出错：{message}")
+
+    def closeEvent(self, event):
+        # 让排队中的决策失效，等待正在进行的那一个结束
+        self.generation += 1
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+        super().closeEvent(event)
 
     def on_tile_clicked(self, tile):
         """
@@ -89,7 +243,7 @@ class MahjongGUI(QMainWindow):
         具体逻辑看你怎么设计
         """
         # 简化：直接弹出对话框问是否要打出这张
-        reply = QMessageBox.question(self, "打牌", f"确定要打出 {tile} 吗？",
+        reply = QMessageBox.question(self, "打牌", f"确定要打出 {tile_loader.mahjong.get_id_name(tile)} 吗？",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
             # 更新手牌
@@ -97,11 +251,8 @@ class MahjongGUI(QMainWindow):
                 self.state_manager.hand.remove(tile)
             # 更新弃牌区
             self.state_manager.discards[0].append(tile)
-            # 刷新UI
-            self.update_hand_display()
-
-            # 在这里也可以调用 AI的决策(如果需要)
-            # ...
+            # 刷新UI，并取消针对旧状态的 AI 决策
+            self.state_changed()
 
     def on_action_clicked(self, action_type):
         """
@@ -111,12 +262,8 @@ class MahjongGUI(QMainWindow):
         QMessageBox.information(self, "信息", f"你点击了 {action_type} ，但还需要更多逻辑来处理哦。")
 
     def get_tile_image_path(self, tile):
-        """
-        返回对应牌面图片的路径。
-        这里假设你有对应资源文件，如 images/W1.png, images/T9.png 等
-        """
-        # 简单写法举例
-        return f"./images/{tile}.png"
+        """返回对应牌面图片的路径(见 TilePixmapCache.image_path)"""
+        return TilePixmapCache.image_path(tile)
 
 
 def run_gui_app(state_manager, decision_maker):
@@ -127,19 +274,13 @@ def run_gui_app(state_manager, decision_maker):
 
 
 if __name__ == "__main__":
-    # 伪造 state_manager, decision_maker
-    from collections import defaultdict
-
-    class FakeStateManager:
-        def __init__(self):
-            self.hand = ["W1","W2","W3","W5","T3","T3","T4","T7","S6","S7","Z1","Z1","Z2"]
-            self.discards = [[] for _ in range(4)]
-            self.melds = [[] for _ in range(4)]
-
-    class FakeDecisionMaker:
-        pass
+    # 用一手 14 张的示例手牌启动，轮到自己打牌，AI 建议在后台线程中计算
+    from state_manager import StateManager
+    from rule_engine import RuleEngine
+    from decision_maker import DecisionMaker
 
-    sm = FakeStateManager()
-    dm = FakeDecisionMaker()
+    sm = StateManager()
+    sm.initialize_hand(tile_loader.mahjong.to_ids(["W1","W2","W3","W5","T3","T3","T4","T7","B6","B7","B8","E","E","S"]))
+    dm = DecisionMaker(RuleEngine(sm))
 
-    run_gui_app(sm, dm)
\ No newline at end of file
+    run_gui_app(sm, dm)
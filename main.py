@@ -1,10 +1,28 @@
 # main.py
+import argparse
 
 from state_manager import StateManager
 from rule_engine import RuleEngine
 from decision_maker import DecisionMaker 
+import live
 
 def main():
+    parser = argparse.ArgumentParser(description="麻将 AI 助手")
+    parser.add_argument("--stdin", action="store_true", help="从标准输入逐行读取事件，实时给出建议")
+    parser.add_argument("--follow", metavar="FILE", help="跟踪该文件中追加的事件(类似 tail -f)")
+    parser.add_argument("--listen", metavar="PORT", type=int, help="在 127.0.0.1 的该端口上接收事件")
+    parser.add_argument("--seat", type=int, default=0, help="自己的绝对座位号")
+    parser.add_argument("--deadline-ms", type=float, help="每次决策的时间限制(毫秒)")
+    parser.add_argument("--no-speculate", action="store_true", help="不预先计算鸣牌决策")
+    args = parser.parse_args()
+
+    if args.stdin or args.follow or args.listen is not None:
+        # 事件驱动模式：asyncio 读入事件，决策在后台线程中进行
+        source = "file" if args.follow else "socket" if args.listen is not None else "stdin"
+        live.run(source, path=args.follow, port=args.listen, seat=args.seat,
+                 deadline_ms=args.deadline_ms, speculate=not args.no_speculate)
+        return
+
     # 初始化
     state_manager = StateManager()
     rule_engine = RuleEngine(state_manager)
@@ -16,4 +34,4 @@ def main():
         state_manager.update()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
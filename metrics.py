@@ -0,0 +1,201 @@
+# metrics.py
+import json
+import os
+import time
+import weakref
+
+# DecisionMaker 中计时的各阶段(耗时包含内部调用的其他阶段)
+STAGES = ("decide_action", "get_candidate_actions", "simulate_action",
+          "evaluate_state", "select_best_discard")
+
+# RuleEngine 中统计调用次数的判定方法
+PREDICATES = ("can_hu", "can_peng", "can_chi", "can_gang", "check_dark_gang",
+              "calculate_shanten", "calculate_ting_tiles", "calculate_discard_ting")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Metrics:
+    """
+    决策过程的分阶段耗时与规则判定调用计数。
+
+    attach() 时把 DecisionMaker / RuleEngine 实例上的对应方法替换为带计时/计数的包装，
+    detach() 时删除包装、恢复原方法，因此关闭时没有任何额外开销，可在运行中随时切换。
+    同一个 Metrics 可以同时挂在多个 DecisionMaker 上(例如自动对局的四个座位)，统计合并计算。
+
+    每个阶段最多保留 max_samples 个耗时样本(环形覆盖)，用于计算 p50/p95/p99；
+    可导出为 Prometheus 文本格式，或在每次 decide_action 结束后向 decision_log
+    追加一行 JSON(本次决策各阶段的调用次数与耗时、规则判定次数、搜索统计)。
+    """
+
+    def __init__(self, max_samples=100000, decision_log=None):
+        self.max_samples = max_samples
+        self.decision_log = decision_log
+        # 只持有弱引用：for_state 得到的临时决策器用完即可回收
+        self.attached = weakref.WeakSet()
+        self.reset()
+
+    @property
+    def enabled(self):
+        return bool(self.attached)
+
+    def reset(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.positions = {stage: 0 for stage in STAGES}
+        self.sums = {stage: 0.0 for stage in STAGES}
+        self.counts = {stage: 0 for stage in STAGES}
+        self.calls = {name: 0 for name in PREDICATES}
+        self._decision = None
+
+    # ===== 开关 =====
+
+    def attach(self, decision_maker):
+        """开始记录：包装 decision_maker 及其 rule_engine 上的方法"""
+        if decision_maker in self.attached:
+            return
+        self.attached.add(decision_maker)
+        for stage in STAGES:
+            func = getattr(decision_maker, stage)
+            setattr(decision_maker, stage, self._timed(stage, func, decision_maker))
+        rule_engine = decision_maker.rule_engine
+        for name in PREDICATES:
+            if hasattr(rule_engine, name):
+                setattr(rule_engine, name, self._counted(name, getattr(rule_engine, name)))
+
+    def detach(self, decision_maker=None):
+        """停止记录：删除实例上的包装，恢复类中的原方法；不指定时全部停止"""
+        targets = list(self.attached) if decision_maker is None else [decision_maker]
+        for target in targets:
+            if target not in self.attached:
+                continue
+            for stage in STAGES:
+                target.__dict__.pop(stage, None)
+            for name in PREDICATES:
+                target.rule_engine.__dict__.pop(name, None)
+            self.attached.remove(target)
+
+    # ===== 包装 =====
+
+    def _record(self, stage, seconds):
+        samples = self.samples[stage]
+        if len(samples) < self.max_samples:
+            samples.append(seconds)
+        else:
+            position = self.positions[stage]
+            samples[position] = seconds
+            self.positions[stage] = (position + 1) % self.max_samples
+        self.sums[stage] += seconds
+        self.counts[stage] += 1
+        if self._decision is not None:
+            entry = self._decision["stages"][stage]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def _timed(self, stage, func, decision_maker):
+        perf_counter = time.perf_counter
+        record = self._record
+
+        if stage == "decide_action":
+            def wrapper(*args, **kwargs):
+                self._begin_decision()
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    record(stage, perf_counter() - start)
+                    self._end_decision(decision_maker)
+            return wrapper
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, perf_counter() - start)
+        return wrapper
+
+    def _counted(self, name, func):
+        calls = self.calls
+
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def _begin_decision(self):
+        self._decision = {
+            "stages": {stage: [0, 0.0] for stage in STAGES},
+            "calls": dict(self.calls),
+        }
+
+    def _end_decision(self, decision_maker):
+        decision = self._decision
+        self._decision = None
+        if decision is None or self.decision_log is None:
+            return
+        record = {
+            "time": time.time(),
+            "stages": {stage: {"calls": c, "total_ms": t * 1000}
+                       for stage, (c, t) in decision["stages"].items() if c},
+            "rule_calls": {name: self.calls[name] - decision["calls"][name]
+                           for name in PREDICATES if self.calls[name] != decision["calls"][name]},
+            "search": dict(decision_maker.search_stats),
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        if isinstance(self.decision_log, str):
+            with open(self.decision_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        else:
+            self.decision_log.write(line + "\n")
+
+    # ===== 导出 =====
+
+    def quantiles(self, stage):
+        """返回 {分位数: 秒}"""
+        samples = sorted(self.samples[stage])
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        last = len(samples) - 1
+        return {q: samples[min(int(q * len(samples)), last)] for q in QUANTILES}
+
+    def summary(self):
+        """各阶段的 p50/p95/p99(毫秒)、调用次数与总耗时，以及规则判定调用次数"""
+        stages = {}
+        for stage in STAGES:
+            if not self.counts[stage]:
+                continue
+            q = self.quantiles(stage)
+            stages[stage] = {
+                "count": self.counts[stage],
+                "total_ms": self.sums[stage] * 1000,
+                "p50_ms": q[0.5] * 1000,
+                "p95_ms": q[0.95] * 1000,
+                "p99_ms": q[0.99] * 1000,
+            }
+        return {"stages": stages, "rule_calls": dict(self.calls)}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式(summary + counter)"""
+        lines = [
+            "# HELP mahjong_stage_latency_seconds DecisionMaker stage latency",
+            "# TYPE mahjong_stage_latency_seconds summary",
+        ]
+        for stage in STAGES:
+            if not self.counts[stage]:
+                continue
+            for q, value in self.quantiles(stage).items():
+                lines.append(f'mahjong_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {value:.9f}')
+            lines.append(f'mahjong_stage_latency_seconds_sum{{stage="{stage}"}} {self.sums[stage]:.9f}')
+            lines.append(f'mahjong_stage_latency_seconds_count{{stage="{stage}"}} {self.counts[stage]}')
+        lines.append("# HELP mahjong_rule_calls_total RuleEngine predicate calls")
+        lines.append("# TYPE mahjong_rule_calls_total counter")
+        for name in PREDICATES:
+            lines.append(f'mahjong_rule_calls_total{{predicate="{name}"}} {self.calls[name]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """写入 Prometheus 文本文件(先写临时文件再替换，供 node_exporter textfile 采集)"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
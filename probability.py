@@ -0,0 +1,148 @@
+# probability.py
+from array import array
+
+from shanten import shanten_table
+from ukeire import UkeireCalculator
+
+# 目标向听数：0 为听牌，-1 为和牌
+TENPAI = 0
+WIN = -1
+
+
+class DrawProbability:
+    """
+    给定手牌、未见张数与本家还能摸几次牌，精确计算在这些摸牌之内听牌/和牌的概率(不抽样)。
+
+    模型：
+    - 本家之后摸到的牌是未见牌的一个均匀随机排列的前几张(不放回)，这对对手手中的牌同样成立，
+      因此每次摸到 t 的概率为 当前未见的 t 张数 / 当前未见总张数
+    - 打牌策略：摸到不能减少向听数的牌直接打出(摸切)；摸到有效牌时，打出后向听数最小、
+      其次进张最多的牌(与 DecisionMaker.select_best_discard 不考虑防守时相同)
+
+    在一手牌不变的期间，连续摸到无效牌的概率是超几何分布的连乘，直接累加，不需要逐张展开；
+    只有摸到有效牌时手牌才会变化，递归到新的手牌。状态为 (手牌计数, 有效牌摸走后的未见计数,
+    剩余摸牌次数)，在一次查询内记忆化。摸切的无效牌只减少未见总数，不区分是哪一种：
+    听牌之后的概率(只剩一个阶段)与超几何分布完全一致；向听数更大时，忽略了“之前摸切的牌
+    恰好是之后的有效牌”这一点。
+
+    代价随向听数增长很快，一般只对一向听以内的手牌使用。
+    """
+
+    def __init__(self, size, remaining, target=WIN, table=shanten_table):
+        self.size = size
+        self.target = target
+        self.table = table
+        self.remaining = array("b", remaining)
+        self.unseen = sum(self.remaining)
+        self.values = {}
+        self.moves = {}
+
+    # ===== 打牌策略 =====
+
+    def best_discard(self, calc, remaining):
+        """
+        3n+2 张时按策略选择打出的牌：向听数最小，其次进张最多，再其次编号最小。
+        先只算各打法的向听数，只对向听数最小的几种打法统计进张。
+        """
+        options = calc.discard_shanten()
+        lowest = min(options.values())
+        candidates = [tile for tile, shanten in sorted(options.items()) if shanten == lowest]
+        if len(candidates) == 1:
+            return candidates[0]
+        best_tile = None
+        best_count = -1
+        for tile in candidates:
+            calc.discard(tile)
+            count = sum(calc.ukeire(remaining)[1].values())
+            calc.draw(tile)
+            if count > best_count:
+                best_count = count
+                best_tile = tile
+        return best_tile
+
+    def _moves(self, hand, remaining):
+        """
+        手牌 hand(3n+1 张的计数 bytes)在未见计数 remaining 下的有效牌：
+        返回 [(张数, 结果)]，结果为 None 表示摸到这张就达到目标，否则为 (打出后的手牌, 新的未见计数)。
+        """
+        key = (hand, remaining)
+        moves = self.moves.get(key)
+        if moves is not None:
+            return moves
+        calc = UkeireCalculator(hand, self.size, self.table)
+        shanten, tiles = calc.ukeire(remaining)
+        moves = []
+        for tile, n in tiles.items():
+            if n <= 0:
+                continue
+            if shanten - 1 <= self.target:
+                moves.append((n, None))
+                continue
+            after = array("b", remaining)
+            after[tile] -= 1
+            calc.draw(tile)
+            discard = self.best_discard(calc, after)
+            calc.discard(discard)
+            next_hand = calc.counts.tobytes()
+            # 还原为摸牌前的手牌
+            calc.draw(discard)
+            calc.discard(tile)
+            moves.append((n, (next_hand, after.tobytes())))
+        self.moves[key] = moves
+        return moves
+
+    # ===== 概率 =====
+
+    def value(self, hand, remaining, draws, unseen):
+        """手牌 hand 在还能摸 draws 次、未见总数为 unseen 时达到目标的概率"""
+        if draws <= 0 or unseen <= 0:
+            return 0.0
+        key = (hand, remaining, draws)
+        result = self.values.get(key)
+        if result is not None:
+            return result
+
+        moves = self._moves(hand, remaining)
+        useful = sum(n for n, _ in moves)
+        result = 0.0
+        # miss: 前 j 次都摸到无效牌的概率
+        miss = 1.0
+        for j in range(draws):
+            left = unseen - j
+            if left <= 0 or miss <= 0.0:
+                break
+            for n, target in moves:
+                p = miss * n / left
+                if target is None:
+                    result += p
+                else:
+                    result += p * self.value(target[0], target[1], draws - j - 1, left - 1)
+            miss *= (left - useful) / left
+        self.values[key] = result
+        return result
+
+    def solve(self, counts, draws):
+        """从 counts(3n+1 或 3n+2 张)出发的概率；3n+2 张时先按策略打出一张(已和牌则为 1)"""
+        calc = UkeireCalculator(counts, self.size, self.table)
+        if self.size % 3 == 2:
+            shanten = calc.shanten()
+            if shanten <= self.target or shanten < 0:
+                return 1.0
+            calc.discard(self.best_discard(calc, self.remaining))
+            self.size -= 1
+        if calc.shanten() <= self.target:
+            return 1.0
+        return self.value(calc.counts.tobytes(), self.remaining.tobytes(), draws, self.unseen)
+
+
+def win_probability(counts, size, remaining, draws, target=WIN):
+    """
+    手牌(34 格计数 counts，张数 size)在本家还能摸 draws 次牌时和牌(target=WIN)
+    或听牌(target=TENPAI)的精确概率。remaining 为未见张数(DeckCounter.remaining_deck)。
+    """
+    return DrawProbability(size, remaining, target).solve(counts, draws)
+
+
+def tenpai_probability(counts, size, remaining, draws):
+    """在 draws 次摸牌之内听牌的概率(已经听牌时为 1)"""
+    return win_probability(counts, size, remaining, draws, TENPAI)
@@ -0,0 +1,319 @@
+# replay.py
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import gzip
+import json
+import sys
+import time
+
+import tile_loader
+from decision_maker import DecisionMaker
+from self_play import PLAYERS, Seat
+
+# 对局记录中的事件类型 -> StateManager.handle_event 使用的动作名
+_EVENT_TYPES = {
+    "deal": "DEAL", "draw": "DRAW", "discard": "DISCARD",
+    "chi": "CHI", "peng": "PENG", "gang": "GANG", "hu": "HU",
+}
+
+# 每个子进程任务包含的对局数
+_CHUNK_GAMES = 32
+
+
+# ===== 流水线：逐行读取 -> 解析 -> 按局切分，全程不把整个记录文件读入内存 =====
+
+def read_lines(source):
+    """逐行读取对局记录；source 为文件路径(.gz 自动解压)、"-"(标准输入)或已打开的文件对象"""
+    if source == "-":
+        yield from sys.stdin
+    elif isinstance(source, str):
+        opener = gzip.open if source.endswith(".gz") else open
+        with opener(source, "rt", encoding="utf-8") as f:
+            yield from f
+    else:
+        yield from source
+
+
+def _tile(name):
+    if name is None or isinstance(name, int):
+        return name
+    return tile_loader.mahjong.to_ids([name.upper()])[0]
+
+
+def parse_events(lines):
+    """
+    把 JSONL 行解析为事件元组 (act_type, player, tile, tiles)，player 为绝对座位号。
+    每行一个事件，例如：
+      {"type": "deal", "dealer": 0, "hands": [["W1", ...], null, null, null]}
+      {"type": "draw", "player": 0, "tile": "W5"}
+      {"type": "discard", "player": 0, "tile": "E"}
+      {"type": "chi", "player": 1, "tile": "E", "tiles": ["W3", "W4", "W5"]}
+      {"type": "peng", "player": 2, "tile": "T7"}
+      {"type": "gang", "player": 2, "tile": "T7"}
+      {"type": "hu", "player": 3, "tile": "B2"}
+    deal 中看不到的手牌写 null；其他人摸的牌可以省略 tile。
+    无法解析的行产生 None，由 split_games 丢弃所在的整局。
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield parse_record(json.loads(line))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            yield None
+
+
+def parse_record(record):
+    """把一条已解码的记录(dict)转换为事件元组，格式见 parse_events；不合法时抛出 ValueError/KeyError 等"""
+    act_type = _EVENT_TYPES[record["type"].lower()]
+    if act_type == "DEAL":
+        hands = [None if h is None else [_tile(t) for t in h] for h in record["hands"]]
+        return ("DEAL", record.get("dealer", 0), None, hands)
+    tiles = record.get("tiles")
+    if tiles is not None:
+        tiles = sorted(_tile(t) for t in tiles)
+    return (act_type, record["player"], _tile(record.get("tile")), tiles)
+
+
+def split_games(events, stats=None):
+    """按 deal 事件把事件流切分成一局一个列表；含无法解析事件的局被丢弃并计入 stats["skipped"]"""
+    game = None
+    broken = False
+    for event in events:
+        if event is not None and event[0] == "DEAL":
+            if game is not None and not broken:
+                yield game
+            elif game is not None and stats is not None:
+                stats["skipped"] += 1
+            game = [event]
+            broken = False
+        elif game is not None:
+            if event is None:
+                broken = True
+            else:
+                game.append(event)
+    if game is not None and not broken:
+        yield game
+    elif game is not None and stats is not None:
+        stats["skipped"] += 1
+
+
+# ===== 单局复盘 =====
+
+def same_action(ai_action, human_action):
+    """比较 AI 建议与记录中的实际动作；明杠/暗杠/补杠不作区分，吃牌还要比较组合"""
+    ai_type = "GANG" if ai_action[0] == "AN GANG" else ai_action[0]
+    human_type = "GANG" if human_action[0] == "AN GANG" else human_action[0]
+    if ai_type != human_type or ai_action[1] != human_action[1]:
+        return False
+    if ai_type == "CHI":
+        return sorted(ai_action[2]) == sorted(human_action[2])
+    return True
+
+
+class GameReplayer:
+    """
+    把记录的对局逐个事件推入每个已知手牌座位的 StateManager，并在该座位需要做决定时
+    调用 DecisionMaker，与记录中的实际动作对比。
+
+    决策点分两类：
+    - turn: 自己摸牌后(和牌/杠/打哪张)，以及吃碰之后打哪张
+    - call: 别人打出牌、自己可以吃碰杠和时(没有可选动作的不计入)；
+      别人抢先吃碰杠和而无法得知本人意图的不计入
+    """
+
+    def __init__(self, make_decision_maker=DecisionMaker, players=None, deadline_ms=None):
+        self.seats = [Seat(i, make_decision_maker) for i in range(PLAYERS)]
+        # 只复盘这些座位(绝对座位号)，None 表示所有已知手牌的座位
+        self.players = players
+        self.deadline_ms = deadline_ms
+
+    def replay(self, game):
+        """复盘一局，逐个产生决策点 (kind, seat_index, ai_action, human_action)"""
+        _, dealer, _, hands = game[0]
+        tracked = []
+        for seat in self.seats:
+            hand = hands[seat.index] if seat.index < len(hands) else None
+            if hand is None or (self.players is not None and seat.index not in self.players):
+                continue
+            seat.state.reset()
+            seat.state.initialize_hand(hand)
+            seat.state.current_player = seat.relative(dealer)
+            tracked.append(seat)
+
+        # 各座位尚未揭晓的决策：座位号 -> (kind, ai_action)
+        pending = {}
+        for act_type, player, tile, tiles in game[1:]:
+            # 1. 用本事件揭晓此前的决策
+            if pending:
+                human = (act_type, tile, tiles) if act_type == "CHI" else (act_type, tile)
+                for index, (kind, ai_action) in list(pending.items()):
+                    if kind == "turn":
+                        if index == player:
+                            del pending[index]
+                            yield kind, index, ai_action, human
+                    elif index == player and act_type != "DRAW":
+                        del pending[index]
+                        yield kind, index, ai_action, human
+                    elif act_type in ("CHI", "PENG", "GANG", "HU"):
+                        # 被别人抢先，无从得知本人的意图
+                        del pending[index]
+                    else:
+                        del pending[index]
+                        yield kind, index, ai_action, ("PASS", ai_action[1])
+
+            # 2. 所有已知座位更新状态
+            for seat in tracked:
+                seat.state.handle_event((act_type, seat.relative(player), tile, tiles))
+
+            # 3. 产生新的决策点
+            for seat in tracked:
+                decision_maker = seat.decision_maker
+                if seat.index == player:
+                    if act_type == "DRAW" or act_type == "CHI" or act_type == "PENG":
+                        # 吃碰之后没有摸牌，new_tile 为 None
+                        new_tile = tile if act_type == "DRAW" else None
+                        action = decision_maker.decide_action(seat.state, new_tile, self.deadline_ms)
+                        pending[seat.index] = ("turn", action)
+                elif act_type == "DISCARD":
+                    candidates = decision_maker.get_candidate_actions(seat.state, tile)
+                    if any(a[0] != "PASS" for a in candidates):
+                        action = decision_maker.decide_action(seat.state, tile, self.deadline_ms)
+                        pending[seat.index] = ("call", action)
+
+    def score(self, games, stats=None):
+        """复盘多局，把一致率累加到 stats 中并返回"""
+        if stats is None:
+            stats = new_stats()
+        for game in games:
+            try:
+                decisions = [(kind, same_action(ai_action, human_action))
+                             for kind, _, ai_action, human_action in self.replay(game)]
+            except (ValueError, IndexError):
+                # 记录与牌面不符(如打出手中没有的牌)，整局不计入
+                stats["skipped"] += 1
+                continue
+            stats["games"] += 1
+            for kind, agree in decisions:
+                stats[kind][0] += agree
+                stats[kind][1] += 1
+        return stats
+
+
+def new_stats():
+    """一致率统计：turn / call 为 [一致次数, 决策次数]"""
+    return {"games": 0, "skipped": 0, "turn": [0, 0], "call": [0, 0]}
+
+
+def merge_stats(total, part):
+    total["games"] += part["games"]
+    total["skipped"] += part["skipped"]
+    for kind in ("turn", "call"):
+        total[kind][0] += part[kind][0]
+        total[kind][1] += part[kind][1]
+    return total
+
+
+# ===== 多进程 =====
+
+_worker_replayer = None
+
+
+def _init_worker(players, deadline_ms):
+    global _worker_replayer
+    _worker_replayer = GameReplayer(players=players, deadline_ms=deadline_ms)
+
+
+def _score_chunk(games):
+    return _worker_replayer.score(games)
+
+
+def _chunks(games, size):
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_archive(source, workers=1, players=None, deadline_ms=None, progress=None):
+    """
+    复盘一个对局记录文件(或文件列表)，返回一致率统计。
+    workers 大于 1 时按 _CHUNK_GAMES 局一份分给进程池，同时在途的任务不超过 2 * workers 份，
+    因此读取速度不会超过处理速度，内存占用与记录文件大小无关。
+    progress 为可选的回调，每完成一份任务以当前统计调用一次。
+    """
+    sources = source if isinstance(source, (list, tuple)) else [source]
+    stats = new_stats()
+
+    def games():
+        for s in sources:
+            yield from split_games(parse_events(read_lines(s)), stats)
+
+    if workers <= 1:
+        replayer = GameReplayer(players=players, deadline_ms=deadline_ms)
+        for chunk in _chunks(games(), _CHUNK_GAMES):
+            replayer.score(chunk, stats)
+            if progress is not None:
+                progress(stats)
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(players, deadline_ms)) as pool:
+        in_flight = set()
+        for chunk in _chunks(games(), _CHUNK_GAMES):
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    merge_stats(stats, future.result())
+                    if progress is not None:
+                        progress(stats)
+            in_flight.add(pool.submit(_score_chunk, chunk))
+        for future in in_flight:
+            merge_stats(stats, future.result())
+        if progress is not None:
+            progress(stats)
+    return stats
+
+
+def agreement(stats):
+    """返回 (turn 一致率, call 一致率, 总一致率)"""
+    rates = []
+    for kind in ("turn", "call"):
+        agree, total = stats[kind]
+        rates.append(agree / total if total else 0.0)
+    agree = stats["turn"][0] + stats["call"][0]
+    total = stats["turn"][1] + stats["call"][1]
+    rates.append(agree / total if total else 0.0)
+    return tuple(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="复盘对局记录，统计 AI 与记录中玩家动作的一致率")
+    parser.add_argument("sources", nargs="+", help="JSONL 对局记录文件(.gz 可直接读取)，- 表示标准输入")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数")
+    parser.add_argument("--players", type=int, nargs="*", help="只复盘这些座位")
+    parser.add_argument("--deadline-ms", type=float, help="每次决策的时间限制(毫秒)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(stats):
+        seconds = time.perf_counter() - start
+        print(f"\r已复盘 {stats['games']} 局，{stats['games'] / seconds:.1f} 局/秒", end="", file=sys.stderr)
+
+    stats = replay_archive(args.sources, args.workers, args.players, args.deadline_ms, progress)
+    print(file=sys.stderr)
+    turn, call, total = agreement(stats)
+    print(f"对局 {stats['games']} 局(跳过 {stats['skipped']} 局)")
+    print(f"摸牌/打牌一致率 {turn:.1%} ({stats['turn'][0]}/{stats['turn'][1]})")
+    print(f"吃碰杠和一致率 {call:.1%} ({stats['call'][0]}/{stats['call'][1]})")
+    print(f"总一致率 {total:.1%}，用时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# rollout.py
+from concurrent.futures import ProcessPoolExecutor, wait
+import random
+import time
+
+import snapshot
+import tile_loader
+from scoring import hand_scorer
+from ukeire import UkeireCalculator
+from win_table import win_table, is_special_complete
+
+# 一副牌中除去 4 家初始手牌后的牌山张数；无法推算时用来限制摸牌次数
+_WALL_SIZE = 136 - 13 * 4
+
+
+def task_seed(*parts):
+    """
+    由 (种子, 动作序号, 分片序号, 轮次, ...) 得到 64 位种子：按字符串做 SHA-512 播种，
+    不同的组合不会像线性组合那样互相重叠，且与进程、PYTHONHASHSEED 无关。
+    """
+    return random.Random(":".join(map(str, parts))).getrandbits(64)
+
+
+def score_win(counts, melds, self_drawn=True):
+    """和牌时的得分：按 scoring.HandScorer 取最高拆法的番数"""
+    return float(hand_scorer.score(counts, melds, self_drawn)[0])
+
+
+def play_out(counts, size, melds, unseen, hidden, offset, draws, rng):
+    """
+    从给定局面随机打到流局或自摸为止，返回本局得分(未和牌为 0)。
+
+    - counts / size: 本家手牌的 34 格计数与张数(不会被修改)
+    - melds: 本家副露，用于计分
+    - unseen: 场上未见牌的编号列表(来自 DeckCounter 的剩余计数)
+    - hidden: 其中属于三家对手手牌的张数，洗牌后先发给对手，其余为牌山
+    - offset: 牌山中下一张由本家摸的位置(之后每隔 4 张轮到本家一次)
+    - draws: 本家最多还能摸几次牌
+
+    默认策略：摸牌后能胡则胡，否则打出使向听数最小的牌，相同时优先打字牌。
+    只考虑本家自摸，不模拟对手的吃碰杠与和牌。
+    """
+    wall = unseen[:]
+    rng.shuffle(wall)
+    calc = UkeireCalculator(counts, size)
+    hand = calc.counts
+
+    position = hidden + offset
+    for _ in range(draws):
+        if position >= len(wall):
+            break
+        calc.draw(wall[position])
+        position += 4
+
+        if win_table.is_complete(hand) or (calc.size == 14 and is_special_complete(hand)):
+            return score_win(hand, melds)
+
+        options = calc.discard_shanten()
+        best_tile = None
+        best_shanten = 99
+        for tile in range(tile_loader.TILE_KINDS - 1, -1, -1):
+            shanten = options.get(tile)
+            if shanten is not None and shanten < best_shanten:
+                best_shanten = shanten
+                best_tile = tile
+        calc.discard(best_tile)
+
+    return 0.0
+
+
+def run_rollouts(task):
+    """
+    进程池中执行的任务：对同一局面连续做 n 次随机对局。
+    task = (data, walls, hidden, offset, draws, n, seed)，data 为 snapshot.encode 得到的局面快照，
+    本家手牌计数直接从快照的内存中读取。
+    walls 为未见牌列表的列表，第 i 次对局使用 walls[i % len(walls)]：
+    不做对手推断时为 None，即快照中的全部未见牌(hidden 为对手手牌张数)；
+    使用 OpponentModel 时为各个确定化世界的牌山(对手手牌已经分走，hidden 为 0)。
+    返回 (和牌次数, 总得分, 对局次数)。
+    """
+    data, walls, hidden, offset, draws, n, seed = task
+    view = snapshot.SnapshotView(data)
+    counts = view.hand_counts
+    size = view.hand_size
+    melds = view.melds(0)
+    if walls is None:
+        walls = [view.unseen()]
+    rng = random.Random(seed)
+    wins = 0
+    total = 0.0
+    for i in range(n):
+        score = play_out(counts, size, melds, walls[i % len(walls)], hidden, offset, draws, rng)
+        if score > 0:
+            wins += 1
+            total += score
+    return wins, total, n
+
+
+class RolloutEvaluator:
+    """
+    蒙特卡洛评估器：对每个候选动作模拟执行后，做 rollouts 次随机对局，
+    统计和牌率与期望得分。
+
+    对局分成 workers 份，通过 concurrent.futures 的进程池并行执行；
+    每份任务的随机数种子只由 (seed, 动作序号, 分片序号, 轮次) 决定(task_seed)，
+    因此结果与进程调度无关，可以复现。workers 为 1 时在当前进程内执行。
+
+    限时决策时每份任务只含 task_size 次对局(一次约几毫秒)，各动作的任务轮流提交，
+    到时未开始的任务被取消，已经开始的很快结束，下一次调用前先等它们结束。
+    """
+
+    def __init__(self, rollouts=200, workers=1, seed=0, batch=8, task_size=1):
+        self.rollouts = rollouts
+        self.workers = workers
+        self.seed = seed
+        # 限时决策时每一轮为每个动作追加的对局数上限
+        self.batch = batch
+        # 限时决策时每份任务的对局数
+        self.task_size = task_size
+        self.executor = None
+        # 上一次到时后未能取消(已经开始执行)的任务
+        self.pending = []
+
+    def _pool(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending = []
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _settle(self):
+        """等待上一次调用遗留的任务结束，避免新任务排在它们后面"""
+        if self.pending:
+            wait(self.pending)
+            self.pending = []
+
+    def make_tasks(self, state, action_index, offset, rollouts=None, round_index=0, task_size=None):
+        """
+        把当前(已执行候选动作的)局面打包为若干个可在子进程中执行的任务。
+        round_index 为限时决策中的轮次，不同轮次使用不同的随机数种子。
+        task_size 为 None 时分成 workers 份，否则每份至多 task_size 次对局。
+        state 带有 opponent_model 时，每次对局使用从中按权重抽取的确定化世界的牌山。
+        """
+        if rollouts is None:
+            rollouts = self.rollouts
+        remaining = state.deck_counter.remaining_deck
+        model = getattr(state, "opponent_model", None)
+
+        if model is not None:
+            seed = task_seed(self.seed, action_index, "worlds", round_index)
+            worlds = model.sample_worlds(remaining, rollouts, random.Random(seed))
+            walls = [world.wall_tiles() for world in worlds]
+            hidden = 0
+            wall = min(min(len(w) for w in walls), _WALL_SIZE)
+        else:
+            # 未见牌由子进程从快照中展开，任务中不再携带牌列表
+            walls = None
+            unseen = sum(remaining)
+            # 对手手牌张数 = 13 - 3 * 副露数，其余未见牌视为牌山
+            hidden = sum(13 - 3 * len(m) for m in state.melds[1:])
+            hidden = min(hidden, unseen)
+            wall = min(unseen - hidden, _WALL_SIZE)
+        draws = (wall - offset + 3) // 4
+
+        data = snapshot.encode(state)
+        if task_size is None:
+            chunks = min(self.workers, rollouts)
+        else:
+            chunks = -(-rollouts // task_size)
+        tasks = []
+        for chunk in range(chunks):
+            n = rollouts // chunks + (1 if chunk < rollouts % chunks else 0)
+            seed = task_seed(self.seed, action_index, chunk, round_index)
+            chunk_walls = walls[chunk::chunks] if walls is not None and len(walls) > 1 else walls
+            tasks.append((data, chunk_walls, hidden, offset, draws, n, seed))
+        return tasks
+
+    def collect(self, tasks_per_action, deadline=None):
+        """
+        执行每个动作的任务列表，返回每个动作累计的 [和牌次数, 总得分, 对局次数]。
+        各动作的任务轮流执行(第 1 份各动作轮一遍，再第 2 份……)，到时先停下的不会总是靠后的动作。
+        deadline 为 time.perf_counter() 时刻；到时仍未完成的任务不计入结果。
+        """
+        totals = [[0, 0.0, 0] for _ in tasks_per_action]
+        order = []
+        for i in range(max((len(tasks) for tasks in tasks_per_action), default=0)):
+            for index, tasks in enumerate(tasks_per_action):
+                if i < len(tasks):
+                    order.append((index, tasks[i]))
+
+        if self.workers <= 1:
+            for index, task in order:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                wins, total, n = run_rollouts(task)
+                totals[index][0] += wins
+                totals[index][1] += total
+                totals[index][2] += n
+            return totals
+
+        self._settle()
+        pool = self._pool()
+        futures = {pool.submit(run_rollouts, task): index for index, task in order}
+        timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+        done, not_done = wait(futures, timeout=timeout)
+        # 已经开始执行的任务无法取消，留到下一次调用前等待
+        self.pending = [future for future in not_done if not future.cancel()]
+        for future in done:
+            wins, total, n = future.result()
+            index = futures[future]
+            totals[index][0] += wins
+            totals[index][1] += total
+            totals[index][2] += n
+        return totals
+
+    def run(self, tasks_per_action):
+        """执行每个动作的任务列表，返回每个动作的 (和牌率, 期望得分)"""
+        return [to_rates(t) for t in self.collect(tasks_per_action)]
+
+
+def to_rates(totals):
+    """[和牌次数, 总得分, 对局次数] -> (和牌率, 期望得分)"""
+    wins, total, n = totals
+    return (wins / n, total / n) if n else (0.0, 0.0)
@@ -1,5 +1,13 @@
 # rule_engine.py
+from array import array
+
 import tile_loader
+from lru_cache import CACHE_SIZE, LRUCache
+from win_table import win_table, is_special_complete
+from shanten import shanten_table
+from ukeire import UkeireCalculator
+from probability import WIN, win_probability
+from scoring import hand_scorer
 
 class RuleEngine:
     """
@@ -8,58 +16,65 @@ class RuleEngine:
     - can_peng: 是否可以碰
     - can_gang: 是否可以杠
     - can_hu:   是否可以胡牌
-    - calculate_hand_value: 评估手牌价值，如向听数、搭子数、可能番数等
+    - calculate_shanten: 计算向听数(标准型、七对子、国士无双取最小)
+    - calculate_ting_tiles: 计算进张(有效牌)及其未见张数
+    - calculate_hand_value: 计算和牌的番数与番种(取最高的拆法)
 
     注意：
-    1. 这里假设手牌和牌面都用相同的标记方式（整型或特殊字符串），
-       并且不考虑花牌、红中等特殊牌，亦不包含特殊牌型（七对、十三幺等）。
+    1. 手牌统一使用 hand.Hand 计数向量，牌面使用紧凑编号(0..33，见 tile_loader)，
+       并且不考虑花牌等特殊牌。
     2. can_chi 的前提是“只有上家打出来的牌才能吃”，此处用 player_id == 3 来代表“上家”。
-    3. 评估手牌价值的方法只是示例，并不是真正的计算方式。
-    4. 胡牌判断使用最常见的“4副面子 + 1对”的思路做简化，不考虑“七对/十三幺”等特殊番型。
-    5. 如需更完整的逻辑，需要结合游戏流程（碰/杠后的手牌结构、各类特殊番型算法等）加以扩展。
+    3. 番数计算参照国标麻将的常见番种(见 scoring.FAN_VALUES)，不含风刻、暗刻、听牌方式等依赖场况的番种。
+    4. 胡牌判断支持“4副面子 + 1对”的常规胡，以及门前 14 张时的七对子、十三幺(国士无双)。
+       常规胡通过 win_table 中按单花色计数模式预先生成的查找表判定，不成立时才检查两种特殊牌型。
+    5. 如需更完整的逻辑，需要结合游戏流程（门风/圈风、和牌方式等）加以扩展。
     """
 
-    def __init__(self, state_manager):
+    def __init__(self, state_manager, cache_size=CACHE_SIZE, cache=None):
+        """
+        cache: 可选的 lru_cache.LRUCache，可在多个 RuleEngine / 线程之间共享；
+               为 None 时按 cache_size 新建一个，cache_size 为 0 时不使用缓存。
+        can_hu、calculate_shanten 与进张计算的结果按手牌计数(及未见牌计数)缓存。
+        """
         self.state_manager = state_manager
         # 在此持有游戏状态，用来实现更复杂的can_gang规则判断
+        if cache is None and cache_size:
+            cache = LRUCache(cache_size)
+        self.cache = cache
 
     def can_chi(self, hand, tile):
         """
         判断当前手牌是否可以吃这张刚打出的牌 (tile)。
-        返回:可以吃的组合列表，如果为空表示无法吃
+        hand 为 Hand 计数向量，tile 为牌的紧凑编号(0..33)。
+        返回:可以吃的组合列表(每个组合为排好序的编号列表)，如果为空表示无法吃
         """
         # 只有当上家打出的牌时才可以吃
         if self.state_manager.current_player != 3:
             return []
 
-        # 如果这张牌超出常规序数牌范围，不考虑吃
-        if tile_loader.mahjong.get_value(tile) == None:
-            return []
-        
-        # 获取牌面的数字（不存在则为0）
-        [tile_title, tile_number] = tile_loader.mahjong.get_value(tile)
-
         # 如果这张牌是非数字牌，不考虑吃
-        if tile_number == 0:
+        if tile_loader.is_honor(tile):
             return []
 
+        # 获取牌面的数字(1~9)，同一花色内编号连续
+        tile_number = tile_loader.number_of(tile)
+        counts = hand.counts
+
         possible_chi = []
         # 三种常见顺子形态:
         # (tile-2, tile-1, tile)
         # (tile-1, tile, tile+1)
         # (tile, tile+1, tile+2)
         chi_offset_sets = [(-2, -1), (-1, 1), (1, 2)]
-        for offsets in chi_offset_sets:
-            needed_numbers = [tile_number + o for o in offsets]
+        for low, high in chi_offset_sets:
             # 保证顺子在合法范围内 (1~9)
-            if any(t < 1 or t > 9 for t in needed_numbers):
+            if tile_number + low < 1 or tile_number + high > 9:
                 continue
             # 检查手牌里是否都有这些牌
-            needed_tiles = [tile_loader.mahjong.get_name((tile_title, n)) for n in needed_numbers]
-            if all(hand.count(t) > 0 for t in needed_tiles):
+            if counts[tile + low] > 0 and counts[tile + high] > 0:
                 # 这里的返回格式仅作示例，把 tile 自己也包含在组合中
-                combo = [tile] + needed_tiles
-                possible_chi.append(sorted(combo))
+                combo = sorted((tile, tile + low, tile + high))
+                possible_chi.append(combo)
 
         return possible_chi
 
@@ -68,7 +83,7 @@ class RuleEngine:
         判断是否可以碰这张牌。
         返回bool，能碰则 True，否则 False
         """
-        return hand.count(tile) >= 2
+        return hand.counts[tile] >= 2
 
     def can_gang(self, hand, tile):
         """
@@ -81,7 +96,7 @@ class RuleEngine:
             # 此时别人正在打牌
             
             # 情况0：直杠（手里就有 3 张，别人打出第 4 张）
-            if hand.count(tile) == 3:
+            if hand.counts[tile] == 3:
                 return [True, 0]
             
         else:
@@ -89,12 +104,12 @@ class RuleEngine:
             # 此时轮到本家摸牌
             
             # 情况1：暗杠（手里就有 3 张，再摸到一张相同的）
-            if hand.count(tile) == 3:
+            if hand.counts[tile] == 3:
                 return [True, 1]
         
             # 情况2：补杠（已经碰了该牌，再摸到一张相同的）
             for m in melds[0]:
-                if m["type"] == "PENG" and m["tile"] == tile:
+                if m["type"] == "PENG" and m["tile"][0] == tile:
                     return [True, 2]
 
         return [False, None]
@@ -102,125 +117,150 @@ class RuleEngine:
     def check_dark_gang(self, hand):
         """
         用于检查当前手中的牌是否存在暗杠。
-        返回一个列表，其中列出了可能的暗杠牌。
+        返回一个列表，其中列出了可能的暗杠牌(紧凑编号)。
         """
-        possible_dark_gangs = []
-        for tile in {tuple(t) for t in hand}:
-            tile = list(tile)
-            if hand.count(tile) == 4:
-                possible_dark_gangs.append(tile)
-        return possible_dark_gangs
+        counts = hand.counts
+        return [t for t in range(tile_loader.TILE_KINDS) if counts[t] == 4]
 
     def can_hu(self, hand, tile = None):
         """
         判断是否满足胡牌条件。
-        简化思路：只考虑“4面子 + 1对”常规胡，不含七对、十三幺等特殊牌型。
+        先判断“4面子 + 1对”常规胡：每种数牌花色查 win_table 中预先生成的单花色表，字牌按张数直接判断；
+        不成立且为门前 14 张时，再判断七对子、十三幺(常规胡的判定路径不增加开销)。
+        若 tile 不为 None，则临时把这张牌加入计数向量一起判断，判断完后复原，不修改 hand。
         返回bool，能胡则 True，否则 False
         """
-        # 创建新的牌数组，若 tile 不为 None，则把这张牌也放进来一起判断
-        if tile is not None:
-            hand.append(tile)
+        if self.cache is not None:
+            return self.cache.get_or_compute(("can_hu", hand.key(), tile), self._can_hu, hand, tile)
+        return self._can_hu(hand, tile)
 
-        hand_value = [tile_loader.mahjong.get_value(t) for t in hand]
-        hand_value.sort()
+    @staticmethod
+    def _can_hu(hand, tile):
+        counts = hand.counts
+        size = hand.size
+        if tile is None:
+            # 常规胡牌时，手牌总数应满足 3n+2（4副面子+1对 = 14 张）
+            if size % 3 != 2:
+                return False
+            return win_table.is_complete(counts) or (size == 14 and is_special_complete(counts))
 
-        # 常规胡牌时，手牌总数应为 14（4副面子+1对 = 14 张）
-        if len(hand_value) % 3 != 2:
+        if (size + 1) % 3 != 2:
             return False
+        counts[tile] += 1
+        try:
+            return win_table.is_complete(counts) or (size == 13 and is_special_complete(counts))
+        finally:
+            counts[tile] -= 1
 
-        return self._is_standard_win(hand_value)
-
-    def _is_standard_win(self, tiles):
+    def calculate_hand_value(self, hand, tile=None, melds=None, self_drawn=None):
         """
-        判断一个完整（长度为14或满足 3n+2）的手牌是否能拆分为 (1雀头 + 4面子)。
-        简化检查：只找一个对子，其余全部由刻子或顺子组成。
-        """
-        if not tiles:
-            return False
-
-        # 先尝试找“对”
-        # 任意一种对子拆出后，再判断剩余的牌是否能全部拆成刻子/顺子
-        unique_tiles = {tuple(t) for t in tiles}
-        for t in unique_tiles:
-            t = list(t)
-            if tiles.count(t) >= 2:
-                # 拆掉这个对子
-                tmp = list(tiles)
-                tmp.remove(t)
-                tmp.remove(t)
-                # 检查剩余的 12 张是否能完全拆成刻子/顺子
-                if self._all_melds(tmp):
-                    return True
-
-        return False
-
-    def _all_melds(self, tiles):
-        """
-        判断传入的牌（长度必为3的倍数）能否全部拆成刻子或顺子。
-        这里的顺子仅考虑数牌的连续 (例如 [3,4,5])，不考虑风牌、字牌等。
-        """
-        # 递归结束条件：没有牌了，说明都能拆完
-        if not tiles:
-            return True
-
-        tiles.sort()
-        first = tiles[0]
-
-        # 优先尝试刻子
-        if tiles.count(first) >= 3:
-            new_tiles = tiles[:]
-            for _ in range(3):
-                new_tiles.remove(first)
-            if self._all_melds(new_tiles):
-                return True
-
-        # 再尝试顺子 (适用于简单数牌)
-        # 首张若为 x，后面需要 (x+1), (x+2)
-        if first[1] <= 7:  # 确保不会越界到 8,9 无法组成顺子
-            if ([first[0], first[1] + 1] in tiles) and ([first[0], first[1] + 2] in tiles):
-                new_tiles = tiles[:]
-                new_tiles.remove(first)
-                new_tiles.remove([first[0], first[1] + 1])
-                new_tiles.remove([first[0], first[1] + 2])
-                if self._all_melds(new_tiles):
-                    return True
-        return False
-
-    # def calculate_hand_value(self, hand):
-        """
-        计算手牌价值。
-        这里以“向听数 / 搭子数 / 可能番数”等概念做示例，并不是真正的算法。
+        计算和牌的番数：枚举手牌与副露的所有“面子 + 雀头”拆法(及七对、十三幺)，取番数最高的一种。
 
         参数:
-        - hand: list[int]，当前玩家的手牌
-        
+        - hand: Hand，手中的牌
+        - tile: 荣和时别人打出的牌，与 can_hu 相同，临时加入计数向量后计算；为 None 时 hand 已包含和的牌
+        - melds: 本家副露，默认取 StateManager.melds[0]
+        - self_drawn: 是否自摸，默认 tile 为 None 时视为自摸
+
         返回:
-        - dict，示例格式:
-          {
-            'shanten': x,  # 向听数
-            'da_zi': y,    # 搭子数（示例里未实际计算，仅返回0）
-            'fan': z       # 可能番数（此处仅示例）
-          }
-        """
-        shanten = self._calculate_shanten(hand)
-        da_zi = 0  # 示例中未真实计算
-        # 可能番数仅做示例：向听越少，潜在番数越高（非常粗糙）
-        possible_fan = max(0, 8 - shanten)
+        - dict: {'shanten': 向听数, 'fan': 番数, 'patterns': 番种名称元组}，
+          未和牌时番数为 0、番种为空
+        """
+        if melds is None:
+            melds = self.state_manager.melds[0]
+        if self_drawn is None:
+            self_drawn = tile is None
+        if self.cache is not None:
+            melds_key = tuple((m["type"], tuple(m["tile"])) for m in melds)
+            return self.cache.get_or_compute(("hand_value", hand.key(), tile, melds_key, self_drawn),
+                                             self._hand_value, hand, tile, melds, self_drawn)
+        return self._hand_value(hand, tile, melds, self_drawn)
 
+    @staticmethod
+    def _hand_value(hand, tile, melds, self_drawn):
+        counts = array("b", hand.counts)
+        size = hand.size
+        if tile is not None:
+            counts[tile] += 1
+            size += 1
+        fan, patterns = hand_scorer.score(counts, melds, self_drawn)
         return {
-            "shanten": shanten,
-            "da_zi": da_zi,
-            "fan": possible_fan
+            "shanten": shanten_table.shanten(counts, size),
+            "fan": fan,
+            "patterns": patterns,
         }
 
-    # def _calculate_shanten(self, tiles):
+    def calculate_shanten(self, hand):
+        """
+        计算向听数(还差几步听牌)：0 为听牌，-1 为已经胡牌。
+        标准型使用 shanten 模块中按单花色预计算的(面子, 搭子, 雀头)记录，跨花色合并得到结果；
+        门前 13/14 张时再与七对子、国士无双的向听数取最小值。已副露的面子数由手牌张数推算。
+        """
+        if self.cache is not None:
+            return self.cache.get_or_compute(("shanten", hand.key()), shanten_table.shanten,
+                                             hand.counts, hand.size)
+        return shanten_table.shanten(hand.counts, hand.size)
+
+    def remaining_counts(self):
+        """
+        场上未见的各种牌张数。StateManager 会把自己的手牌、各家弃牌和副露都从
+        DeckCounter 中扣除，因此剩余计数即为未见张数。
+        """
+        return self.state_manager.deck_counter.remaining_deck
+
+    def calculate_ting_tiles(self, hand, remaining=None):
+        """
+        计算进张：返回 (向听数, {牌: 未见张数})，字典中为能让向听数减少的牌。
+        听牌(向听数为 0)时即为听的牌。
+        """
+        if remaining is None:
+            remaining = self.remaining_counts()
+        if self.cache is not None:
+            return self.cache.get_or_compute(("ting", hand.key(), bytes(remaining)),
+                                             self._ukeire, hand, remaining)
+        return self._ukeire(hand, remaining)
+
+    @staticmethod
+    def _ukeire(hand, remaining):
+        return UkeireCalculator(hand.counts, hand.size).ukeire(remaining)
+
+    def calculate_ting_tiles_count(self, hand, remaining=None):
+        """进张(听牌时即听牌)的未见总张数"""
+        return sum(self.calculate_ting_tiles(hand, remaining)[1].values())
+
+    def calculate_discard_ting(self, hand, remaining=None):
+        """
+        对 3n+2 张的手牌逐一试打，返回 {打出的牌: (向听数, {牌: 未见张数})}。
+        每个候选打法只重算被打出那张牌所在的花色。
+        """
+        if remaining is None:
+            remaining = self.remaining_counts()
+        if self.cache is not None:
+            return self.cache.get_or_compute(("discard_ting", hand.key(), bytes(remaining)),
+                                             self._discard_options, hand, remaining)
+        return self._discard_options(hand, remaining)
+
+    @staticmethod
+    def _discard_options(hand, remaining):
+        return UkeireCalculator(hand.counts, hand.size).discard_options(remaining)
+
+    def calculate_win_probability(self, hand, draws, target=WIN, remaining=None):
+        """
+        本家还能摸 draws 次牌时和牌(target=WIN)或听牌(target=TENPAI)的精确概率，
+        打牌策略为摸切无效牌、有效牌按向听数与进张选打(见 probability.DrawProbability)。
+        """
+        if remaining is None:
+            remaining = self.remaining_counts()
+        if self.cache is not None:
+            return self.cache.get_or_compute(("probability", hand.key(), bytes(remaining), draws, target),
+                                             win_probability, hand.counts, hand.size, remaining, draws, target)
+        return win_probability(hand.counts, hand.size, remaining, draws, target)
+
+    def must_discard_if_none_action(self):
         """
-        计算向听数的简化示例。真正的向听算法要更复杂，这里仅做演示。
+        轮到本家行动时(摸牌之后)，若不选择胡/杠，就必须打出一张牌。
         """
-        # 一种非常简单（且并不准确）的做法：
-        # 向听数 = 8 -（当前能组成的刻子/顺子数 * 2） - 对子修正
-        # 实际在完整算法中需要考虑多个拆分、搭子、复合形等多种情况。
-        return 8
+        return self.state_manager.current_player == 0
     
 
 # rule_engine = RuleEngine()
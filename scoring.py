@@ -0,0 +1,253 @@
+# scoring.py
+import itertools
+
+import tile_loader
+from win_table import is_special_complete
+
+# 拆解中的组(面子/雀头)：(种类, 起始牌)，顺子的起始牌为最小的一张
+CHOW = 0   # 顺子
+PUNG = 1   # 刻子
+KONG = 2   # 杠
+PAIR = 3   # 雀头
+
+_WINDS = range(tile_loader.HONOR_START, tile_loader.HONOR_START + 4)
+_DRAGONS = range(tile_loader.HONOR_START + 4, tile_loader.TILE_KINDS)
+
+# 番种及番数(参照国标麻将的常见番种，不含风刻、暗刻、听牌方式等依赖场况的番种)
+FAN_VALUES = {
+    "大四喜": 88, "大三元": 88, "十三幺": 88,
+    "小四喜": 64, "小三元": 64, "字一色": 64,
+    "七对": 24, "清一色": 24,
+    "一气通贯": 16,
+    "三色三同顺": 8,
+    "碰碰和": 6, "混一色": 6,
+    "全带幺": 4,
+    "箭刻": 2, "平和": 2, "断幺": 2, "门前清": 2,
+    "一般高": 1, "明杠": 1, "自摸": 1,
+    # 没有任何番种时按 1 番计
+    "鸡和": 1,
+}
+
+# 计了前者就不再计后者的番种
+_EXCLUDES = {
+    "大四喜": ("碰碰和",),
+    "小四喜": ("碰碰和",),
+    "大三元": ("箭刻",),
+    "小三元": ("箭刻",),
+    "字一色": ("碰碰和", "全带幺"),
+    "七对": ("门前清",),
+    "十三幺": ("门前清",),
+}
+
+
+def meld_blocks(melds):
+    """StateManager.melds 中的副露 -> 拆解中的组"""
+    blocks = []
+    for meld in melds:
+        kind = meld["type"]
+        tiles = meld["tile"]
+        if kind == "CHI":
+            blocks.append((CHOW, min(tiles)))
+        elif kind == "PENG":
+            blocks.append((PUNG, tiles[0]))
+        else:
+            blocks.append((KONG, tiles[0]))
+    return tuple(blocks)
+
+
+def _is_orphan_block(block):
+    kind, tile = block
+    if kind == CHOW:
+        return tile % 9 in (0, 6)
+    return tile_loader.is_orphan(tile)
+
+
+class HandScorer:
+    """
+    和牌的拆解枚举与番数计算。
+
+    一手和牌(手中 3n+2 张 + 副露)可能有多种“n 面子 + 1 雀头”的拆法，番数随拆法而不同
+    (如 111222333 可拆为三刻子或三个相同的顺子)，计分时枚举所有拆法取最高。
+    数牌各花色互不影响，按单花色 9 格计数模式(五进制键)缓存该花色的全部拆法，
+    一手牌的拆法是各花色拆法的笛卡尔积，因此搜索/模拟中反复计分时几乎只剩查表与计番。
+    字牌只能组成刻子或雀头，拆法唯一。
+
+    七对、十三幺只在门前 14 张时成立，与常规拆法一起比较取最高。
+    """
+
+    def __init__(self, fan_values=FAN_VALUES):
+        self.fan_values = fan_values
+        # (花色起始编号, 五进制键) -> 该花色的全部拆法
+        self.suit_cache = {}
+
+    # ===== 拆解 =====
+
+    def suit_decompositions(self, counts, base):
+        """counts[base:base+9] 这一花色能拆成的所有 (面子..., 至多一个雀头) 组合"""
+        key = 0
+        for i in range(base, base + 9):
+            key = key * 5 + counts[i]
+        result = self.suit_cache.get((base, key))
+        if result is None:
+            result = tuple(self._split(list(counts[base:base + 9]), base, 0, False))
+            self.suit_cache[(base, key)] = result
+        return result
+
+    def _split(self, counts, base, i, has_pair):
+        # 找到第一张还有牌的位置，枚举这张牌的用法(刻子/雀头/顺子)，必须用完所有牌
+        while i < 9 and counts[i] == 0:
+            i += 1
+        if i == 9:
+            yield ()
+            return
+        tile = base + i
+        if counts[i] >= 3:
+            counts[i] -= 3
+            for rest in self._split(counts, base, i, has_pair):
+                yield ((PUNG, tile),) + rest
+            counts[i] += 3
+        if counts[i] >= 2 and not has_pair:
+            counts[i] -= 2
+            for rest in self._split(counts, base, i, True):
+                yield ((PAIR, tile),) + rest
+            counts[i] += 2
+        if i <= 6 and counts[i + 1] and counts[i + 2]:
+            counts[i] -= 1
+            counts[i + 1] -= 1
+            counts[i + 2] -= 1
+            for rest in self._split(counts, base, i, has_pair):
+                yield ((CHOW, tile),) + rest
+            counts[i] += 1
+            counts[i + 1] += 1
+            counts[i + 2] += 1
+
+    def decompositions(self, counts, melds=()):
+        """
+        枚举手牌 counts(3n+2 张)与副露 melds 组成的所有“面子 + 1 雀头”拆法，
+        每个拆法为组的元组(副露在最前)。不能和牌时不产生任何结果。
+        """
+        honors = []
+        pairs = 0
+        for tile in range(tile_loader.HONOR_START, tile_loader.TILE_KINDS):
+            c = counts[tile]
+            if c == 3:
+                honors.append((PUNG, tile))
+            elif c == 2:
+                honors.append((PAIR, tile))
+                pairs += 1
+            elif c:
+                return
+
+        groups = []
+        for base in (0, 9, 18):
+            remainder = sum(counts[base:base + 9]) % 3
+            if remainder == 1:
+                return
+            if remainder == 2:
+                pairs += 1
+            options = self.suit_decompositions(counts, base)
+            if not options:
+                return
+            groups.append(options)
+        if pairs != 1:
+            return
+
+        fixed = meld_blocks(melds) + tuple(honors)
+        for parts in itertools.product(*groups):
+            yield fixed + parts[0] + parts[1] + parts[2]
+
+    # ===== 计番 =====
+
+    def _hand_fans(self, counts, melds, self_drawn):
+        """与拆法无关、只看牌张的番种"""
+        present = [c > 0 for c in counts]
+        for meld in melds:
+            for tile in meld["tile"]:
+                present[tile] = True
+        suits = sum(1 for base in (0, 9, 18) if any(present[base:base + 9]))
+        honors = any(present[tile_loader.HONOR_START:])
+
+        fans = []
+        if suits == 0:
+            fans.append("字一色")
+        elif suits == 1:
+            fans.append("混一色" if honors else "清一色")
+        if not any(present[t] for t in tile_loader.ORPHANS):
+            fans.append("断幺")
+        if not melds:
+            fans.append("门前清")
+        if self_drawn:
+            fans.append("自摸")
+        return fans
+
+    @staticmethod
+    def _block_fans(blocks):
+        """只与拆法有关的番种"""
+        fans = []
+        chows = [tile for kind, tile in blocks if kind == CHOW]
+        sets = [tile for kind, tile in blocks if kind == PUNG or kind == KONG]
+        pair = next(tile for kind, tile in blocks if kind == PAIR)
+
+        dragon_sets = sum(1 for tile in sets if tile in _DRAGONS)
+        wind_sets = sum(1 for tile in sets if tile in _WINDS)
+        if dragon_sets == 3:
+            fans.append("大三元")
+        elif dragon_sets == 2 and pair in _DRAGONS:
+            fans.append("小三元")
+        fans.extend(["箭刻"] * dragon_sets)
+        if wind_sets == 4:
+            fans.append("大四喜")
+        elif wind_sets == 3 and pair in _WINDS:
+            fans.append("小四喜")
+
+        if not chows:
+            fans.append("碰碰和")
+        elif len(chows) == 4 and not tile_loader.is_honor(pair):
+            fans.append("平和")
+        for base in (0, 9, 18):
+            if base in chows and base + 3 in chows and base + 6 in chows:
+                fans.append("一气通贯")
+        for number in range(7):
+            if number in chows and number + 9 in chows and number + 18 in chows:
+                fans.append("三色三同顺")
+        for tile in set(chows):
+            if chows.count(tile) >= 2:
+                fans.append("一般高")
+        if all(_is_orphan_block(block) for block in blocks):
+            fans.append("全带幺")
+        fans.extend(["明杠"] * sum(1 for kind, _ in blocks if kind == KONG))
+        return fans
+
+    def _total(self, fans):
+        """去掉被排除的番种后求和；没有番种时计为鸡和"""
+        excluded = set()
+        for name in fans:
+            excluded.update(_EXCLUDES.get(name, ()))
+        fans = [name for name in fans if name not in excluded]
+        if not fans:
+            fans = ["鸡和"]
+        values = self.fan_values
+        return sum(values[name] for name in fans), tuple(fans)
+
+    def score(self, counts, melds=(), self_drawn=False):
+        """
+        计算和牌的番数：返回 (番数, 番种名称元组)，取所有拆法中番数最高的一种。
+        counts 为手中 3n+2 张的 34 格计数(包括和的那张)，melds 为本家副露；
+        不能和牌时返回 (0, ())。
+        """
+        hand_fans = self._hand_fans(counts, melds, self_drawn)
+        best = (0, ())
+        for blocks in self.decompositions(counts, melds):
+            result = self._total(hand_fans + self._block_fans(blocks))
+            if result[0] > best[0]:
+                best = result
+        if not melds and sum(counts) == 14 and is_special_complete(counts):
+            special = "七对" if counts.count(2) == 7 else "十三幺"
+            result = self._total(hand_fans + [special])
+            if result[0] > best[0]:
+                best = result
+        return best
+
+
+# 快捷调用
+hand_scorer = HandScorer()
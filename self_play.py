@@ -0,0 +1,250 @@
+# self_play.py
+import argparse
+import random
+import time
+
+import deck_counter
+import metrics
+import tile_loader
+from state_manager import StateManager
+from rule_engine import RuleEngine
+from decision_maker import DecisionMaker
+from opponent_model import OpponentModel
+
+PLAYERS = 4
+HAND_SIZE = 13
+
+# 别人打出牌后各种反应的优先级：胡 > 杠/碰 > 吃 > 不要
+_CLAIM_PRIORITY = {"HU": 3, "GANG": 2, "PENG": 2, "CHI": 1, "PASS": 0}
+
+
+class Seat:
+    """
+    一个座位的视角：自己的 StateManager + RuleEngine + DecisionMaker。
+    StateManager 中的玩家编号都是相对编号，0 为自己，1 为下家，3 为上家。
+    """
+
+    def __init__(self, index, make_decision_maker):
+        self.index = index
+        self.state = StateManager()
+        self.rule_engine = RuleEngine(self.state)
+        self.decision_maker = make_decision_maker(self.rule_engine)
+
+    def relative(self, player):
+        """绝对座位号 -> 本座位视角下的相对编号"""
+        return (player - self.index) % PLAYERS
+
+
+class SelfPlayEngine:
+    """
+    无需 input() 的四人自动对局引擎。
+
+    牌山由一个带种子的 DeckCounter 表示，按剩余张数随机摸牌；每个座位各自维护
+    StateManager，只看到自己的手牌和公开信息(弃牌、副露)。引擎负责发牌、摸牌、打牌，
+    并按“胡 > 杠/碰 > 吃”的优先级(同级时按出牌者之后的座位顺序)处理别人打出的牌。
+
+    make_decision_maker 可以是一个函数，也可以是 4 个函数的列表(每个座位各自的 AI)，
+    函数接收 RuleEngine，返回 DecisionMaker。
+
+    opponent_particles 大于 0 时给每个座位挂上该粒子数的 OpponentModel，并在每次打牌后
+    统计推断的准确度：各对手暗手的期望张数与真实手牌的 L1 误差，与“按未见张数均匀分配”比较。
+    """
+
+    def __init__(self, make_decision_maker=DecisionMaker, seed=0, opponent_particles=0):
+        if not isinstance(make_decision_maker, (list, tuple)):
+            make_decision_maker = [make_decision_maker] * PLAYERS
+        self.seats = [Seat(i, make_decision_maker[i]) for i in range(PLAYERS)]
+        self.rng = random.Random(seed)
+        deck_list = tile_loader.mahjong.to_ids(deck_counter.load_deck("resources/deck"))
+        self.wall = deck_counter.DeckCounter(deck_list)
+        if opponent_particles > 0:
+            for seat in self.seats:
+                seat.state.opponent_model = OpponentModel(particles=opponent_particles, seed=seed * PLAYERS + seat.index)
+        # 对手手牌推断的累计误差：[样本数, 模型误差, 均匀分配误差]
+        self.inference = [0, 0.0, 0.0]
+
+    # ===== 公开信息广播 =====
+
+    def _broadcast_discard(self, player, tile):
+        for seat in self.seats:
+            if seat.index != player:
+                seat.state.add_discard(seat.relative(player), tile)
+                seat.state.deck_counter.discard(tile)
+                if seat.state.opponent_model is not None:
+                    self._measure_inference(seat, player)
+
+    def _measure_inference(self, seat, player):
+        """比较 seat 对 player 暗手的推断与真实手牌"""
+        state = seat.state
+        unseen = state.deck_counter.remaining_deck
+        actual = self.seats[player].state.hand.counts
+        estimate = state.opponent_model.hand_counts(seat.relative(player), unseen)
+        share = sum(actual) / sum(unseen)
+        stats = self.inference
+        stats[0] += 1
+        stats[1] += sum(abs(estimate[t] - actual[t]) for t in range(tile_loader.TILE_KINDS))
+        stats[2] += sum(abs(unseen[t] * share - actual[t]) for t in range(tile_loader.TILE_KINDS))
+
+    def _broadcast_meld(self, player, meld, revealed):
+        """把副露告知其他座位，revealed 为此前其他人没见过的牌"""
+        for seat in self.seats:
+            if seat.index != player:
+                seat.state.add_meld(seat.relative(player), meld)
+                for t in revealed:
+                    seat.state.deck_counter.discard(t)
+
+    def _broadcast_added_gang(self, player, tile):
+        """补杠：其他座位把该玩家对应的碰升级为杠，只新亮出一张"""
+        for seat in self.seats:
+            if seat.index != player:
+                seat.state.upgrade_gang(seat.relative(player), tile)
+                seat.state.deck_counter.discard(tile)
+
+    # ===== 对局流程 =====
+
+    def play_game(self, dealer=0):
+        """
+        进行一局，返回结果字典：
+        {"winner": 座位或 None, "loser": 放铳者或 None, "tsumo": bool, "draws": 摸牌次数}
+        """
+        self.wall.reset()
+        self.wall.seed(self.rng.getrandbits(64))
+        for seat in self.seats:
+            seat.state.reset()
+            seat.state.initialize_hand([self.wall.draw_random() for _ in range(HAND_SIZE)])
+
+        player = dealer
+        need_draw = True
+        draws = 0
+        while True:
+            seat = self.seats[player]
+            seat.state.current_player = 0
+            tile = None
+            if need_draw:
+                tile = self.wall.draw_random()
+                if tile is None:
+                    return {"winner": None, "loser": None, "tsumo": False, "draws": draws}
+                draws += 1
+                seat.state.apply(("DRAW", tile))
+                seat.state.commit()
+
+            action = seat.decision_maker.decide_action(seat.state, tile)
+
+            if action[0] == "HU":
+                return {"winner": player, "loser": None, "tsumo": True, "draws": draws}
+
+            if action[0] == "GANG" or action[0] == "AN GANG":
+                seat.state.apply(action)
+                removed, upgraded = seat.state.journal[-1][2]
+                seat.state.commit()
+                if upgraded is not None:
+                    self._broadcast_added_gang(player, action[1])
+                else:
+                    self._broadcast_meld(player, seat.state.melds[0][-1], [action[1]] * removed)
+                # 杠后从牌山补一张
+                need_draw = True
+                continue
+
+            if action[0] != "DISCARD":
+                action = ("DISCARD", seat.decision_maker.select_best_discard(seat.state.hand))
+
+            # 打出一张牌，并询问其他座位的反应
+            seat.state.apply(action)
+            seat.state.commit()
+            discarded = action[1]
+            seat.state.notify_discard(0, discarded)
+            self._broadcast_discard(player, discarded)
+
+            claimant, claim = self._resolve_claims(player, discarded)
+            if claimant is None:
+                player = (player + 1) % PLAYERS
+                need_draw = True
+                continue
+            if claim[0] == "HU":
+                return {"winner": claimant, "loser": player, "tsumo": False, "draws": draws}
+
+            claimer = self.seats[claimant]
+            claimer.state.apply(claim)
+            claimer.state.commit()
+            meld = claimer.state.melds[0][-1]
+            revealed = list(meld["tile"])
+            revealed.remove(discarded)
+            self._broadcast_meld(claimant, meld, revealed)
+
+            # 明杠后补牌；吃/碰之后不摸牌，直接出牌
+            player = claimant
+            need_draw = claim[0] == "GANG"
+
+    def _resolve_claims(self, player, tile):
+        """询问其他三家对打出的牌的反应，返回 (座位, 动作)，无人要时返回 (None, None)"""
+        best = None
+        for step in range(1, PLAYERS):
+            index = (player + step) % PLAYERS
+            seat = self.seats[index]
+            seat.state.current_player = seat.relative(player)
+            action = seat.decision_maker.decide_action(seat.state, tile)
+            priority = _CLAIM_PRIORITY.get(action[0], 0)
+            if priority > 0 and (best is None or priority > best[0]):
+                best = (priority, index, action)
+        if best is None:
+            return None, None
+        return best[1], best[2]
+
+    def run(self, games):
+        """连续对局 games 局，返回统计结果(含每秒对局数)"""
+        stats = {"games": 0, "tsumo": 0, "ron": 0, "exhausted": 0,
+                 "wins_by_seat": [0] * PLAYERS, "draws": 0}
+        start = time.perf_counter()
+        for game in range(games):
+            result = self.play_game(dealer=game % PLAYERS)
+            stats["games"] += 1
+            stats["draws"] += result["draws"]
+            if result["winner"] is None:
+                stats["exhausted"] += 1
+            else:
+                stats["wins_by_seat"][result["winner"]] += 1
+                stats["tsumo" if result["tsumo"] else "ron"] += 1
+        seconds = time.perf_counter() - start
+        stats["seconds"] = seconds
+        stats["games_per_second"] = stats["games"] / seconds if seconds > 0 else 0.0
+        samples, model_error, uniform_error = self.inference
+        if samples:
+            stats["inference_error"] = model_error / samples
+            stats["uniform_error"] = uniform_error / samples
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="四人自动对局")
+    parser.add_argument("games", type=int, nargs="?", default=100, help="对局数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--metrics", help="把各阶段耗时写入该 Prometheus 文本文件")
+    parser.add_argument("--decision-log", help="每次决策向该文件追加一行 JSON 耗时记录")
+    parser.add_argument("--opponent-model", type=int, default=0, metavar="PARTICLES",
+                        help="给每个座位挂上该粒子数的对手手牌推断，并统计推断误差")
+    args = parser.parse_args()
+
+    engine = SelfPlayEngine(seed=args.seed, opponent_particles=args.opponent_model)
+    collector = None
+    if args.metrics or args.decision_log:
+        collector = metrics.Metrics(decision_log=args.decision_log)
+        for seat in engine.seats:
+            seat.decision_maker.enable_metrics(collector)
+
+    stats = engine.run(args.games)
+    print(f"对局 {stats['games']} 局，自摸 {stats['tsumo']}，点和 {stats['ron']}，流局 {stats['exhausted']}")
+    print(f"各座位和牌: {stats['wins_by_seat']}")
+    print(f"用时 {stats['seconds']:.2f}s，{stats['games_per_second']:.1f} 局/秒")
+    if "inference_error" in stats:
+        print(f"对手暗手推断 L1 误差: 粒子模型 {stats['inference_error']:.3f}，"
+              f"按未见张数均匀分配 {stats['uniform_error']:.3f}")
+    if collector is not None:
+        for stage, s in collector.summary()["stages"].items():
+            print(f"{stage:24s} {s['count']:8d} 次  p50 {s['p50_ms']:.3f}ms  "
+                  f"p95 {s['p95_ms']:.3f}ms  p99 {s['p99_ms']:.3f}ms")
+        if args.metrics:
+            collector.write_prometheus(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# shanten.py
+from array import array
+from bisect import bisect_left
+import itertools
+
+import tile_loader
+from table_file import map_table, write_table
+
+TABLE_PATH = "resources/shanten_table.bin"
+_MAGIC = b"MJST"
+_VERSION = 2
+_RECORD_SIZE = 10
+# 二分查找前先按键的高 5 位(五进制)分桶，每桶只需在约一百个键中查找
+_BUCKET_SIZE = 5 ** 4
+_BUCKETS = 5 ** 5
+# 预先生成的单花色模式的最大张数(手牌最多 14 张)
+_MAX_SUIT_TILES = 14
+
+# 单花色记录：长度为 10 的元组，下标 head*5 + m 处为
+# “含 head 个雀头(0/1)、m 个面子(0..4)”时最多能再拆出的搭子数，-1 表示不可达。
+_UNREACHABLE = -1
+_EMPTY_RECORD = (0,) + (_UNREACHABLE,) * 9
+
+# 单张字牌的记录：对子可作雀头或搭子；刻子(4 张时多出的一张为孤张)还可以拆成对子 + 孤张
+_HONOR_PAIR = (1, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE,
+               0, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE)
+_HONOR_SET = (1, 0, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE,
+              0, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE, _UNREACHABLE)
+
+# 五进制键中第 i 格的权重(第 0 格为最高位)
+SUIT_WEIGHTS = [5 ** (8 - i) for i in range(9)]
+
+# 七对子、国士无双只在门前(没有副露、暗杠)时成立，此时手牌为 13 或 14 张
+SPECIAL_MIN_SIZE = 13
+IS_ORPHAN = tuple(tile_loader.is_orphan(t) for t in range(tile_loader.TILE_KINDS))
+
+
+def _merge(a, b):
+    """两个记录逐项取最大值"""
+    return tuple(x if x >= y else y for x, y in zip(a, b))
+
+
+def _shift(record, dm, dt, dh):
+    """在记录上叠加一个面子(dm)/搭子(dt)/雀头(dh)，超出范围的项丢弃"""
+    shifted = [_UNREACHABLE] * 10
+    for h in range(2 - dh):
+        for m in range(5 - dm):
+            t = record[h * 5 + m]
+            if t >= 0:
+                shifted[(h + dh) * 5 + m + dm] = t + dt
+    return tuple(shifted)
+
+
+def combine(a, b):
+    """合并两组互不相交的牌的记录：面子、搭子相加，雀头总数不超过 1"""
+    result = [_UNREACHABLE] * 10
+    for ha in range(2):
+        for ma in range(5):
+            ta = a[ha * 5 + ma]
+            if ta < 0:
+                continue
+            for hb in range(2 - ha):
+                row = (ha + hb) * 5
+                for mb in range(5 - ma):
+                    tb = b[hb * 5 + mb]
+                    if tb < 0:
+                        continue
+                    if ta + tb > result[row + ma + mb]:
+                        result[row + ma + mb] = ta + tb
+    return result
+
+
+class ShantenTable:
+    """
+    基于单花色预计算表的向听数计算(标准型，门前时再与七对子、国士无双取最小)。
+
+    对每种数牌花色的 9 格计数模式(五进制键)，预先算出在不同(雀头, 面子数)下
+    最多能拆出的搭子数；字牌不能组成顺子，按 7 种字牌的张数组合单独缓存。
+    一次向听计算只需查 3 个花色记录与 1 个字牌记录并合并，代价为几十微秒。
+
+    向听数 = 2*(4-k) - 2*面子 - min(搭子, 4-k-面子) - 雀头，k 为已副露的面子数，
+    -1 表示已经胡牌。
+    七对子、国士无双的向听数不查表，由 special_stats 一次遍历计数向量得到的统计直接算出。
+
+    单花色记录可以由 build_tables.py 预先生成到 resources/shanten_table.bin
+    (分桶起始下标 + 升序的 uint32 键 + 每个键 10 字节的记录)，运行时 mmap 只读映射、分桶后二分查找，
+    进程池中的各子进程共享同一份页面；文件不存在时退回到进程内递归计算并缓存。
+    """
+
+    def __init__(self, path=TABLE_PATH):
+        self.suit_records = {0: _EMPTY_RECORD}
+        self.honor_records = {}
+        # mmap 映射的分桶下标、键与记录(memoryview)，未加载时为 None
+        self.buckets = None
+        self.keys = None
+        self.records = None
+        if path is not None:
+            self.load(path)
+
+    def load(self, path=TABLE_PATH):
+        """映射预先生成的表文件，成功返回 True"""
+        data = map_table(path, _MAGIC, _VERSION)
+        if data is None:
+            return False
+        start = 4 * (_BUCKETS + 1)
+        n = (len(data) - start) // (4 + _RECORD_SIZE)
+        self.buckets = data[:start].cast("I")
+        self.keys = data[start:start + 4 * n].cast("I")
+        self.records = data[start + 4 * n:].cast("b")
+        return True
+
+    @classmethod
+    def write(cls, path=TABLE_PATH):
+        """计算所有不超过 _MAX_SUIT_TILES 张的单花色模式的记录，写成表文件"""
+        table = cls(path=None)
+        keys = array("I")
+        records = array("b")
+        for counts in itertools.product(range(5), repeat=9):
+            if sum(counts) > _MAX_SUIT_TILES:
+                continue
+            key = sum(c * w for c, w in zip(counts, SUIT_WEIGHTS))
+            keys.append(key)
+            records.extend(table.suit_record(key))
+        # itertools.product 按字典序产生，五进制键已经是升序
+        buckets = array("I", [bisect_left(keys, b * _BUCKET_SIZE) for b in range(_BUCKETS + 1)])
+        write_table(path, _MAGIC, _VERSION, buckets.tobytes() + keys.tobytes() + records.tobytes())
+
+    def suit_record(self, key):
+        """取单花色计数模式的记录：先查映射的表文件，否则递归计算后缓存"""
+        record = self.suit_records.get(key)
+        if record is None:
+            keys = self.keys
+            if keys is not None:
+                bucket = key // _BUCKET_SIZE
+                hi = self.buckets[bucket + 1]
+                i = bisect_left(keys, key, self.buckets[bucket], hi)
+                if i < hi and keys[i] == key:
+                    start = i * _RECORD_SIZE
+                    return tuple(self.records[start:start + _RECORD_SIZE])
+            record = self._compute(key)
+            self.suit_records[key] = record
+        return record
+
+    def _compute(self, key):
+        # 找到第一张有牌的位置 i，枚举这张牌的所有用法
+        rest = key
+        counts = [0] * 9
+        for i in range(8, -1, -1):
+            rest, counts[i] = divmod(rest, 5)
+        i = 0
+        while counts[i] == 0:
+            i += 1
+        w = SUIT_WEIGHTS
+
+        # 1. 作为孤张舍弃
+        record = self.suit_record(key - w[i])
+        # 2. 刻子
+        if counts[i] >= 3:
+            record = _merge(record, _shift(self.suit_record(key - 3 * w[i]), 1, 0, 0))
+        # 3. 对子：作为雀头，或作为对子搭子
+        if counts[i] >= 2:
+            sub = self.suit_record(key - 2 * w[i])
+            record = _merge(record, _shift(sub, 0, 0, 1))
+            record = _merge(record, _shift(sub, 0, 1, 0))
+        if i <= 7 and counts[i + 1]:
+            # 4. 顺子
+            if i <= 6 and counts[i + 2]:
+                sub = self.suit_record(key - w[i] - w[i + 1] - w[i + 2])
+                record = _merge(record, _shift(sub, 1, 0, 0))
+            # 5. 两面/边张搭子
+            sub = self.suit_record(key - w[i] - w[i + 1])
+            record = _merge(record, _shift(sub, 0, 1, 0))
+        # 6. 嵌张搭子
+        if i <= 6 and counts[i + 2]:
+            sub = self.suit_record(key - w[i] - w[i + 2])
+            record = _merge(record, _shift(sub, 0, 1, 0))
+        return record
+
+    def honor_record(self, counts):
+        """7 种字牌的合并记录，按张数的多重集缓存(字牌之间没有顺序关系)"""
+        key = tuple(sorted(counts[tile_loader.HONOR_START:tile_loader.TILE_KINDS]))
+        record = self.honor_records.get(key)
+        if record is None:
+            record = _EMPTY_RECORD
+            for c in key:
+                if c >= 3:
+                    record = combine(record, _HONOR_SET)
+                elif c == 2:
+                    record = combine(record, _HONOR_PAIR)
+            self.honor_records[key] = record
+        return record
+
+    def group_records(self, counts):
+        """分别返回万、饼、条、字牌 4 组的记录"""
+        records = []
+        for base in (0, 9, 18):
+            key = 0
+            for i in range(base, base + 9):
+                key = key * 5 + counts[i]
+            records.append(self.suit_record(key))
+        records.append(self.honor_record(counts))
+        return records
+
+    def shanten(self, counts, size):
+        """
+        计算 34 格计数向量的向听数，size 为手牌张数(用于推算副露数)。
+        门前 13/14 张时取标准型、七对子、国士无双三者中的最小值。
+        """
+        record = self.honor_record(counts)
+        for base in (0, 9, 18):
+            key = 0
+            for i in range(base, base + 9):
+                key = key * 5 + counts[i]
+            if key:
+                record = combine(record, self.suit_record(key))
+        standard = evaluate(record, size)
+        if size < SPECIAL_MIN_SIZE:
+            return standard
+        special = special_shanten(special_stats(counts))
+        return special if special < standard else standard
+
+
+def evaluate(record, size):
+    """由合并后的记录和手牌张数得到向听数"""
+    blocks = min(4 - (14 - size) // 3, 4)
+    best = 8
+    for h in range(2):
+        for m in range(blocks + 1):
+            t = record[h * 5 + m]
+            if t < 0:
+                continue
+            if t > blocks - m:
+                t = blocks - m
+            value = 2 * (blocks - m) - t - h
+            if value < best:
+                best = value
+    return best
+
+
+def special_stats(counts):
+    """
+    一次遍历计数向量，得到七对子与国士无双共用的统计：
+    (2 张以上的牌种数, 牌种数, 幺九牌种数, 2 张以上的幺九牌种数)
+    """
+    pairs = kinds = orphans = orphan_pairs = 0
+    for c, orphan in zip(counts, IS_ORPHAN):
+        if c:
+            kinds += 1
+            if c >= 2:
+                pairs += 1
+                if orphan:
+                    orphans += 1
+                    orphan_pairs += 1
+            elif orphan:
+                orphans += 1
+    return pairs, kinds, orphans, orphan_pairs
+
+
+def special_shanten(stats):
+    """
+    由 special_stats 的统计得到七对子、国士无双向听数中较小的一个(只适用于门前 13/14 张)。
+    七对子 = 6 - 对子数 + max(0, 7 - 牌种数)，同种牌 4 张只算一对；
+    国士无双 = 13 - 幺九牌种数 - (有幺九对子时为 1)。
+    """
+    pairs, kinds, orphans, orphan_pairs = stats
+    chiitoi = 6 - pairs
+    if kinds < 7:
+        chiitoi += 7 - kinds
+    kokushi = 12 - orphans if orphan_pairs else 13 - orphans
+    return chiitoi if chiitoi < kokushi else kokushi
+
+
+# 快捷调用
+shanten_table = ShantenTable()
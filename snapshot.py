@@ -0,0 +1,139 @@
+# snapshot.py
+import struct
+
+import tile_loader
+from state_manager import StateManager
+
+# 二进制局面快照：用于把局面发给子进程，以及每巡保存断点
+MAGIC = b"MJSS"
+VERSION = 1
+
+# 定长部分：文件头 + 本家手牌计数 + 未见计数 + 各家弃牌张数 + 各家副露组数
+_HEADER = struct.Struct("<4sBBBB")   # 标识, 版本, 当前玩家, 标志位, 玩家数
+_FLAG_WON = 1
+_KINDS = tile_loader.TILE_KINDS
+_HAND = _HEADER.size
+_WALL = _HAND + _KINDS
+_LENGTHS = _WALL + _KINDS
+
+# 副露每组 2 字节：(类型, 最小的牌)
+_MELD_TYPES = ("CHI", "PENG", "GANG")
+_MELD_CODES = {name: code for code, name in enumerate(_MELD_TYPES)}
+_MELD_SIZES = (3, 3, 4)
+
+
+def encode(state):
+    """
+    把 StateManager 编码为定长布局的字节串(小端)：
+
+        0   4s  标识 MJSS
+        4   B   版本
+        5   B   当前玩家(相对编号)
+        6   B   标志位(bit0: 已和牌)
+        7   B   玩家数 P
+        8   34B 本家手牌计数
+        42  34B 未见计数(DeckCounter.remaining_deck)
+        76  PB  各家弃牌张数
+        ..  PB  各家副露组数
+        ..      各家弃牌(每张 1 字节，按玩家顺序)，之后为各家副露(每组 2 字节：类型, 最小的牌)
+
+    四人对局中即使弃牌较多也只有一两百字节，而 pickle 整个 StateManager 约 7KB。
+    不保存 journal、opponent_model 与交互输入用的 remain；吃的顺子按从小到大保存。
+    """
+    discards = state.discards
+    melds = state.melds
+    players = len(discards)
+    flags = _FLAG_WON if state.has_won else 0
+    data = bytearray(_HEADER.pack(MAGIC, VERSION, state.current_player, flags, players))
+    data += state.hand.counts.tobytes()
+    data += state.deck_counter.remaining_deck.tobytes()
+    data += bytes(len(d) for d in discards)
+    data += bytes(len(m) for m in melds)
+    for tiles in discards:
+        data += bytes(tiles)
+    for player_melds in melds:
+        for meld in player_melds:
+            data += bytes((_MELD_CODES[meld["type"]], min(meld["tile"])))
+    return bytes(data)
+
+
+class SnapshotView:
+    """
+    快照的只读视图，不复制数据：手牌计数、未见计数与弃牌都是原字节串上的 memoryview('b')，
+    可以直接交给 shanten_table.shanten、UkeireCalculator、win_table.is_complete 等按下标读取计数的函数；
+    memoryview 没有 count 方法，is_special_complete 与 HandScorer.score 需要先复制为 array('b', view.hand_counts)。
+    标识或版本不符、长度不对时抛出 ValueError。
+    """
+
+    __slots__ = ("data", "current_player", "has_won", "players", "hand_counts", "remaining",
+                 "discard_lengths", "meld_lengths", "_discard_start", "_meld_start")
+
+    def __init__(self, data):
+        if len(data) < _LENGTHS:
+            raise ValueError("快照长度不足")
+        magic, version, current_player, flags, players = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不支持的快照格式: {magic!r} v{version}")
+        view = memoryview(data).cast("b")
+        self.data = view
+        self.current_player = current_player
+        self.has_won = bool(flags & _FLAG_WON)
+        self.players = players
+        self.hand_counts = view[_HAND:_WALL]
+        self.remaining = view[_WALL:_LENGTHS]
+        self.discard_lengths = view[_LENGTHS:_LENGTHS + players]
+        self.meld_lengths = view[_LENGTHS + players:_LENGTHS + 2 * players]
+        self._discard_start = _LENGTHS + 2 * players
+        self._meld_start = self._discard_start + sum(self.discard_lengths)
+        if len(view) != self._meld_start + 2 * sum(self.meld_lengths):
+            raise ValueError("快照长度与内容不符")
+
+    @property
+    def hand_size(self):
+        return sum(self.hand_counts)
+
+    def discards(self, player):
+        """玩家 player 的弃牌(memoryview)"""
+        start = self._discard_start + sum(self.discard_lengths[:player])
+        return self.data[start:start + self.discard_lengths[player]]
+
+    def melds(self, player):
+        """玩家 player 的副露，与 StateManager.melds 相同的 {"type", "tile"} 形式"""
+        start = self._meld_start + 2 * sum(self.meld_lengths[:player])
+        result = []
+        for i in range(start, start + 2 * self.meld_lengths[player], 2):
+            code = self.data[i]
+            tile = self.data[i + 1]
+            tiles = [tile, tile + 1, tile + 2] if code == 0 else [tile] * _MELD_SIZES[code]
+            result.append({"type": _MELD_TYPES[code], "tile": tiles})
+        return result
+
+    def unseen(self):
+        """未见牌的编号列表(每张一个元素)"""
+        remaining = self.remaining
+        return [t for t in range(_KINDS) for _ in range(remaining[t])]
+
+
+def restore(data, state=None):
+    """
+    把快照恢复到 state(原地覆盖，手牌与未见计数直接从快照内存复制到已有的 array 中)；
+    state 为 None 时新建一个 StateManager。放铳风险按恢复的弃牌与副露一次性重建(DangerEstimator.load)，
+    opponent_model 被重置。返回 state。
+    """
+    view = SnapshotView(data)
+    if state is None:
+        state = StateManager(view.players)
+    memoryview(state.hand.counts)[:] = view.hand_counts
+    state.hand.size = view.hand_size
+    state.deck_counter.set_remaining(view.remaining)
+    state.discards = [list(view.discards(p)) for p in range(view.players)]
+    state.melds = [view.melds(p) for p in range(view.players)]
+    state.current_player = view.current_player
+    state.has_won = view.has_won
+    state.remain = []
+    state.journal = []
+
+    state.danger.load(state.discards, state.melds)
+    if state.opponent_model is not None:
+        state.opponent_model.reset()
+    return state
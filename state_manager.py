@@ -1,19 +1,48 @@
 # state_manager.py
 
 import deck_counter
+import tile_loader
+from danger import DangerEstimator
+from hand import Hand
 
 class StateManager:
 
     def __init__(self, player_number = 4):
     
-        self.hand = []
+        # 手牌、弃牌、副露内部统一使用紧凑编号(0..33)，只在输入输出时与牌名互相转换
+        self.hand = Hand()
         self.remain = []
         self.discards = [[] for _ in range(player_number)]  # 建立每个玩家的弃牌堆
         self.melds = [[] for _ in range(player_number)]     # 副露，即吃碰杠信息
-
-        self.deck_list = deck_counter.load_deck("resources/deck")
+        self.deck_list = tile_loader.mahjong.to_ids(deck_counter.load_deck("resources/deck"))
         self.deck_counter = deck_counter.DeckCounter(self.deck_list)
 
+        # 放铳风险估计，随 add_discard / add_meld 增量更新，未见张数直接读取 deck_counter
+        self.danger = DangerEstimator(player_number, self.deck_counter.remaining_deck)
+        # 可选的对手手牌推断(opponent_model.OpponentModel)，为 None 时搜索按均匀随机处理未见牌
+        self.opponent_model = None
+
+        self.current_player = 0
+        self.has_won = False
+        # 模拟用的增量日志：apply() 每执行一个动作压入一条记录，undo() 据此还原；
+        # 真实发生的动作由 commit() 清掉，日志长度只与搜索深度有关
+        self.journal = []
+
+
+    def reset(self):
+        """清空对局信息并重置牌组，开始新的一局(不调用 input()，供自动对局使用)"""
+        player_number = len(self.discards)
+        self.hand = Hand()
+        self.remain = []
+        self.discards = [[] for _ in range(player_number)]
+        self.melds = [[] for _ in range(player_number)]
+        self.danger.reset()
+        if self.opponent_model is not None:
+            self.opponent_model.reset()
+        self.deck_counter.reset()
+        self.current_player = 0
+        self.has_won = False
+        self.journal = []
 
     def start(self):
         # 输入坐庄玩家信息
@@ -21,11 +50,11 @@ class StateManager:
         
         # 输入手牌
         my_hand = input("请输入你的初始手牌(如 W1 W2 W3,...): ").upper().split()
-        self.initialize_hand(my_hand)
+        self.initialize_hand(tile_loader.mahjong.to_ids(my_hand))
 
     def initialize_hand(self, new_hand):
-        # 初始化手牌
-        self.hand = new_hand
+        # 初始化手牌，new_hand 为紧凑编号列表
+        self.hand = Hand(new_hand)
         for t in new_hand:
             self.deck_counter.discard(t)
 
@@ -62,17 +91,29 @@ class StateManager:
 
     def my_fetch(self):
         # 第零阶段：玩家摸牌，随后进行决策
-        user_input = input("请输入我方摸牌(如W2): ").upper()
-        self.hand.append(user_input)
-        self.deck_counter.discard(user_input)
+        tile = tile_loader.mahjong.to_ids([input("请输入我方摸牌(如W2): ").upper()])[0]
+        self.hand.add(tile)
+        self.deck_counter.discard(tile)
 
     def add_discard(self, player_id, tile):
         # 第一阶段：玩家出牌
         self.discards[player_id].append(tile)
+        self.notify_discard(player_id, tile)
+
+    def notify_discard(self, player_id, tile):
+        """
+        把一张舍牌告知放铳风险估计与对手模型(不修改 discards)。
+        本家通过 apply() 真实打出的牌也要调用，它们据此知道随后的吃/碰/杠鸣的是哪一张。
+        """
+        self.danger.add_discard(player_id, tile)
+        if self.opponent_model is not None:
+            # 先与未见张数对齐(此时打出的牌还未从 DeckCounter 中扣除)，再更新推断
+            self.opponent_model.sync(self.deck_counter.remaining_deck)
+            self.opponent_model.add_discard(player_id, tile)
     
     def my_discard(self):
         # 用于我方出牌
-        tile = input("请输入你的出牌: ").upper()
+        tile = tile_loader.mahjong.to_ids([input("请输入你的出牌: ").upper()])[0]
         self.add_discard(0, tile)
         self.hand.remove(tile)
         self.remain = [0, tile]
@@ -82,6 +123,7 @@ class StateManager:
         # 假设外部输入：“player_id tile”
         player_id, tile = input("请输入对手出牌(如 1 T5)").upper().split()
         player_id = int(player_id)
+        tile = tile_loader.mahjong.to_ids([tile])[0]
         self.remain = [player_id, tile]
             
         # 更新对方出牌信息
@@ -91,6 +133,22 @@ class StateManager:
     def add_meld(self, player_id, meld):
         # 第二阶段：副露阶段，其他玩家进行反应
         self.melds[player_id].append(meld)
+        self.danger.add_meld(player_id, meld)
+        if self.opponent_model is not None:
+            self.opponent_model.sync(self.deck_counter.remaining_deck)
+            self.opponent_model.add_meld(player_id, meld)
+
+    def upgrade_gang(self, player_id, tile):
+        # 补杠：把该玩家对应的碰升级为杠
+        melds = self.melds[player_id]
+        for i, m in enumerate(melds):
+            if m["type"] == "PENG" and m["tile"][0] == tile:
+                melds[i] = {"type": "GANG", "tile": [tile, tile, tile, tile]}
+                break
+        self.danger.upgrade_gang(player_id, tile)
+        if self.opponent_model is not None:
+            self.opponent_model.sync(self.deck_counter.remaining_deck)
+            self.opponent_model.upgrade_gang(player_id, tile)
     
     def handle_second_phase(self):
         # 处理第二阶段的本方行动
@@ -102,9 +160,9 @@ class StateManager:
             else:
                 # 第二阶段还没结束
                 event = event.split()
-                if event[0] == 0:
+                if event[0] == "0":
                     # 轮到本家出牌
-                    self.handle_my_action(event[1:])
+                    self.handle_my_action(event[1], *tile_loader.mahjong.to_ids(event[2:]))
                 else:
                     # 其他人出牌
                     if event[1] == "PENG":
@@ -128,8 +186,9 @@ class StateManager:
 
                     elif event[1] == "CHI":
                         # 吃上家牌
-                        current_player, tile1, tile2, tile3 = int(event[0]), self.remain[1], event[2], event[3]
-                        self.handle_chi(current_player, event[2:])
+                        tile2, tile3 = tile_loader.mahjong.to_ids(event[2:4])
+                        current_player, tile1 = int(event[0]), self.remain[1]
+                        self.handle_chi(current_player, sorted([tile1, tile2, tile3]))
 
                         # 剩余牌库减少打出的吃牌
                         self.deck_counter.discard(tile2)
@@ -145,17 +204,14 @@ class StateManager:
         tile = self.remain[1]
         if action == "PENG":
             self.handle_peng(0, tile)
-            self.hand.remove(tile)
-            self.hand.remove(tile)
+            self.hand.remove(tile, 2)
         elif action == "GANG":
             self.handle_gang(0, tile)
-            self.hand.remove(tile)
-            self.hand.remove(tile)
-            self.hand.remove(tile)
+            self.hand.remove(tile, 3)
         elif action == "CHI":
-            self.hand.remove(tiles)
-            tiles = [tile].append(tiles)
-            self.handle_chi(0, tiles)
+            for t in tiles:
+                self.hand.remove(t)
+            self.handle_chi(0, sorted([tile, *tiles]))
     
     def handle_chi(self, player_id, tiles):
         if player_id == 0:
@@ -189,4 +245,171 @@ class StateManager:
         # 结束阶段：回合结束，轮到某一方出牌
         self.current_player = next_player
 
+    # ===== 事件接口：由对局记录驱动，不调用 input() =====
+
+    def handle_event(self, event):
+        """
+        按对局记录中的一个事件更新状态，event = (act_type, player_id, tile, tiles)：
+        - player_id 为相对编号(0 为自己)；tile 为紧凑编号，看不到的牌为 None
+        - act_type 为 DRAW / DISCARD / CHI / PENG / GANG / AN GANG / HU；
+          CHI 时 tiles 为整组顺子，其余动作 tiles 可为 None
+        - GANG 由当前出牌者自己发出时，已碰过该牌视为补杠，否则视为暗杠
+        本家的动作通过 apply() 执行，其他玩家的动作只记录公开信息并从剩余牌中扣除。
+        """
+        act_type, player_id, tile, tiles = event
+
+        if act_type == "GANG" and player_id == self.current_player:
+            if not any(m["type"] == "PENG" and m["tile"][0] == tile for m in self.melds[player_id]):
+                act_type = "AN GANG"
+
+        if player_id == 0:
+            if act_type == "CHI":
+                self.apply((act_type, tile, tiles))
+            elif act_type == "DISCARD":
+                self.apply((act_type, tile))
+                self.notify_discard(0, tile)
+                self.remain = [0, tile]
+            else:
+                self.apply((act_type, tile))
+            self.commit()
+            self.current_player = 0
+            return
+
+        if act_type == "DISCARD":
+            self.remain = [player_id, tile]
+            self.add_discard(player_id, tile)
+            self.deck_counter.discard(tile)
+
+        elif act_type == "CHI" or act_type == "PENG" or act_type == "GANG" and player_id != self.current_player:
+            # 吃/碰/明杠：打出的那张已经扣除过，只扣除新亮出的牌
+            meld_tiles = list(tiles) if act_type == "CHI" else [tile] * (4 if act_type == "GANG" else 3)
+            self.add_meld(player_id, {"type": act_type, "tile": list(meld_tiles)})
+            meld_tiles.remove(tile)
+            for t in meld_tiles:
+                self.deck_counter.discard(t)
+
+        elif act_type == "GANG":
+            # 补杠：把碰升级为杠，只新亮出一张
+            self.upgrade_gang(player_id, tile)
+            self.deck_counter.discard(tile)
+
+        elif act_type == "AN GANG":
+            self.add_meld(player_id, {"type": "GANG", "tile": [tile, tile, tile, tile]})
+            for _ in range(4):
+                self.deck_counter.discard(tile)
+
+        self.player_changeto(player_id)
+
+    # ===== 模拟接口：原地执行 / 撤销本家动作，供搜索使用，不调用 input() =====
+
+    def apply(self, action):
+        """
+        在当前状态上原地执行本家的一个动作，并在 journal 中压入一条增量记录。
+        action 的格式与 DecisionMaker 一致：
+        ("DRAW", tile)、("DISCARD", tile)、("PENG", tile)、("CHI", tile, combo)、
+        ("GANG", tile)、("AN GANG", tile)、("HU", tile)
+        """
+        act_type = action[0]
+        tile = action[1]
+        hand = self.hand
+        prev_player = self.current_player
+        extra = None
+
+        if act_type == "DRAW":
+            # 从牌山摸一张
+            hand.add(tile)
+            self.deck_counter.discard(tile)
+
+        elif act_type == "DISCARD":
+            hand.remove(tile)
+            self.discards[0].append(tile)
+
+        elif act_type == "PENG":
+            hand.remove(tile, 2)
+            self.melds[0].append({"type": "PENG", "tile": [tile, tile, tile]})
+            self.current_player = 0
+
+        elif act_type == "CHI":
+            extra = [c for c in action[2] if c != tile]
+            for c in extra:
+                hand.remove(c)
+            self.melds[0].append({"type": "CHI", "tile": list(action[2])})
+            self.current_player = 0
+
+        elif act_type == "GANG" or act_type == "AN GANG":
+            # extra 记录 (从手牌移除的张数, 被升级为杠的碰在 melds[0] 中的下标)
+            upgraded = None
+            if act_type == "GANG" and prev_player == 0:
+                # 补杠：已经碰了该牌，再摸到一张相同的
+                for i, m in enumerate(self.melds[0]):
+                    if m["type"] == "PENG" and m["tile"][0] == tile:
+                        upgraded = i
+                        break
+            if upgraded is not None:
+                removed = 1
+                self.melds[0][upgraded] = {"type": "GANG", "tile": [tile, tile, tile, tile]}
+            else:
+                # 直杠(别人打出第 4 张)从手牌移除 3 张，暗杠移除 4 张
+                removed = 3 if prev_player != 0 else 4
+                self.melds[0].append({"type": "GANG", "tile": [tile, tile, tile, tile]})
+            hand.remove(tile, removed)
+            extra = (removed, upgraded)
+            self.current_player = 0
+
+        elif act_type == "HU":
+            self.has_won = True
+
+        else:
+            raise ValueError(f"Unknown action: {act_type}")
+
+        self.journal.append((act_type, tile, extra, prev_player))
+
+    def undo(self):
+        """撤销最近一次 apply() 执行的动作"""
+        act_type, tile, extra, prev_player = self.journal.pop()
+        hand = self.hand
+
+        if act_type == "DRAW":
+            hand.remove(tile)
+            self.deck_counter.add_tile(tile)
+
+        elif act_type == "DISCARD":
+            self.discards[0].pop()
+            hand.add(tile)
+
+        elif act_type == "PENG":
+            self.melds[0].pop()
+            hand.add(tile, 2)
+
+        elif act_type == "CHI":
+            self.melds[0].pop()
+            for c in extra:
+                hand.add(c)
+
+        elif act_type == "GANG" or act_type == "AN GANG":
+            removed, upgraded = extra
+            if upgraded is not None:
+                self.melds[0][upgraded] = {"type": "PENG", "tile": [tile, tile, tile]}
+            else:
+                self.melds[0].pop()
+            hand.add(tile, removed)
+
+        elif act_type == "HU":
+            self.has_won = False
+
+        self.current_player = prev_player
+
+    def undo_to(self, depth):
+        """连续撤销，直到 journal 长度回到 depth(此前记录的 len(journal))"""
+        while len(self.journal) > depth:
+            self.undo()
+
+    def commit(self):
+        """
+        把已经 apply() 的动作确定为真实局面：清空 journal，之后不能再撤销到此前的状态。
+        用 apply() 执行真实动作(而非模拟)后调用，避免 journal 随对局/会话无限增长；
+        不能在搜索过程中(记录了 depth、尚未 undo_to 时)调用。
+        """
+        self.journal.clear()
+
     # ... 其他可能的状态更新方法
\ No newline at end of file
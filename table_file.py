@@ -0,0 +1,44 @@
+# table_file.py
+import mmap
+import os
+import struct
+
+# 文件头：4 字节标识 + 版本号 + 数据区字节数
+_HEADER = struct.Struct("<4sII")
+
+
+def write_table(path, magic, version, payload):
+    """
+    把查找表写入 path：文件头 + payload(bytes 或 array 等支持缓冲区协议的对象)。
+    先写临时文件再替换，多个进程同时启动时不会读到写了一半的文件。
+    """
+    payload = memoryview(payload).cast("B")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(magic, version, len(payload)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def map_table(path, magic, version):
+    """
+    以只读 mmap 映射查找表文件，返回数据区的 memoryview(字节)。
+    文件不存在、标识/版本不符或长度不对时返回 None，由调用方重新生成。
+
+    映射的页面由操作系统的页缓存提供，多个进程(包括 fork 出的进程池子进程)
+    打开同一个文件时共用同一份物理内存，不会各自复制一份。
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # 文件不存在，或为空文件(无法映射)
+        return None
+    if len(mapped) < _HEADER.size:
+        mapped.close()
+        return None
+    file_magic, file_version, size = _HEADER.unpack_from(mapped)
+    if file_magic != magic or file_version != version or len(mapped) != _HEADER.size + size:
+        mapped.close()
+        return None
+    return memoryview(mapped)[_HEADER.size:]
@@ -0,0 +1,41 @@
+# tests/test_danger.py
+from array import array
+
+import tile_loader
+from danger import DangerEstimator, HONOR_RISK
+from state_manager import StateManager
+
+
+def _full(state):
+    """按当前舍牌、副露与未见计数从头计算的风险向量"""
+    fresh = DangerEstimator(len(state.discards), state.deck_counter.remaining_deck)
+    fresh.load(state.discards, state.melds)
+    return fresh.vector()
+
+
+def test_incremental_vector_matches_full_recompute():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    events = [("DISCARD", 1, 3, None), ("DISCARD", 2, 12, None), ("DRAW", 0, 4, None),
+              ("DISCARD", 0, 30, None), ("PENG", 2, 30, None), ("DISCARD", 2, 22, None),
+              ("CHI", 3, 22, [21, 22, 23]), ("DISCARD", 3, 6, None), ("DRAW", 0, 33, None)]
+    for event in events:
+        if event[1] != 0:
+            state.player_changeto(event[1])
+        state.handle_event(event)
+        assert state.danger.vector() == _full(state)
+
+
+def test_own_tiles_count_as_seen():
+    # 本家手中的牌也算已见：字牌的未见张数、壁都要考虑
+    remaining = array("b", [4] * tile_loader.TILE_KINDS)
+    danger = DangerEstimator(4, remaining)
+    north = 30
+    assert danger.player_vector(1)[north] == HONOR_RISK[4]
+    remaining[north] = 1
+    assert danger.player_vector(1)[north] == HONOR_RISK[1]
+
+    # W5 全部可见时，W6 的 (4, 5) 两面与 W4 的 (5, 6) 两面都不成立
+    before = danger.player_vector(1)[5]
+    remaining[4] = 0
+    assert danger.player_vector(1)[5] < before
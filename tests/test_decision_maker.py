@@ -0,0 +1,43 @@
+# tests/test_decision_maker.py
+import tile_loader
+from decision_maker import DecisionMaker
+from rule_engine import RuleEngine
+from state_manager import StateManager
+
+
+def test_evaluate_state_cache_follows_score_settings():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    decision_maker = DecisionMaker(RuleEngine(state))
+    heuristic = decision_maker.evaluate_state(state)
+
+    decision_maker.PROBABILITY_DRAWS = 8
+    probability = decision_maker.evaluate_state(state)
+    assert probability != heuristic
+    assert probability == decision_maker._evaluate_state(state)
+
+    del decision_maker.PROBABILITY_DRAWS
+    assert decision_maker.evaluate_state(state) == heuristic
+
+
+def test_for_state_keeps_instance_settings_and_metrics():
+    import copy
+
+    from metrics import Metrics
+
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    decision_maker = DecisionMaker(RuleEngine(state))
+    decision_maker.PROBABILITY_DRAWS = 3
+    collector = decision_maker.enable_metrics(Metrics())
+
+    snapshot = copy.deepcopy(state)
+    clone = decision_maker.for_state(snapshot)
+    assert clone.PROBABILITY_DRAWS == 3
+    assert clone.score_settings() == decision_maker.score_settings()
+    assert clone.metrics is collector
+
+    drawn = tile_loader.mahjong.to_ids(["T5"])[0]
+    snapshot.apply(("DRAW", drawn))
+    clone.decide_action(snapshot, drawn)
+    assert collector.counts["decide_action"] == 1
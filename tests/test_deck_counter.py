@@ -0,0 +1,16 @@
+# tests/test_deck_counter.py
+from deck_counter import DeckCounter
+
+
+def test_out_of_range_updates_are_silent_unless_verbose(capsys):
+    deck = DeckCounter([0, 0, 1])
+    assert deck.add_tile(0) is False
+    assert deck.discard(2) is False
+    assert deck.discard(1) is True
+    assert deck.discard(1) is False
+    assert capsys.readouterr().out == ""
+    assert deck.remaining() == {0: 2}
+
+    deck.verbose = True
+    deck.discard(1)
+    assert "Cannot discard" in capsys.readouterr().out
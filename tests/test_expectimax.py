@@ -0,0 +1,26 @@
+# tests/test_expectimax.py
+import tile_loader
+from decision_maker import DecisionMaker
+from expectimax import ExpectimaxSearch
+from rule_engine import RuleEngine
+from state_manager import StateManager
+
+
+def test_claim_lets_search_choose_the_discard():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    state.player_changeto(1)
+    state.handle_event(("DISCARD", 1, 30, None))
+    decision_maker = DecisionMaker(RuleEngine(state), search=ExpectimaxSearch(depth=1))
+    action = ("PENG", 30)
+
+    mark = len(state.journal)
+    decision_maker.simulate_action(state, action)
+    auto = decision_maker.evaluate_state(state)
+    state.undo_to(mark)
+
+    searched = decision_maker.score_action(state, action, 1)
+    assert len(state.journal) == mark
+    assert state.hand.counts[30] == 2
+    # 决策节点在向听数最小的打法中取最优，不会比自动打牌差
+    assert searched >= auto
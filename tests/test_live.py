@@ -0,0 +1,35 @@
+# tests/test_live.py
+import asyncio
+
+from live import AsyncAdvisor
+
+
+class _FailingSession:
+    """只实现 AsyncAdvisor 用到的接口，预计算总是出错"""
+
+    def keeps_speculation(self, event):
+        return False
+
+    def invalidate(self):
+        pass
+
+    def handle(self, event):
+        return None
+
+    def speculation_targets(self):
+        return 0, [(1, 5)]
+
+    def speculate(self, generation, discarder, tile):
+        raise RuntimeError("boom")
+
+
+def test_speculation_errors_are_reported(capsys):
+    async def main():
+        advisor = AsyncAdvisor(_FailingSession(), output=None)
+        await advisor.feed(("DISCARD", 1, 5, None))
+        while advisor.speculations:
+            await asyncio.sleep(0.01)
+        advisor.close()
+
+    asyncio.run(main())
+    assert "boom" in capsys.readouterr().err
@@ -0,0 +1,22 @@
+# tests/test_opponent_model.py
+import random
+
+from opponent_model import OpponentModel
+
+
+def test_sample_worlds_leaves_particles_unchanged():
+    # 抽取世界只依赖传入的 rng，不改变模型自身的粒子与随机数状态
+    unseen = [4] * 34
+    model = OpponentModel(particles=8, seed=0)
+    model.sync(unseen)
+    before = [(p.hands[1][:], p.wall[:], p.weight) for p in model.particles]
+    state = model.rng.getstate()
+
+    unseen[0] = 0
+    first = model.sample_worlds(unseen, 4, random.Random(1))
+    assert all(w.wall[0] + sum(w.hands[p][0] for p in (1, 2, 3)) == 0 for w in first)
+    assert [(p.hands[1], p.wall, p.weight) for p in model.particles] == before
+    assert model.rng.getstate() == state
+
+    again = model.sample_worlds(unseen, 4, random.Random(1))
+    assert [w.hands for w in again] == [w.hands for w in first]
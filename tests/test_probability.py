@@ -0,0 +1,66 @@
+# tests/test_probability.py
+import math
+
+import pytest
+
+import tile_loader
+from probability import tenpai_probability, win_probability
+from shanten import shanten_table
+
+_KINDS = tile_loader.TILE_KINDS
+
+
+def _counts(names):
+    counts = [0] * _KINDS
+    for t in tile_loader.mahjong.to_ids(names.split()):
+        counts[t] += 1
+    return counts
+
+
+def _hypergeometric_hit(unseen, useful, draws):
+    """draws 次不放回摸牌中至少摸到一张有效牌的概率"""
+    return 1.0 - math.comb(unseen - useful, draws) / math.comb(unseen, draws)
+
+
+def _useful(counts, size, remaining):
+    current = shanten_table.shanten(counts, size)
+    total = 0
+    for t in range(_KINDS):
+        if counts[t] < 4:
+            counts[t] += 1
+            if shanten_table.shanten(counts, size + 1) < current:
+                total += remaining[t]
+            counts[t] -= 1
+    return total
+
+
+@pytest.mark.parametrize("draws", [1, 5, 18])
+def test_win_from_tenpai_is_hypergeometric(draws):
+    # 单骑 R：未见 3 张
+    counts = _counts("W1 W2 W3 B4 B5 B6 T7 T8 T9 E E E R")
+    remaining = [4 - c for c in counts]
+    expected = _hypergeometric_hit(sum(remaining), 3, draws)
+    assert win_probability(counts, 13, remaining, draws) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("draws", [1, 4, 12])
+def test_tenpai_from_one_shanten_is_hypergeometric(draws):
+    counts = _counts("W1 W2 W3 B4 B5 T7 T8 T9 E E E R S")
+    remaining = [4 - c for c in counts]
+    remaining[tile_loader.mahjong.get_id("B6")] = 1
+    assert shanten_table.shanten(counts, 13) == 1
+    useful = _useful(counts, 13, remaining)
+    expected = _hypergeometric_hit(sum(remaining), useful, draws)
+    assert tenpai_probability(counts, 13, remaining, draws) == pytest.approx(expected, rel=1e-12)
+
+
+def test_edge_cases():
+    counts = _counts("W1 W2 W3 B4 B5 B6 T7 T8 T9 E E E R")
+    remaining = [4 - c for c in counts]
+    assert win_probability(counts, 13, remaining, 0) == 0.0
+    assert tenpai_probability(counts, 13, remaining, 0) == 1.0
+    counts[tile_loader.mahjong.get_id("R")] += 1
+    assert win_probability(counts, 14, remaining, 0) == 1.0
+    remaining[tile_loader.mahjong.get_id("R")] = 0
+    counts[tile_loader.mahjong.get_id("R")] -= 1
+    assert win_probability(counts, 13, remaining, 30) == 0.0
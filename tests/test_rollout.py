@@ -0,0 +1,33 @@
+# tests/test_rollout.py
+import tile_loader
+from decision_maker import DecisionMaker
+from rollout import RolloutEvaluator
+from rule_engine import RuleEngine
+from state_manager import StateManager
+
+
+def test_time_limited_rollouts_use_partial_rounds():
+    # batch 很大时一整轮做不完，到时前已完成的对局仍应被用来比较
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    drawn = tile_loader.mahjong.to_ids(["T5"])[0]
+    state.apply(("DRAW", drawn))
+    state.current_player = 0
+    evaluator = RolloutEvaluator(rollouts=16, workers=1, seed=0, batch=400)
+    decision_maker = DecisionMaker(RuleEngine(state), evaluator=evaluator)
+    decision_maker.decide_action(state, drawn, deadline_ms=300)
+    stats = decision_maker.search_stats
+    assert stats["rounds"] >= 1
+    assert stats["rollouts"] > 0
+    assert len(state.journal) == 1
+
+
+def test_task_seeds_do_not_overlap_across_actions():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    evaluator = RolloutEvaluator(seed=0)
+    seeds = set()
+    for action in range(3):
+        tasks = evaluator.make_tasks(state, action, 3, rollouts=1100, task_size=1)
+        seeds.update(task[-1] for task in tasks)
+    assert len(seeds) == 3 * 1100
@@ -0,0 +1,38 @@
+# tests/test_scoring.py
+from array import array
+
+import pytest
+
+import tile_loader
+from scoring import hand_scorer
+
+
+def _counts(names):
+    counts = array("b", [0] * tile_loader.TILE_KINDS)
+    for t in tile_loader.mahjong.to_ids(names.split()):
+        counts[t] += 1
+    return counts
+
+
+@pytest.mark.parametrize("names, fan, fans", [
+    # 小四喜不再另计碰碰和
+    ("E E E S S S W W W N N B1 B1 B1", 76, ("混一色", "门前清", "小四喜", "全带幺")),
+    ("W1 W2 W3 W4 W5 W6 W7 W8 W9 T2 T3 T4 B5 B5", 20, ("门前清", "平和", "一气通贯")),
+    ("W2 W3 W4 T3 T4 T5 B4 B5 B6 T6 T7 T8 B8 B8", 6, ("断幺", "门前清", "平和")),
+    # 七对与十三幺不另计门前清
+    ("W1 W1 W3 W3 B2 B2 B7 B7 T5 T5 E E R R", 24, ("七对",)),
+    ("W1 W9 B1 B9 T1 T9 E S W N M R B B", 88, ("十三幺",)),
+])
+def test_score(names, fan, fans):
+    assert hand_scorer.score(_counts(names)) == (fan, fans)
+
+
+def test_melds_and_self_drawn():
+    counts = _counts("W2 W3 W4 T3 T4 T5 B4 B5 B6 B8 B8")
+    melds = [{"type": "PENG", "tile": [22, 22, 22]}]
+    fan, fans = hand_scorer.score(counts, melds, self_drawn=True)
+    assert "门前清" not in fans and "自摸" in fans and "断幺" in fans
+
+
+def test_not_complete():
+    assert hand_scorer.score(_counts("W1 W2 W4 T3 T4 T5 B4 B5 B6 T6 T7 T8 B8 B8")) == (0, ())
@@ -0,0 +1,124 @@
+# tests/test_shanten.py
+import functools
+import itertools
+import random
+
+import tile_loader
+from shanten import combine, evaluate, shanten_table
+
+_KINDS = tile_loader.TILE_KINDS
+# 所有可能的面子：刻子与顺子
+_MELDS = [(t, t, t) for t in range(_KINDS)] + [
+    (base + n, base + n + 1, base + n + 2) for base in (0, 9, 18) for n in range(7)]
+
+
+def _standard_distance(counts, blocks, limit=98):
+    """
+    参照实现：枚举所有“blocks 个面子 + 1 个雀头”的和牌型，
+    向听数 = 与手牌相差的最少张数 - 1(每种牌至多 4 张)。
+    只搜索不超过 limit 的结果，超过时返回 limit。
+    """
+    best = [limit + 1]
+    need = [0] * _KINDS
+
+    def search(start, left, missing):
+        if missing >= best[0]:
+            return
+        if left == 0:
+            best[0] = missing
+            return
+        for i in range(start, len(_MELDS)):
+            meld = _MELDS[i]
+            extra = 0
+            valid = True
+            for t in meld:
+                need[t] += 1
+                valid = valid and need[t] <= 4
+                extra += need[t] > counts[t]
+            if valid:
+                search(i, left - 1, missing + extra)
+            for t in meld:
+                need[t] -= 1
+
+    for pair in range(_KINDS):
+        need[pair] += 2
+        search(0, blocks, max(0, 2 - counts[pair]))
+        need[pair] -= 2
+    return best[0] - 1
+
+
+def _chiitoi_distance(counts):
+    """参照实现：枚举 7 种不同的牌作为对子(手中没有的牌彼此等价，只取需要的几种)"""
+    present = [t for t in range(_KINDS) if counts[t]]
+    absent = [t for t in range(_KINDS) if not counts[t]]
+    best = 99
+    for k in range(max(0, 7 - len(absent)), min(7, len(present)) + 1):
+        for kinds in itertools.combinations(present, k):
+            chosen = list(kinds) + absent[:7 - k]
+            best = min(best, sum(max(0, 2 - counts[t]) for t in chosen))
+    return best - 1
+
+
+def _kokushi_distance(counts):
+    """参照实现：枚举作雀头的幺九牌"""
+    best = 99
+    for pair in tile_loader.ORPHANS:
+        best = min(best, sum(max(0, (2 if t == pair else 1) - counts[t]) for t in tile_loader.ORPHANS))
+    return best - 1
+
+
+def _sample(rng, size):
+    wall = [t for t in range(_KINDS) for _ in range(4)]
+    counts = [0] * _KINDS
+    for t in rng.sample(wall, size):
+        counts[t] += 1
+    return counts
+
+
+def test_standard_form_matches_brute_force():
+    rng = random.Random(3)
+    for size in (2, 5, 7, 8, 10, 11, 13, 14) * 4:
+        counts = _sample(rng, size)
+        blocks = 4 - (14 - size) // 3
+        standard = evaluate(functools.reduce(combine, shanten_table.group_records(counts)), size)
+        assert standard == _standard_distance(counts, blocks), counts
+        if size < 13:
+            assert shanten_table.shanten(counts, size) == standard
+
+
+def test_known_hands():
+    ids = tile_loader.mahjong.to_ids
+    counts = [0] * _KINDS
+    for t in ids("W1 W2 W3 B4 B5 B6 T7 T8 T9 E E E R".split()):
+        counts[t] += 1
+    assert shanten_table.shanten(counts, 13) == 0
+    counts[tile_loader.mahjong.get_id("R")] += 1
+    assert shanten_table.shanten(counts, 14) == -1
+
+
+def _near_special(rng, tiles, swaps):
+    """把七对子/国士无双的 14 张中随机 swaps 张换成其他牌"""
+    counts = [0] * _KINDS
+    for t in tiles:
+        counts[t] += 1
+    for _ in range(swaps):
+        counts[rng.choice([t for t in range(_KINDS) if counts[t]])] -= 1
+        counts[rng.choice([t for t in range(_KINDS) if counts[t] < 4])] += 1
+    return counts
+
+
+def test_special_forms_match_brute_force():
+    rng = random.Random(5)
+    for _ in range(40):
+        if rng.random() < 0.5:
+            tiles = [t for t in rng.sample(range(_KINDS), 7) for _ in range(2)]
+        else:
+            tiles = list(tile_loader.ORPHANS) + [rng.choice(tile_loader.ORPHANS)]
+        counts = _near_special(rng, tiles, rng.randrange(5))
+        size = 14
+        if rng.random() < 0.5:
+            counts[rng.choice([t for t in range(_KINDS) if counts[t]])] -= 1
+            size = 13
+        special = min(_chiitoi_distance(counts), _kokushi_distance(counts))
+        expected = _standard_distance(counts, 4, special)
+        assert shanten_table.shanten(counts, size) == expected, counts
@@ -0,0 +1,55 @@
+# tests/test_snapshot.py
+from array import array
+
+import pytest
+
+import snapshot
+import tile_loader
+import win_table
+from state_manager import StateManager
+
+
+def _state():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    state.player_changeto(1)
+    state.handle_event(("DISCARD", 1, 13, None))
+    state.handle_event(("PENG", 2, 13, None))
+    state.handle_event(("DISCARD", 2, 27, None))
+    return state
+
+
+def test_encode_restore_round_trip():
+    state = _state()
+    data = snapshot.encode(state)
+    view = snapshot.SnapshotView(data)
+    assert list(view.hand_counts) == list(state.hand.counts)
+    assert list(view.remaining) == list(state.deck_counter.remaining_deck)
+    assert [list(view.discards(p)) for p in range(view.players)] == state.discards
+    assert [view.melds(p) for p in range(view.players)] == state.melds
+    assert view.current_player == state.current_player
+
+    restored = snapshot.restore(data)
+    assert list(restored.hand.counts) == list(state.hand.counts)
+    assert restored.hand.size == state.hand.size
+    assert restored.discards == state.discards
+    assert restored.melds == state.melds
+    assert restored.danger.vector() == state.danger.vector()
+    assert snapshot.encode(restored) == data
+
+
+def test_view_counts_need_copy_for_special_check():
+    # 七对子：memoryview 没有 count，复制为 array 后即可判断
+    counts = bytearray(tile_loader.TILE_KINDS)
+    for t in (0, 2, 4, 9, 11, 27, 33):
+        counts[t] = 2
+    state = StateManager()
+    state.initialize_hand([t for t in range(tile_loader.TILE_KINDS) for _ in range(counts[t])])
+    view = snapshot.SnapshotView(snapshot.encode(state))
+    assert win_table.is_special_complete(array("b", view.hand_counts))
+
+
+def test_rejects_truncated_data():
+    data = snapshot.encode(_state())
+    with pytest.raises(ValueError):
+        snapshot.SnapshotView(data[:-1])
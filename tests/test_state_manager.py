@@ -0,0 +1,58 @@
+# tests/test_state_manager.py
+import pytest
+
+import tile_loader
+from state_manager import StateManager
+
+
+def _state():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 T3 T4 B9 B9 N N S B B6 R".split()))
+    return state
+
+
+@pytest.mark.parametrize("act_type, tiles, size", [
+    ("PENG", None, 3),
+    ("GANG", None, 4),
+    ("CHI", [12, 13, 14], 3),
+])
+def test_handle_event_records_full_meld(act_type, tiles, size):
+    # 对手 1 打出 13，对手 2 鸣牌：副露中应保留被鸣的那张
+    state = _state()
+    state.player_changeto(1)
+    state.handle_event(("DISCARD", 1, 13, None))
+    state.handle_event((act_type, 2, 13, tiles))
+    meld = state.melds[2][-1]
+    assert len(meld["tile"]) == size
+    assert 13 in meld["tile"]
+
+
+def test_real_events_do_not_grow_journal():
+    state = _state()
+    state.handle_event(("DRAW", 0, 5, None))
+    state.handle_event(("DISCARD", 0, 5, None))
+    state.player_changeto(1)
+    state.handle_event(("DISCARD", 1, 17, None))
+    state.handle_event(("PENG", 0, 17, None))
+    assert state.journal == []
+
+    # 模拟中的动作仍可撤销
+    state.apply(("DISCARD", 0))
+    state.undo_to(0)
+    assert state.hand.counts[0] == 1
+
+
+def test_claim_of_own_discard_keeps_opponent_model_consistent():
+    # 对手碰本家打出的牌：粒子中该对手的暗手张数应与 hand_sizes 一致
+    from opponent_model import OpponentModel
+
+    state = _state()
+    state.opponent_model = OpponentModel(particles=8, seed=0)
+    state.player_changeto(1)
+    state.handle_event(("DISCARD", 1, 5, None))
+    state.handle_event(("DRAW", 0, 7, None))
+    state.handle_event(("DISCARD", 0, 30, None))
+    state.handle_event(("PENG", 2, 30, None))
+    model = state.opponent_model
+    assert model.hand_sizes[2] == 11
+    assert all(sum(particle.hands[2]) == 11 for particle in model.particles)
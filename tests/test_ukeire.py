@@ -0,0 +1,67 @@
+# tests/test_ukeire.py
+import random
+
+import pytest
+
+import tile_loader
+from shanten import shanten_table
+from ukeire import UkeireCalculator
+
+_KINDS = tile_loader.TILE_KINDS
+
+
+def _sample(rng, size):
+    wall = [t for t in range(_KINDS) for _ in range(4)]
+    counts = [0] * _KINDS
+    for t in rng.sample(wall, size):
+        counts[t] += 1
+    return counts
+
+
+def _naive_ukeire(counts, size, remaining):
+    """逐张摸进后重新计算向听数(参照实现)"""
+    current = shanten_table.shanten(counts, size)
+    tiles = {}
+    for t in range(_KINDS):
+        if counts[t] >= 4:
+            continue
+        counts[t] += 1
+        if shanten_table.shanten(counts, size + 1) < current:
+            tiles[t] = remaining[t]
+        counts[t] -= 1
+    return current, tiles
+
+
+@pytest.mark.parametrize("size", [4, 7, 10, 13])
+def test_ukeire_matches_naive(size):
+    rng = random.Random(size)
+    for _ in range(100):
+        counts = _sample(rng, size)
+        remaining = [rng.randrange(5 - c) for c in counts]
+        assert UkeireCalculator(counts, size).ukeire(remaining) == _naive_ukeire(counts, size, remaining)
+
+
+def test_discard_shanten_matches_naive():
+    rng = random.Random(0)
+    for _ in range(100):
+        counts = _sample(rng, 14)
+        expected = {}
+        for t in range(_KINDS):
+            if counts[t]:
+                counts[t] -= 1
+                expected[t] = shanten_table.shanten(counts, 13)
+                counts[t] += 1
+        assert UkeireCalculator(counts, 14).discard_shanten() == expected
+
+
+def test_draw_discard_keep_records_in_sync():
+    rng = random.Random(1)
+    counts = _sample(rng, 13)
+    calculator = UkeireCalculator(counts, 13)
+    for _ in range(50):
+        tile = rng.choice([t for t in range(_KINDS) if calculator.counts[t] < 4])
+        calculator.draw(tile)
+        calculator.discard(rng.choice([t for t in range(_KINDS) if calculator.counts[t]]))
+        assert calculator.shanten() == shanten_table.shanten(calculator.counts, 13)
+    with pytest.raises(ValueError):
+        calculator.discard(next(t for t in range(_KINDS) if not calculator.counts[t]))
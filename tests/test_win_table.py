@@ -0,0 +1,96 @@
+# tests/test_win_table.py
+import random
+
+import pytest
+
+import tile_loader
+from rule_engine import RuleEngine
+from win_table import is_special_complete
+from state_manager import StateManager
+from win_table import win_table
+
+
+def _brute_force(counts, pair=False):
+    """逐张拆面子/雀头判断能否和牌(参照实现)"""
+    i = next((t for t in range(tile_loader.TILE_KINDS) if counts[t]), None)
+    if i is None:
+        return pair
+    if not pair and counts[i] >= 2:
+        counts[i] -= 2
+        ok = _brute_force(counts, True)
+        counts[i] += 2
+        if ok:
+            return True
+    if counts[i] >= 3:
+        counts[i] -= 3
+        ok = _brute_force(counts, pair)
+        counts[i] += 3
+        if ok:
+            return True
+    if not tile_loader.is_honor(i) and tile_loader.number_of(i) <= 7 and counts[i + 1] and counts[i + 2]:
+        for t in (i, i + 1, i + 2):
+            counts[t] -= 1
+        ok = _brute_force(counts, pair)
+        for t in (i, i + 1, i + 2):
+            counts[t] += 1
+        return ok
+    return False
+
+
+def _random_complete(rng, melds):
+    """随机拼出 melds 个面子 + 1 个雀头(可能因张数超过 4 而失败，返回 None)"""
+    counts = [0] * tile_loader.TILE_KINDS
+    counts[rng.randrange(tile_loader.TILE_KINDS)] += 2
+    for _ in range(melds):
+        if rng.random() < 0.5:
+            counts[rng.randrange(tile_loader.TILE_KINDS)] += 3
+        else:
+            t = rng.randrange(3) * 9 + rng.randrange(7)
+            for k in range(3):
+                counts[t + k] += 1
+    return counts if max(counts) <= 4 else None
+
+
+def test_matches_brute_force():
+    rng = random.Random(1)
+    wall = [t for t in range(tile_loader.TILE_KINDS) for _ in range(4)]
+    hands = []
+    for _ in range(2000):
+        counts = [0] * tile_loader.TILE_KINDS
+        for t in rng.sample(wall, 3 * rng.randrange(5) + 2):
+            counts[t] += 1
+        hands.append(counts)
+        complete = _random_complete(rng, rng.randrange(5))
+        if complete is not None:
+            hands.append(complete)
+    positives = 0
+    for counts in hands:
+        expected = _brute_force(list(counts))
+        assert win_table.is_complete(counts) == expected, counts
+        positives += expected
+    assert positives > 500
+
+
+def test_can_hu_with_tile_keeps_hand():
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids("W1 W2 W3 B4 B5 B6 T7 T8 T9 E E E R".split()))
+    before = list(state.hand.counts)
+    engine = RuleEngine(state)
+    assert engine.can_hu(state.hand, tile_loader.mahjong.get_id("R"))
+    assert not engine.can_hu(state.hand, tile_loader.mahjong.get_id("B"))
+    assert list(state.hand.counts) == before
+
+
+@pytest.mark.parametrize("names, expected", [
+    ("W1 W1 W3 W3 B2 B2 B7 B7 T5 T5 E E R R", True),
+    ("W1 W9 B1 B9 T1 T9 E S W N M R B B", True),
+    # 4 张同种牌不算两对
+    ("W1 W1 W1 W1 B2 B2 B7 B7 T5 T5 E E R R", False),
+    # 缺一种幺九牌
+    ("W1 W9 B1 B9 T1 T9 E S W N M R R R", False),
+])
+def test_special_hands(names, expected):
+    state = StateManager()
+    state.initialize_hand(tile_loader.mahjong.to_ids(names.split()))
+    assert is_special_complete(state.hand.counts) == expected
+    assert RuleEngine(state).can_hu(state.hand) == expected
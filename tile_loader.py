@@ -1,6 +1,13 @@
 # tile_loader.py
 import json
 
+# 牌的紧凑编号：0..33
+# 万 W1-W9 -> 0..8，饼 B1-B9 -> 9..17，条 T1-T9 -> 18..26，字牌 E S W N M R B -> 27..33
+TILE_KINDS = 34
+HONOR_START = 27
+# 幺九牌(数牌的 1、9 与全部字牌)，国士无双只由这 13 种牌组成
+ORPHANS = (0, 8, 9, 17, 18, 26) + tuple(range(HONOR_START, TILE_KINDS))
+
 class MahjongTiles:
     """从json文件中读取我自定义的麻将对应规则。"""
     
@@ -9,6 +16,12 @@ class MahjongTiles:
             self.tiles = json.load(f)
         self.reverse_tiles = {(u, v): k for k, [u, v] in self.tiles.items()}  # 反向查找用
 
+        # 名称 <-> 编号(0..33) 的双向查找表，只在 CLI/GUI 边界使用
+        self.ids = {name: to_id(u, v) for name, [u, v] in self.tiles.items()}
+        self.id_names = [None] * TILE_KINDS
+        for name, tile_id in self.ids.items():
+            self.id_names[tile_id] = name
+
     def get_value(self, tile_name):
         """通过名称获取麻将牌编号"""
         return self.tiles.get(tile_name, None)
@@ -17,5 +30,49 @@ class MahjongTiles:
         """通过编号获取麻将牌名称"""
         return self.reverse_tiles.get(tile_tuple, None)
 
+    def get_id(self, tile_name):
+        """通过名称获取牌的紧凑编号(0..33)，名称非法时返回 None"""
+        return self.ids.get(tile_name, None)
+
+    def get_id_name(self, tile_id):
+        """通过紧凑编号获取麻将牌名称"""
+        return self.id_names[tile_id]
+
+    def to_ids(self, tile_names):
+        """把一串牌名转换为紧凑编号列表，遇到非法牌名抛出 ValueError"""
+        ids = []
+        for name in tile_names:
+            tile_id = self.ids.get(name)
+            if tile_id is None:
+                raise ValueError(f"Unknown tile: {name}")
+            ids.append(tile_id)
+        return ids
+
+    def to_names(self, tile_ids):
+        """把一串紧凑编号转换为牌名列表"""
+        return [self.id_names[t] for t in tile_ids]
+
+
+def to_id(suit, number):
+    """[花色, 数字] -> 紧凑编号。数牌为 suit*9 + number-1，字牌从 27 开始依次排列。"""
+    if suit < 3:
+        return suit * 9 + number - 1
+    return HONOR_START + suit - 3
+
+def is_honor(tile_id):
+    return tile_id >= HONOR_START
+
+def is_orphan(tile_id):
+    """是否为幺九牌"""
+    return tile_id >= HONOR_START or tile_id % 9 in (0, 8)
+
+def suit_of(tile_id):
+    """数牌返回 0/1/2，字牌返回 3"""
+    return tile_id // 9 if tile_id < HONOR_START else 3
+
+def number_of(tile_id):
+    """数牌返回 1..9，字牌返回 0"""
+    return tile_id % 9 + 1 if tile_id < HONOR_START else 0
+
 # 快捷调用
-mahjong = MahjongTiles()
\ No newline at end of file
+mahjong = MahjongTiles()
@@ -0,0 +1,217 @@
+# ukeire.py
+from array import array
+
+import tile_loader
+from shanten import (shanten_table, combine, evaluate, special_stats, special_shanten,
+                     IS_ORPHAN, SPECIAL_MIN_SIZE, SUIT_WEIGHTS)
+
+_HONOR_GROUP = 3
+
+
+def _group_of(tile):
+    return tile // 9 if tile < tile_loader.HONOR_START else _HONOR_GROUP
+
+
+def _stats_after_draw(stats, count, orphan):
+    """special_stats 在摸进一张(原有 count 张)后的值"""
+    pairs, kinds, orphans, orphan_pairs = stats
+    if count == 0:
+        return pairs, kinds + 1, orphans + orphan, orphan_pairs
+    if count == 1:
+        return pairs + 1, kinds, orphans, orphan_pairs + orphan
+    return stats
+
+
+def _stats_after_discard(stats, count, orphan):
+    """special_stats 在打出一张(原有 count 张)后的值"""
+    pairs, kinds, orphans, orphan_pairs = stats
+    if count == 1:
+        return pairs, kinds - 1, orphans - orphan, orphan_pairs
+    if count == 2:
+        return pairs - 1, kinds, orphans, orphan_pairs - orphan
+    return stats
+
+
+class UkeireCalculator:
+    """
+    有效牌(进张)计算：给出能让向听数减少的牌，以及每种牌在场上还剩几张未见。
+
+    未见张数由调用方传入(一般为 DeckCounter 的剩余计数，已扣除自己手牌、
+    各家弃牌和副露)，而不是按每种 4 张计算。
+
+    计算器保存万、饼、条、字牌 4 组各自的向听记录。摸牌/打牌后只重新查询
+    受影响的那一组，其余 3 组的记录保持不变；因此在一手 14 张牌上比较全部打法时，
+    每个候选打法只需重算一个花色。
+
+    门前 13/14 张时向听数取标准型与七对子、国士无双中的最小值：后两者的统计
+    (special_stats)只遍历一次计数向量，摸打某张牌后的变化按该牌的张数直接推算。
+    """
+
+    __slots__ = ("table", "counts", "size", "records")
+
+    def __init__(self, counts, size, table=shanten_table):
+        self.table = table
+        self.counts = array("b", counts)
+        self.size = size
+        self.records = table.group_records(self.counts)
+
+    def _refresh(self, group):
+        if group == _HONOR_GROUP:
+            self.records[group] = self.table.honor_record(self.counts)
+            return
+        counts = self.counts
+        key = 0
+        for i in range(group * 9, group * 9 + 9):
+            key = key * 5 + counts[i]
+        self.records[group] = self.table.suit_record(key)
+
+    def draw(self, tile):
+        """摸进一张牌，只更新该牌所在的一组"""
+        self.counts[tile] += 1
+        self.size += 1
+        self._refresh(_group_of(tile))
+
+    def discard(self, tile):
+        """打出一张牌，只更新该牌所在的一组"""
+        if self.counts[tile] <= 0:
+            raise ValueError(f"UkeireCalculator.discard(x): {tile} not in hand")
+        self.counts[tile] -= 1
+        self.size -= 1
+        self._refresh(_group_of(tile))
+
+    def shanten(self):
+        records = self.records
+        record = combine(combine(records[0], records[1]), combine(records[2], records[3]))
+        standard = evaluate(record, self.size)
+        if self.size < SPECIAL_MIN_SIZE:
+            return standard
+        special = special_shanten(special_stats(self.counts))
+        return special if special < standard else standard
+
+    def _rests(self):
+        """
+        返回 (当前向听数, 每组“其余 3 组”的合并记录)。
+        摸打一张牌时只需再把本组的新记录与对应的 rest 合并一次。
+        """
+        records = self.records
+        left01 = combine(records[0], records[1])
+        left23 = combine(records[2], records[3])
+        rests = (
+            combine(records[1], left23),
+            combine(records[0], left23),
+            combine(left01, records[3]),
+            combine(left01, records[2]),
+        )
+        return evaluate(combine(left01, left23), self.size), rests
+
+    def discard_shanten(self):
+        """
+        对手中每一种牌，返回打出后的向听数 {牌: 向听数}。
+        只计算向听，不统计进张，供快速的默认打牌策略使用。
+        """
+        counts = self.counts
+        table = self.table
+        size = self.size - 1
+        rests = self._rests()[1]
+
+        result = {}
+        for group in range(3):
+            base = group * 9
+            key = 0
+            for i in range(base, base + 9):
+                key = key * 5 + counts[i]
+            rest = rests[group]
+            for i in range(9):
+                if counts[base + i]:
+                    record = combine(rest, table.suit_record(key - SUIT_WEIGHTS[i]))
+                    result[base + i] = evaluate(record, size)
+
+        rest = rests[_HONOR_GROUP]
+        for tile in range(tile_loader.HONOR_START, tile_loader.TILE_KINDS):
+            if counts[tile]:
+                counts[tile] -= 1
+                record = combine(rest, table.honor_record(counts))
+                counts[tile] += 1
+                result[tile] = evaluate(record, size)
+
+        if size >= SPECIAL_MIN_SIZE:
+            stats = special_stats(counts)
+            for tile, shanten in result.items():
+                special = special_shanten(_stats_after_discard(stats, counts[tile], IS_ORPHAN[tile]))
+                if special < shanten:
+                    result[tile] = special
+        return result
+
+    def ukeire(self, remaining):
+        """
+        返回 (向听数, {牌: 未见张数})，字典中为所有能让向听数减少的牌。
+        remaining 为按牌编号索引的未见张数(array/list/Counter 均可)。
+        """
+        counts = self.counts
+        table = self.table
+        size = self.size + 1
+        current, rests = self._rests()
+        special = None
+        if size >= SPECIAL_MIN_SIZE:
+            stats = special_stats(counts)
+            special = special_shanten(stats)
+            if special < current:
+                current = special
+
+        tiles = {}
+        for group in range(3):
+            base = group * 9
+            key = 0
+            for i in range(base, base + 9):
+                key = key * 5 + counts[i]
+            rest = rests[group]
+            for i in range(9):
+                tile = base + i
+                if counts[tile] >= 4:
+                    continue
+                # 与手牌距离超过 2 的牌只能成为孤张，不可能减少向听数
+                if not any(counts[j] for j in range(base + max(i - 2, 0), base + min(i + 3, 9))):
+                    continue
+                record = combine(rest, table.suit_record(key + SUIT_WEIGHTS[i]))
+                if evaluate(record, size) < current:
+                    tiles[tile] = remaining[tile]
+
+        rest = rests[_HONOR_GROUP]
+        for tile in range(tile_loader.HONOR_START, tile_loader.TILE_KINDS):
+            if counts[tile] == 0 or counts[tile] >= 4:
+                continue
+            counts[tile] += 1
+            record = combine(rest, table.honor_record(counts))
+            counts[tile] -= 1
+            if evaluate(record, size) < current:
+                tiles[tile] = remaining[tile]
+
+        # 七对子/国士无双的向听数不大于标准型时，能减少它的牌同样是有效牌
+        if special == current:
+            added = False
+            for tile in range(tile_loader.TILE_KINDS):
+                count = counts[tile]
+                if count >= 4 or tile in tiles:
+                    continue
+                if special_shanten(_stats_after_draw(stats, count, IS_ORPHAN[tile])) < current:
+                    tiles[tile] = remaining[tile]
+                    added = True
+            if added:
+                tiles = dict(sorted(tiles.items()))
+
+        return current, tiles
+
+    def discard_options(self, remaining):
+        """
+        对手中每一种牌，试打后计算进张。
+        返回 {打出的牌: (打出后的向听数, {牌: 未见张数})}。
+        """
+        options = {}
+        counts = self.counts
+        for tile in range(tile_loader.TILE_KINDS):
+            if counts[tile] == 0:
+                continue
+            self.discard(tile)
+            options[tile] = self.ukeire(remaining)
+            self.draw(tile)
+        return options
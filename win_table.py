@@ -0,0 +1,141 @@
+# win_table.py
+import tile_loader
+from table_file import map_table, write_table
+
+TABLE_PATH = "resources/win_table.bin"
+_MAGIC = b"MJWT"
+_VERSION = 2
+# 单花色五进制键的取值范围
+KEY_SPACE = 5 ** 9
+
+# 顺子(起点 0..6)与刻子(0..8)，以单花色 9 格计数的下标表示
+_MELDS = [(i, i + 1, i + 2) for i in range(7)] + [(i, i, i) for i in range(9)]
+
+
+def suit_key(counts, base):
+    """把 counts[base:base+9] 这 9 格计数编码为五进制整数，作为查表键"""
+    key = 0
+    for i in range(base, base + 9):
+        key = key * 5 + counts[i]
+    return key
+
+
+class WinTable:
+    """
+    单花色胡牌查找表。
+
+    对一种数牌花色的 9 格计数模式，若它能完全拆成若干面子(张数为 3n)，
+    或拆成若干面子加一个雀头(张数为 3n+2)，则其五进制键在表中。
+    字牌只能组成刻子或对子，直接按张数判断，不需要查表。
+
+    表以位图形式保存在 resources/win_table.bin(第 key 位为 1 表示 key 在表中，约 240KB)，
+    运行时通过 mmap 只读映射，多个进程共享同一份页面。文件不存在或格式不符时
+    生成一次并写入(也可以用 build_tables.py 预先生成)。
+    """
+
+    def __init__(self, path=TABLE_PATH):
+        self.path = path
+        self.bits = self.load()
+
+    def load(self):
+        bits = map_table(self.path, _MAGIC, _VERSION)
+        if bits is None:
+            self.write(self.path)
+            bits = map_table(self.path, _MAGIC, _VERSION)
+        return bits
+
+    @classmethod
+    def write(cls, path=TABLE_PATH):
+        """生成查找表并写成位图文件"""
+        bits = bytearray((KEY_SPACE + 7) // 8)
+        for key in cls.build():
+            bits[key >> 3] |= 1 << (key & 7)
+        write_table(path, _MAGIC, _VERSION, bits)
+
+    def __contains__(self, key):
+        return self.bits[key >> 3] >> (key & 7) & 1 == 1
+
+    @staticmethod
+    def build():
+        """枚举 0~4 个面子与可选雀头的所有组合，收集每张牌不超过 4 张的计数模式"""
+        patterns = set()
+        counts = [0] * 9
+
+        def collect():
+            patterns.add(suit_key(counts, 0))
+            # 在当前面子组合上再加一个雀头
+            for i in range(9):
+                if counts[i] <= 2:
+                    counts[i] += 2
+                    patterns.add(suit_key(counts, 0))
+                    counts[i] -= 2
+
+        def add_melds(first, remaining):
+            collect()
+            if remaining == 0:
+                return
+            # 面子按下标非降序加入，避免重复枚举同一组合
+            for m in range(first, len(_MELDS)):
+                meld = _MELDS[m]
+                for i in meld:
+                    counts[i] += 1
+                if all(counts[i] <= 4 for i in meld):
+                    add_melds(m, remaining - 1)
+                for i in meld:
+                    counts[i] -= 1
+
+        add_melds(0, 4)
+        return patterns
+
+    def is_complete(self, counts):
+        """
+        判断 34 格计数向量能否拆为 n 个面子 + 1 个雀头。
+        每种花色查一次表，字牌逐张判断，整体恰好只能有一个雀头。
+        """
+        bits = self.bits
+        pairs = 0
+        for base in (0, 9, 18):
+            key = 0
+            total = 0
+            for i in range(base, base + 9):
+                c = counts[i]
+                key = key * 5 + c
+                total += c
+            remainder = total % 3
+            if remainder == 1:
+                return False
+            if remainder == 2:
+                pairs += 1
+            if not bits[key >> 3] >> (key & 7) & 1:
+                return False
+
+        for i in range(tile_loader.HONOR_START, tile_loader.TILE_KINDS):
+            c = counts[i]
+            if c == 1 or c == 4:
+                return False
+            if c == 2:
+                pairs += 1
+
+        return pairs == 1
+
+
+def is_special_complete(counts):
+    """
+    判断 14 张门前手牌(调用方保证张数)是否为七对子或国士无双。
+    七对子：恰好 7 种牌各 2 张(4 张同种牌不算两对)；
+    国士无双：13 种幺九牌各至少 1 张，且 14 张全部是幺九牌。
+    两者的牌种数分别恰为 7 和 13，先按空格数排除，绝大多数手牌只需一次 count。
+    """
+    kinds = tile_loader.TILE_KINDS - counts.count(0)
+    if kinds == 7:
+        return counts.count(2) == 7
+    if kinds != 13:
+        return False
+    for i in tile_loader.ORPHANS:
+        if counts[i] == 0:
+            return False
+    return True
+
+
+# 快捷调用
+win_table = WinTable()